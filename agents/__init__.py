@@ -3,14 +3,32 @@
 Agents package: contains specialized Claude-powered advisors for queries.
 """
 
-from .query_optimizer import optimize_query
+from .query_optimizer import optimize_query, stream_optimize_query
 from .schema_advisor import advise_schema
 from .cost_advisor import estimate_cost
 from .data_validator import validate_query
+from .workload_advisor import advise_workload, build_workload
+from .index_auditor import audit_indexes, trial_without_indexes
+from .plan_diff import diff_plans, add_plan_diff
+from .column_profiler import profile_columns, collect_profile
+from .data_quality_rules import evaluate_rules, check_integrity
+from .target_comparison import compare_targets
 
 __all__ = [
     "optimize_query",
+    "stream_optimize_query",
     "advise_schema",
     "estimate_cost",
     "validate_query",
+    "advise_workload",
+    "build_workload",
+    "audit_indexes",
+    "trial_without_indexes",
+    "diff_plans",
+    "add_plan_diff",
+    "profile_columns",
+    "collect_profile",
+    "evaluate_rules",
+    "check_integrity",
+    "compare_targets",
 ]
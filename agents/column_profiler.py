@@ -0,0 +1,187 @@
+# agents/column_profiler.py
+import logging
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+
+import anyio
+from pymysql.constants import FIELD_TYPE
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+LENGTH_QUANTILES = (0.5, 0.95)
+TOP_VALUES = 5                  # most frequent values listed for low-cardinality string columns
+TOP_VALUES_MAX_DISTINCT = 50
+TOP_VALUE_CHARS = 40
+
+_TYPE_NAMES = {}
+for _name, _code in vars(FIELD_TYPE).items():
+    if _name.isupper():
+        _TYPE_NAMES.setdefault(_code, _name.lower())
+
+
+def _num(x):
+    """Plain float trimmed to 6 significant digits, for derived statistics (mean, quantiles) read by a model."""
+    return float(f"{float(x):.6g}")
+
+
+def _exact(value, fixed_point: bool):
+    """A sampled value as stored: DECIMAL as text, so 99999.99 is not rounded up to 100000, else int or float."""
+    if fixed_point or isinstance(value, Decimal):
+        return str(value)
+    return value if isinstance(value, int) else float(value)
+
+
+def _kind(value_type: type) -> str:
+    if issubclass(value_type, bool):
+        return "other"
+    if issubclass(value_type, (int, float, Decimal)):
+        return "numeric"
+    if issubclass(value_type, (datetime, date)):
+        return "temporal"
+    if issubclass(value_type, str):
+        return "string"
+    if issubclass(value_type, (bytes, bytearray)):
+        return "binary"
+    return "other"
+
+
+def _quantiles(np, arr, qs):
+    return {f"p{round(q * 100):02d}": v for q, v in zip(qs, np.quantile(arr, qs))}
+
+
+def _numeric_stats(np, values, fixed_point: bool):
+    arr = np.array(values, dtype=np.float64)
+    stats = {
+        # min and max feed the precision checks (agents.data_quality_rules), so they are never rounded
+        "min": _exact(min(values), fixed_point), "max": _exact(max(values), fixed_point), "mean": _num(arr.mean()),
+        "quantiles": {k: _num(v) for k, v in _quantiles(np, arr, QUANTILES).items()},
+        "distinct": int(np.unique(arr).size),
+        "negative": int((arr < 0).sum()),
+        "zero": int((arr == 0).sum()),
+    }
+    if fixed_point:
+        # Digits left of the point, for checking DECIMAL(p, s) columns against their p - s limit; counted on
+        # the exact values, since a float log10 can round 99999.9999999999999999 up to a sixth digit
+        digits = [max(Decimal(v).adjusted() + 1, 1) for v in values if v] or [1]
+        top = max(digits)
+        stats["integer_digits"] = {"max": top, "at_max": digits.count(top)}
+    return stats
+
+
+def _temporal_stats(np, values, now):
+    # date and datetime values mixed in one column compare at second resolution
+    arr = np.array([v if isinstance(v, datetime) else datetime(v.year, v.month, v.day) for v in values],
+                   dtype="datetime64[s]")
+    seconds = arr.astype(np.int64)
+    as_text = lambda s: str(np.datetime64(int(s), "s"))
+    return {
+        "min": as_text(seconds.min()), "max": as_text(seconds.max()),
+        "quantiles": {k: as_text(round(v)) for k, v in _quantiles(np, seconds, (0.25, 0.5, 0.75)).items()},
+        "distinct": int(np.unique(seconds).size),
+        "future": int((arr > np.datetime64(now, "s")).sum()),
+    }
+
+
+def _length_stats(np, lengths):
+    return {
+        "min": int(lengths.min()), "max": int(lengths.max()), "mean": _num(lengths.mean()),
+        **{k: _num(v) for k, v in _quantiles(np, lengths, LENGTH_QUANTILES).items()},
+    }
+
+
+def _string_stats(np, values):
+    lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    counts = Counter(values)
+    stats = {"distinct": len(counts), "length": _length_stats(np, lengths),
+             "empty": int((lengths == 0).sum())}
+    if len(counts) <= TOP_VALUES_MAX_DISTINCT:
+        stats["top_values"] = [{"value": v[:TOP_VALUE_CHARS], "count": n} for v, n in counts.most_common(TOP_VALUES)]
+    return stats
+
+
+def _binary_stats(np, values):
+    lengths = np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values))
+    return {"distinct": len(set(values)), "length": _length_stats(np, lengths)}
+
+
+def _profile_column(np, meta: dict, values: list, now) -> dict:
+    present = [v for v in values if v is not None]
+    profile = {
+        "type": _TYPE_NAMES.get(meta.get("type_code"), "unknown"),
+        "declared_nullable": meta.get("nullable"),
+        "nulls": len(values) - len(present),
+        "null_ratio": round((len(values) - len(present)) / len(values), 4) if values else 0.0,
+    }
+    if meta.get("scale"):
+        profile["scale"] = meta["scale"]
+    fixed_point = meta.get("type_code") in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL)
+    if fixed_point:
+        # Display width: precision plus sign and decimal point
+        profile["display_length"] = meta.get("length")
+    if not present:
+        profile["kind"] = "empty"
+        return profile
+    # Classified per Python type rather than per value: a column rarely holds more than one or two
+    types = Counter(map(type, present))
+    kinds = Counter()
+    for value_type, n in types.items():
+        kinds[_kind(value_type)] += n
+    kind = kinds.most_common(1)[0][0]
+    kind_types = {t for t in types if _kind(t) == kind}
+    typed = present if len(kind_types) == len(types) else [v for v in present if type(v) in kind_types]
+    profile["kind"] = kind
+    if len(typed) < len(present):
+        # e.g. zero dates, which the driver returns as strings in a DATE column
+        profile["unexpected_type_values"] = len(present) - len(typed)
+    if kind == "numeric":
+        profile.update(_numeric_stats(np, typed, fixed_point))
+    elif kind == "temporal":
+        profile.update(_temporal_stats(np, typed, now))
+    elif kind == "string":
+        profile.update(_string_stats(np, typed))
+    elif kind == "binary":
+        profile.update(_binary_stats(np, typed))
+    else:
+        profile["distinct"] = len({repr(v) for v in typed})
+    profile["distinct_ratio"] = round(profile["distinct"] / len(typed), 4)
+    return profile
+
+
+def profile_columns(sample: dict, now: datetime = None) -> dict:
+    """Per-column statistics over a ``fetch_profile_sample`` result.
+
+    Every column gets its null ratio and distinct count (within the sample). Numeric columns add
+    min/max/mean, quantiles and negative/zero counts; temporal ones min/max, quantiles and the count
+    of values in the future; strings (and binary) their length distribution, plus the most frequent
+    values when there are few of them.
+    """
+    if not isinstance(sample, dict) or "error" in sample:
+        return sample
+    # NumPy is only needed once a profile is computed; keep it out of application import time
+    import numpy as np
+
+    now = now or datetime.now()
+    rows, columns = sample["rows"], sample["columns"]
+    values_by_column = list(zip(*rows)) if rows else [()] * len(columns)
+    profiles, seen = {}, Counter()
+    for meta, values in zip(columns, values_by_column):
+        seen[meta["name"]] += 1
+        name = meta["name"] if seen[meta["name"]] == 1 else f"{meta['name']}#{seen[meta['name']]}"
+        profiles[name] = _profile_column(np, meta, list(values), now)
+    return {
+        "rows_sampled": len(rows),
+        "sample_limit": sample["limit"],
+        # Fewer rows than the limit: the whole result was profiled
+        "complete": len(rows) < sample["limit"],
+        "columns": profiles,
+    }
+
+
+async def collect_profile(db_client, query: str, limit: int = None) -> dict:
+    """Fetch a bounded sample of ``query``'s result and profile it (off the event loop)."""
+    sample = await db_client.fetch_profile_sample(query, limit)
+    if "error" in sample:
+        return sample
+    return await anyio.to_thread.run_sync(profile_columns, sample)
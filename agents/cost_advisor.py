@@ -2,13 +2,15 @@
 import json
 import logging
 from utils.claude_client import call_claude_json
+from utils.llm_schemas import CostOutput
 
 logger = logging.getLogger(__name__)
 
-async def estimate_cost(sql: str, explain):
+async def estimate_cost(sql: str, explain, index_catalog: dict = None):
     base = {"agent": "cost_advisor", "status": None, "query": sql, "details": {}}
     
     explain_str = json.dumps(explain, indent=2, default=str) if explain and isinstance(explain, list) else "No explain data"
+    catalog_str = json.dumps(index_catalog, separators=(",", ":"), default=str) if index_catalog and isinstance(index_catalog, dict) and "error" not in index_catalog else "No index catalog"
     
     prompt = f"""You are a Cost Advisor for MariaDB. Analyze IO cost and runtime.
 
@@ -18,7 +20,10 @@ SQL:
 EXPLAIN PLAN:
 {explain_str}
 
-TASK: Estimate cost/IO/runtime from EXPLAIN and provide concrete cost reduction tips.
+EXISTING INDEXES & TABLE STATS (table rows, avg row/data/index bytes; index columns in order with per-prefix cardinality):
+{catalog_str}
+
+TASK: Estimate cost/IO/runtime from EXPLAIN and table sizes, and provide concrete cost reduction tips.
 Focus on: buffer pool efficiency, query cache hits, index covering, avoiding temp tables/filesort.
 
 RESPONSE FORMAT - RETURN VALID JSON ONLY:
@@ -32,7 +37,7 @@ If no data available, still return valid JSON with best guess."""
     
     try:
         logger.debug("Calling Groq API for cost analysis")
-        resp = await call_claude_json(prompt, max_tokens=800, temperature=0.3)
+        resp = await call_claude_json(prompt, max_tokens=800, temperature=0.3, agent="cost_advisor", schema=CostOutput)
         
         if "error" in resp:
             logger.warning(f"Cost advisor error: {resp.get('error')}")
@@ -0,0 +1,168 @@
+# agents/data_quality_rules.py
+import asyncio
+import re
+
+from utils.config import Config
+
+# Column names that hold amounts, which are never negative
+AMOUNT_NAME = re.compile(r"(amount|price|cost|total|qty|quantity|fee|tax|salary|revenue|paid|weight|stock)", re.I)
+# ...unless they are signed by nature
+SIGNED_NAME = re.compile(r"(balance|delta|diff|change|adjust|net|profit|margin|offset|variance)", re.I)
+# Temporal columns expected to lie in the future
+FUTURE_NAME = re.compile(r"(expir|due|schedul|until|valid_to|deadline|next|renew|planned|(^|_)(end|eta))", re.I)
+ID_NAME = re.compile(r"(^id$|_id$|Id$)")
+OUTER_JOIN = re.compile(r"\b(left|right|full)\s+(outer\s+)?join\b", re.I)
+DECIMAL_TYPE = re.compile(r"decimal\((\d+)(?:,\s*(\d+))?\)", re.I)
+
+
+def _finding(rule: str, column: str, count: int, message: str, severity: str = "warning") -> dict:
+    return {"rule": rule, "column": column, "count": count, "severity": severity, "message": message}
+
+
+def _base_columns(schema_context) -> dict:
+    """Column name -> ``[(table, DESCRIBE row), ...]`` over the schema context."""
+    base = {}
+    if not isinstance(schema_context, dict) or "error" in schema_context:
+        return base
+    for table, rows in schema_context.items():
+        if isinstance(rows, list):
+            for row in rows:
+                base.setdefault(row.get("Field", "").lower(), []).append((table, row))
+    return base
+
+
+def _decimal_precision(stats: dict, matches: list):
+    """``(precision, scale)`` from the base column's declared type, else from the result's display width."""
+    for _, row in matches:
+        m = DECIMAL_TYPE.search(str(row.get("Type", "")))
+        if m:
+            return int(m.group(1)), int(m.group(2) or 0)
+    length, scale = stats.get("display_length"), stats.get("scale") or 0
+    if not length:
+        return None
+    # Display width counts a sign and, with a scale, the decimal point
+    return length - 1 - (1 if scale else 0), scale
+
+
+def _check_decimal(name, stats, matches, findings):
+    digits = stats.get("integer_digits")
+    precision = _decimal_precision(stats, matches) if digits else None
+    if not precision:
+        return
+    p, s = precision
+    if p - s > 0 and digits["max"] >= p - s:
+        findings.append(_finding(
+            "decimal_precision_limit", name, digits["at_max"],
+            f"{digits['at_max']} value(s) in `{name}` use all {p - s} integer digits of DECIMAL({p},{s}); "
+            "the next order of magnitude overflows", "error"))
+
+
+def _check_negative(name, stats, findings):
+    if stats.get("negative") and AMOUNT_NAME.search(name) and not SIGNED_NAME.search(name):
+        findings.append(_finding(
+            "negative_amount", name, stats["negative"],
+            f"{stats['negative']} negative value(s) in amount column `{name}` (min {stats['min']})"))
+
+
+def _check_temporal(name, stats, findings):
+    if stats.get("future") and not FUTURE_NAME.search(name):
+        findings.append(_finding(
+            "future_date", name, stats["future"],
+            f"{stats['future']} value(s) in `{name}` lie in the future (max {stats['max']})"))
+    if stats.get("unexpected_type_values"):
+        findings.append(_finding(
+            "invalid_date", name, stats["unexpected_type_values"],
+            f"{stats['unexpected_type_values']} value(s) in `{name}` are not valid dates (e.g. zero dates)", "error"))
+
+
+def _check_nulls(name, stats, matches, outer_join, findings, open_questions):
+    nulls = stats.get("nulls")
+    if not nulls:
+        return
+    if stats.get("declared_nullable") is False:
+        findings.append(_finding("null_in_not_null", name, nulls,
+                                 f"{nulls} NULL(s) in `{name}`, which the result declares NOT NULL", "error"))
+        return
+    not_null_in = [table for table, row in matches if row.get("Null") == "NO"]
+    if matches and not not_null_in:
+        return  # nullable by design
+    if not matches and not ID_NAME.search(name):
+        return
+    reason = f"NOT NULL in `{not_null_in[0]}`" if not_null_in else "an identifier"
+    if outer_join:
+        open_questions.append(f"`{name}` is {reason} but has {nulls} NULL(s) ({stats['null_ratio']:.1%}); "
+                              "the outer join may produce them for unmatched rows, or rows may be missing")
+    elif not_null_in:
+        findings.append(_finding("null_in_not_null", name, nulls,
+                                 f"{nulls} NULL(s) in `{name}`, which is {reason}", "error"))
+    else:
+        open_questions.append(f"Identifier-like `{name}` has {nulls} NULL(s) ({stats['null_ratio']:.1%}) "
+                              "and matches no base column")
+
+
+def _check_orphans(integrity, findings, open_questions):
+    if not isinstance(integrity, dict) or "error" in integrity:
+        return
+    for fk in integrity.get("foreign_keys", []):
+        ref = f"{fk['table']}({', '.join(fk['columns'])}) -> {fk['referenced_table']}({', '.join(fk['referenced_columns'])})"
+        if "error" in fk:
+            open_questions.append(f"Orphan check for {ref} did not finish: {fk['error']}")
+        elif fk["orphans"]:
+            findings.append(_finding(
+                "orphan_foreign_key", f"{fk['table']}.{','.join(fk['columns'])}", fk["orphans"],
+                f"{fk['orphans']} row(s) of `{fk['table']}` reference missing `{fk['referenced_table']}` rows "
+                f"through {fk['constraint']} ({ref})", "error"))
+
+
+def evaluate_rules(query: str, profile: dict, schema_context=None, integrity=None) -> dict:
+    """Mechanical data-quality checks over a column profile (``agents.column_profiler``) and the orphan counts
+    from ``check_integrity``.
+
+    Returns ``{"findings": [{rule, column, count, severity, message}], "open_questions": [str]}``. Counts are exact:
+    within the profiled sample for column rules, over the whole child table for orphan rows. Open questions are
+    what the rules cannot decide alone, such as NULLs an outer join may explain.
+    """
+    findings, open_questions = [], []
+    base = _base_columns(schema_context)
+    outer_join = bool(OUTER_JOIN.search(query or ""))
+    for name, stats in profile.get("columns", {}).items():
+        matches = base.get(name.split("#")[0].lower(), [])
+        _check_nulls(name, stats, matches, outer_join, findings, open_questions)
+        kind = stats.get("kind")
+        if kind == "numeric":
+            _check_decimal(name, stats, matches, findings)
+            _check_negative(name, stats, findings)
+        elif kind == "temporal":
+            _check_temporal(name, stats, findings)
+        if kind != "temporal" and stats.get("unexpected_type_values"):
+            open_questions.append(f"`{name}` mixes types: {stats['unexpected_type_values']} value(s) are not "
+                                  f"{kind}")
+    _check_orphans(integrity, findings, open_questions)
+    return {"findings": findings, "open_questions": open_questions}
+
+
+async def check_integrity(db_client, query: str) -> dict:
+    """Orphan rows for the declared foreign keys of the tables ``query`` reads (at most
+    DATA_QUALITY_MAX_FOREIGN_KEYS), one aggregate per child table, run concurrently."""
+    declared = await db_client.get_foreign_keys(query)
+    if "error" in declared:
+        return declared
+    by_table, checked, skipped = {}, 0, 0
+    for table, keys in sorted(declared.items()):
+        for fk in keys:
+            if checked < Config.DATA_QUALITY_MAX_FOREIGN_KEYS:
+                by_table.setdefault(table, []).append(fk)
+                checked += 1
+            else:
+                skipped += 1
+    counts = await asyncio.gather(*(db_client.count_orphans(table, keys) for table, keys in by_table.items()))
+    results = []
+    for (table, keys), orphans in zip(by_table.items(), counts):
+        for fk in keys:
+            entry = {"table": table, **fk}
+            if "error" in orphans:
+                entry["error"] = orphans["error"]
+            else:
+                entry["orphans"] = orphans[fk["constraint"]]
+            results.append(entry)
+    return {"foreign_keys": results, "skipped": skipped}
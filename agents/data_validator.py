@@ -2,24 +2,63 @@
 import json
 import logging
 from utils.claude_client import call_claude_json
+from utils.llm_schemas import ValidatorOutput
+from agents.data_quality_rules import evaluate_rules
 
 logger = logging.getLogger(__name__)
 
-async def validate_query(sql: str, sample_rows: dict):
+def _profile_text(profile: dict) -> str:
+    if not profile or not isinstance(profile, dict):
+        return "No profile available"
+    if "error" in profile:
+        return f"No profile available ({profile['error']})"
+    sampled = f"{profile['rows_sampled']} rows" + (" (the whole result)" if profile.get("complete") else " (a bounded sample)")
+    return f"{sampled}:\n" + json.dumps(profile["columns"], separators=(",", ":"), default=str)
+
+async def validate_query(sql: str, profile: dict, schema_context=None, integrity=None):
+    """Data-quality review of a query's result from its column profile (``agents.column_profiler``), not raw rows.
+
+    The deterministic rules in ``agents.data_quality_rules`` run first; the model is only consulted about the
+    open questions they leave. The profile is returned in the details alongside the findings.
+    """
     base = {"agent": "data_validator", "status": None, "query": sql, "details": {}}
-    
-    sample_rows_str = json.dumps(sample_rows, indent=2, default=str) if sample_rows and isinstance(sample_rows, dict) else "No sample data"
-    
+    if not isinstance(profile, dict) or "error" in profile:
+        return {**base, "status": "error", "details": {"error": (profile or {}).get("error", "No profile available"),
+                                                         "profile": profile}}
+
+    rules = evaluate_rules(sql, profile, schema_context, integrity)
+    details = {
+        "issues": [f["message"] for f in rules["findings"]],
+        "findings": rules["findings"],
+        "open_questions": rules["open_questions"],
+        "llm_consulted": False,
+        "confidence": "high",
+        "reasoning": (f"{len(rules['findings'])} finding(s) from deterministic checks over {profile['rows_sampled']} "
+                      "profiled row(s); nothing left open for the model"),
+        "profile": profile,
+        "integrity": integrity,
+    }
+    if not rules["open_questions"]:
+        return {**base, "status": "success", "details": details}
+
+    findings = "\n".join(f"- {f['message']}" for f in rules["findings"]) or "None"
+    questions = "\n".join(f"- {q}" for q in rules["open_questions"])
     prompt = f"""You are a Data Quality Validator for MariaDB. Inspect results for anomalies.
 
 SQL:
 {sql}
 
-SAMPLE DATA:
-{sample_rows_str}
+COLUMN PROFILE (per result column: declared type, null_ratio, distinct count; numeric min/max/mean/quantiles and negative/zero counts; temporal min/max and future count; string length distribution and top values; unexpected_type_values counts values of another type, e.g. zero dates):
+{_profile_text(profile)}
 
-TASK: Check for data quality issues: missing values, wrong types, suspicious outliers, invalid constraints.
-Focus on: DECIMAL precision, DATE formats, ENUM values, foreign key hints, negative/future dates, NULL violations.
+ALREADY FOUND BY DETERMINISTIC CHECKS (do not repeat these):
+{findings}
+
+OPEN QUESTIONS THE CHECKS COULD NOT DECIDE:
+{questions}
+
+TASK: Decide each open question from the SQL and the profile. Report only the ones that are real data quality issues,
+citing the profile's counts.
 
 RESPONSE FORMAT - RETURN VALID JSON ONLY:
 {{
@@ -29,21 +68,25 @@ RESPONSE FORMAT - RETURN VALID JSON ONLY:
 }}
 
 If no issues, return valid JSON with empty issues array and high confidence."""
-    
+
     try:
         logger.debug("Calling Groq API for data validation")
-        resp = await call_claude_json(prompt, max_tokens=600, temperature=0.3)
-        
+        resp = await call_claude_json(prompt, max_tokens=600, temperature=0.3, agent="data_validator", schema=ValidatorOutput)
+
         if "error" in resp:
+            # The rule findings stand on their own
             logger.warning(f"Data validator error: {resp.get('error')}")
-            return {**base, "status": "error", "details": {"error": resp.get("error")}}
-        
-        details = {
-            "issues": resp.get("issues", []),
-            "confidence": resp.get("confidence", "low"),
-            "reasoning": resp.get("reasoning", "Validation complete")
-        }
+            details["reasoning"] = f"Open questions left unresolved: {resp.get('error')}"
+            details["confidence"] = "medium"
+            return {**base, "status": "success", "details": details}
+
+        details.update(
+            issues=details["issues"] + resp.get("issues", []),
+            llm_consulted=True,
+            confidence=resp.get("confidence", "low"),
+            reasoning=resp.get("reasoning", "Validation complete"),
+        )
         return {**base, "status": "success", "details": details}
     except Exception as e:
         logger.exception(f"Data validator exception: {e}")
-        return {**base, "status": "error", "details": {"error": str(e)}}
+        return {**base, "status": "error", "details": {"error": str(e), "profile": profile}}
@@ -0,0 +1,177 @@
+# agents/index_auditor.py
+from agents.workload_advisor import TableModel
+from utils.sql_tokenizer import statement_type, ignore_index_hint
+
+# A trial counts as a regression when a query that used the index examines this many times more rows without it
+REGRESSION_FACTOR = 1.2
+
+
+def _q(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _finding(table, idx, kind, reason, model, usage, secondary_count, covered_by=None):
+    measured = (usage.get("sizes") or {}).get(table, {}).get(idx["name"])
+    return {
+        "table": table,
+        "index": idx["name"],
+        "columns": idx["columns"],
+        "unique": idx.get("unique", False),
+        "kind": kind,
+        "covered_by": covered_by,
+        "reason": reason,
+        "size_bytes": measured if measured is not None else model.index_size([c.split("(")[0].lower() for c in idx["columns"]]),
+        "size_source": "innodb_index_stats" if measured is not None else "estimate",
+        # every row insert/delete touches the clustered index plus each secondary index
+        "write_amplification": {
+            "index_writes_per_row": secondary_count + 1,
+            "saved_share": round(1 / (secondary_count + 1), 3),
+        },
+        "drop_ddl": f"ALTER TABLE {_q(table)} DROP INDEX {_q(idx['name'])}",
+        "ignore_ddl": f"ALTER TABLE {_q(table)} ALTER INDEX {_q(idx['name'])} IGNORED",
+        "restore_ddl": f"ALTER TABLE {_q(table)} ALTER INDEX {_q(idx['name'])} NOT IGNORED",
+    }
+
+
+def audit_indexes(index_catalog: dict, columns: dict = None, usage: dict = None):
+    """Find indexes that cost writes and space without helping reads.
+
+    - redundant_prefix: a non-unique index whose columns are a leading prefix of another
+      index (reported against the widest such index).
+    - duplicate: same columns as another index once InnoDB's implicit primary-key suffix
+      is taken into account; the primary / unique / alphabetically first one is kept.
+    - unused: no reads recorded by INDEX_STATISTICS or listed by sys.schema_unused_indexes.
+    Primary keys and unique indexes are never reported as unused (they enforce constraints).
+    """
+    base = {"agent": "index_auditor", "status": None, "details": {}}
+    if not isinstance(index_catalog, dict) or "error" in index_catalog:
+        return {**base, "status": "error", "details": {"error": (index_catalog or {}).get("error", "Index catalog unavailable")}}
+    columns = columns if isinstance(columns, dict) and "error" not in columns else {}
+    usage = usage if isinstance(usage, dict) and "error" not in usage else {}
+
+    findings, index_count = [], 0
+    for table in sorted(index_catalog):
+        entry = index_catalog[table]
+        indexes = entry.get("indexes", [])
+        index_count += len(indexes)
+        model = TableModel(table, entry, columns.get(table))
+        secondary_count = sum(1 for i in indexes if i["name"] != "PRIMARY")
+        primary = next((i for i in indexes if i["name"] == "PRIMARY"), None)
+        pk = [c.lower() for c in primary["columns"]] if primary else []
+        btree = [i for i in indexes if i.get("type") in (None, "BTREE")]
+        flagged = set()
+
+        def declared(idx):
+            return [c.lower() for c in idx["columns"]]
+
+        def extended(idx):
+            cols = declared(idx)
+            return cols if idx["name"] == "PRIMARY" else cols + [c for c in pk if c not in cols]
+
+        for idx in sorted(btree, key=lambda i: i["name"]):
+            if idx["name"] in flagged or idx["name"] == "PRIMARY" or idx.get("unique"):
+                continue
+            cols = declared(idx)
+            wider = sorted(
+                (o for o in btree if o is not idx and o["name"] not in flagged
+                 and len(declared(o)) > len(cols) and declared(o)[:len(cols)] == cols),
+                key=lambda o: (-len(o["columns"]), o["name"]),
+            )
+            if wider:
+                flagged.add(idx["name"])
+                findings.append(_finding(table, idx, "redundant_prefix",
+                                         f"Leading columns of {wider[0]['name']}, which serves the same lookups",
+                                         model, usage, secondary_count, wider[0]["name"]))
+
+        groups = {}
+        for idx in btree:
+            if idx["name"] in flagged:
+                continue
+            groups.setdefault(tuple(extended(idx)), []).append(idx)
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            keep = min(group, key=lambda i: (i["name"] != "PRIMARY", not i.get("unique"), i["name"]))
+            for idx in sorted(group, key=lambda i: i["name"]):
+                if idx is keep:
+                    continue
+                flagged.add(idx["name"])
+                findings.append(_finding(table, idx, "duplicate",
+                                         f"Same columns as {keep['name']} (including the implicit primary key suffix)",
+                                         model, usage, secondary_count, keep["name"]))
+
+        rows_read = (usage.get("rows_read") or {}).get(table)
+        unused = set((usage.get("unused") or {}).get(table, []))
+        for idx in sorted(indexes, key=lambda i: i["name"]):
+            if idx["name"] in flagged or idx["name"] == "PRIMARY" or idx.get("unique"):
+                continue
+            if usage.get("source") == "index_statistics":
+                if (rows_read or {}).get(idx["name"], 0):
+                    continue
+            elif idx["name"] not in unused:
+                continue
+            findings.append(_finding(table, idx, "unused",
+                                     f"No reads recorded by {usage['source']} since server start",
+                                     model, usage, secondary_count))
+
+    reclaimable = sum(f["size_bytes"] for f in findings)
+    details = {
+        "findings": findings,
+        "summary": {
+            "tables": len(index_catalog),
+            "indexes": index_count,
+            "duplicate": sum(1 for f in findings if f["kind"] == "duplicate"),
+            "redundant_prefix": sum(1 for f in findings if f["kind"] == "redundant_prefix"),
+            "unused": sum(1 for f in findings if f["kind"] == "unused"),
+            "reclaimable_bytes": reclaimable,
+            "usage_source": usage.get("source"),
+            "observed_seconds": usage.get("uptime_seconds"),
+        },
+    }
+    return {**base, "status": "success", "details": details}
+
+
+def _plan_summary(plan):
+    if not isinstance(plan, list):
+        return None
+    return {
+        "keys": [r.get("key") for r in plan],
+        "rows": sum(float(r.get("rows") or 0) for r in plan),
+    }
+
+
+async def trial_without_indexes(db_client, findings: list, queries: list, limit: int = 20):
+    """Trial dropping each finding by re-EXPLAINing ``queries`` with ``IGNORE INDEX`` hints on its table.
+
+    Nothing is changed on the server: each hinted query is only EXPLAINed, in the read-only sandbox session,
+    so other sessions keep using the index throughout. Only SELECT statements are explained, and a finding is
+    only trialled on the queries whose current plan uses it.
+    """
+    queries = [q for q in queries if statement_type(q) == "select"]
+    before = {q: _plan_summary(await db_client.explain(q)) for q in queries}
+    results = []
+    for f in findings[:limit]:
+        result = {"table": f["table"], "index": f["index"], "queries_using": 0, "regressions": [], "errors": []}
+        for q in queries:
+            prev = before[q]
+            if not prev or f["index"] not in prev["keys"]:
+                continue
+            hinted, references = ignore_index_hint(q, f["table"], f["index"])
+            if not references:
+                continue  # another table's index of the same name
+            result["queries_using"] += 1
+            plan = await db_client.explain(hinted)
+            if isinstance(plan, dict):
+                result["errors"].append({"sql": hinted, "error": plan.get("error")})
+                continue
+            now = _plan_summary(plan)
+            if now["rows"] > prev["rows"] * REGRESSION_FACTOR:
+                result["regressions"].append({"sql": q, "before": prev, "after": now})
+        if result["regressions"]:
+            result["verdict"] = "regresses"
+        elif result["errors"]:
+            result["verdict"] = "error"
+        else:
+            result["verdict"] = "safe_to_drop"
+        results.append(result)
+    return results
@@ -0,0 +1,182 @@
+# agents/plan_diff.py
+import math
+import logging
+from agents.workload_advisor import SORT_COST_FACTOR
+from utils.sql_tokenizer import tokenize, split_statements, statement_type
+
+logger = logging.getLogger(__name__)
+
+# Work model, in "rows examined": tables of one SELECT (same EXPLAIN id) are nested-loop joined,
+# so their row estimates multiply; separate SELECTs (subqueries, UNION parts) add up.
+TEMP_COST_FACTOR = 0.5          # temporary table: factor * rows written and read back
+SAME_WORK_BAND = 0.1            # ratios within 1 +/- this are reported as "same"
+
+# estimated_work_ratio upper bounds for the impact labels the UI already shows
+IMPACT_LEVELS = ((0.1, "high"), (0.5, "medium"), (1 - SAME_WORK_BAND, "low"), (1 + SAME_WORK_BAND, "none"))
+
+# Better -> worse; a change of access type is reported with its direction
+ACCESS_RANK = ["system", "const", "eq_ref", "ref", "fulltext", "ref_or_null", "unique_subquery",
+               "index_subquery", "range", "index_merge", "index", "all"]
+
+
+def _rows(row) -> float:
+    try:
+        return max(float(row.get("rows") or 1), 1.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _extra(row) -> str:
+    return str(row.get("Extra") or "").lower()
+
+
+def summarize_plan(plan: list) -> list:
+    """Per-table view of EXPLAIN output: select id, table, access type, key, rows, filtered and flags.
+
+    A table that appears more than once (self-joins, repeated subqueries) gets ``#2``, ``#3``... so the
+    n-th occurrence is compared with the n-th occurrence in the other plan.
+    """
+    seen = {}
+    summary = []
+    for row in plan:
+        table = str(row.get("table") or "")
+        seen[table] = seen.get(table, 0) + 1
+        extra = _extra(row)
+        summary.append({
+            "id": row.get("id"),
+            "table": table if seen[table] == 1 else f"{table}#{seen[table]}",
+            "type": str(row.get("type") or "").lower() or None,
+            "key": row.get("key"),
+            "rows": _rows(row),
+            "filtered": float(row.get("filtered") or 100),
+            "filesort": "filesort" in extra,
+            "temporary": "temporary" in extra,
+        })
+    return summary
+
+
+def estimated_work(plan: list) -> dict:
+    """Rows product per SELECT, summed, plus filesort and temporary-table penalties."""
+    entries = summarize_plan(plan)
+    products = {}
+    for entry in entries:
+        products[entry["id"]] = products.get(entry["id"], 1.0) * entry["rows"]
+    rows = sum(products.values())
+    work = rows
+    for entry in entries:
+        # The flags sit on the first table of their SELECT but apply to the whole joined result
+        n = products[entry["id"]]
+        if entry["filesort"]:
+            work += SORT_COST_FACTOR * n * math.log2(n + 1)
+        if entry["temporary"]:
+            work += TEMP_COST_FACTOR * n
+    return {
+        "rows_product": rows,
+        "filesort": any(e["filesort"] for e in entries),
+        "temporary": any(e["temporary"] for e in entries),
+        "work": round(work, 1),
+    }
+
+
+def _access_change(before, after):
+    if before == after:
+        return None
+    rank = {t: i for i, t in enumerate(ACCESS_RANK)}
+    direction = "changed"
+    if before in rank and after in rank:
+        direction = "better" if rank[after] < rank[before] else "worse"
+    return {"before": before, "after": after, "direction": direction}
+
+
+def impact_level(ratio) -> str:
+    if ratio is None:
+        return "unknown"
+    for bound, level in IMPACT_LEVELS:
+        if ratio < bound:
+            return level
+    return "regression"
+
+
+def diff_plans(before: list, after: list) -> dict:
+    """Structural diff of two EXPLAIN outputs (original query first).
+
+    Per table: access type and key changes and the row estimates. Overall: the rows product,
+    filesort and temporary flags and the modelled work of each plan, and ``estimated_work_ratio``
+    (after / before; below 1 means the rewrite should examine fewer rows).
+    """
+    old = {e["table"]: e for e in summarize_plan(before)}
+    new = {e["table"]: e for e in summarize_plan(after)}
+    tables = []
+    for name in list(old) + [t for t in new if t not in old]:
+        a, b = old.get(name), new.get(name)
+        if a is None or b is None:
+            tables.append({"table": name, "change": "added" if a is None else "removed",
+                           "type": (a or b)["type"], "key": (a or b)["key"], "rows": (a or b)["rows"]})
+            continue
+        entry = {"table": name, "rows_before": a["rows"], "rows_after": b["rows"]}
+        access = _access_change(a["type"], b["type"])
+        if access:
+            entry["access_change"] = access
+        if a["key"] != b["key"]:
+            entry["key_change"] = {"before": a["key"], "after": b["key"]}
+        tables.append(entry)
+
+    work_before, work_after = estimated_work(before), estimated_work(after)
+    ratio = float(f"{work_after['work'] / work_before['work']:.4g}") if work_before["work"] else None
+    if ratio is None:
+        verdict = "unknown"
+    elif ratio < 1 - SAME_WORK_BAND:
+        verdict = "better"
+    elif ratio > 1 + SAME_WORK_BAND:
+        verdict = "worse"
+    else:
+        verdict = "same"
+    return {
+        "tables": tables,
+        "before": work_before,
+        "after": work_after,
+        "estimated_work_ratio": ratio,
+        "verdict": verdict,
+        "impact": impact_level(ratio),
+    }
+
+
+def _explainable_rewrite(sql: str, optimized) -> str:
+    """Why ``optimized`` cannot be compared with ``sql``, or ``""`` when it can."""
+    if not isinstance(optimized, str) or not optimized.strip():
+        return "no optimized query"
+    tokens = tokenize(optimized)
+    if len(split_statements(tokens)) != 1:
+        return "optimized query is not a single statement"
+    if statement_type(tokens) != "select":
+        return "only SELECT rewrites are explained"
+    if tokens == tokenize(sql):
+        return "optimized query is unchanged"
+    return ""
+
+
+async def add_plan_diff(db_client, sql: str, before_plan, optimizer_output: dict) -> dict:
+    """EXPLAIN the optimizer's rewrite and attach ``optimized_explain_plan``, ``plan_diff`` and
+    ``estimated_work_ratio`` to its details. Outputs that cannot be compared get a ``plan_diff``
+    holding only ``skipped`` (the reason) and a ``None`` ratio.
+    """
+    if not optimizer_output or optimizer_output.get("status") != "success":
+        return optimizer_output
+    details = optimizer_output.setdefault("details", {})
+    optimized = details.get("optimized_query")
+    reason = _explainable_rewrite(sql, optimized)
+    if not reason and not isinstance(before_plan, list):
+        reason = "original query has no EXPLAIN plan"
+    if not reason:
+        after_plan = await db_client.explain(optimized.strip().rstrip(";"))
+        details["optimized_explain_plan"] = after_plan
+        if isinstance(after_plan, list):
+            diff = diff_plans(before_plan, after_plan)
+            details["plan_diff"] = diff
+            details["estimated_work_ratio"] = diff["estimated_work_ratio"]
+            return optimizer_output
+        logger.warning(f"EXPLAIN of optimized query failed: {after_plan.get('error')}")
+        reason = f"EXPLAIN failed: {after_plan.get('error')}"
+    details["plan_diff"] = {"skipped": reason}
+    details["estimated_work_ratio"] = None
+    return optimizer_output
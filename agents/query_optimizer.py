@@ -2,24 +2,30 @@
 import json
 import logging
 from typing import Dict, Any
-from utils.claude_client import call_claude_json
+from utils.claude_client import call_claude_json, stream_claude_json
+from utils.llm_schemas import OptimizerOutput
+from agents.target_comparison import comparison_text
 
 logger = logging.getLogger(__name__)
 
-async def optimize_query(sql: str,
-                   schema: Dict[str, Any],
-                   explain: Dict[str, Any],
-                   sample_rows: Dict[str, Any],
-                   target_engine: str = "mariadb") -> Dict[str, Any]:
-    """
-    Groq-powered Query Optimizer (MariaDB-focused)
-    - Calls Groq with schema + EXPLAIN + SQL
-    - Expects structured JSON with optimized query, recommendations, warnings, impact, etc.
-    """
-
+def build_prompt(sql: str,
+                 schema: Dict[str, Any],
+                 explain: Dict[str, Any],
+                 sample_rows: Dict[str, Any],
+                 index_catalog: Dict[str, Any] = None,
+                 target_comparison: Dict[str, Any] = None) -> str:
+    """Optimizer prompt: schema + existing indexes/table stats + EXPLAIN + sample rows + SQL, and how the
+    query's plan differs on the other targets when it was fanned out (``agents.target_comparison``)."""
     schema_str = json.dumps(schema, indent=2, default=str) if schema and not isinstance(schema, dict) or (isinstance(schema, dict) and schema.get("error") is None) else "Schema unavailable"
     explain_str = json.dumps(explain, indent=2, default=str) if explain and isinstance(explain, list) else "Explain plan unavailable"
-    sample_rows_str = json.dumps(sample_rows, indent=2, default=str) if sample_rows and isinstance(sample_rows, dict) else "Sample rows unavailable"
+    # Columnar (column names once, then value arrays), compact: sample rows are the widest part of the prompt
+    sample_rows_str = json.dumps(sample_rows, separators=(",", ":"), default=str) if sample_rows and isinstance(sample_rows, dict) else "Sample rows unavailable"
+    targets_str = f"""
+OTHER TARGETS (the same query on replicas/shards; the context above is the first target's: per-target plan work, tables whose access type or key differs, schema differences and statistics drift):
+{comparison_text(target_comparison)}
+Prefer a rewrite and indexes that give a good plan on every target; name diverging targets in warnings.
+""" if target_comparison else ""
+    catalog_str = json.dumps(index_catalog, separators=(",", ":"), default=str) if index_catalog and isinstance(index_catalog, dict) and "error" not in index_catalog else "Index catalog unavailable"
 
     prompt = f"""You are a world-class SQL performance tuning agent specialized in MariaDB/MySQL.
 
@@ -31,12 +37,15 @@ ORIGINAL QUERY:
 SCHEMA CONTEXT:
 {schema_str}
 
+EXISTING INDEXES & TABLE STATS (table rows, avg row/data/index bytes; index columns in order with per-prefix cardinality):
+{catalog_str}
+
 EXPLAIN PLAN:
 {explain_str}
 
-SAMPLE ROWS:
+SAMPLE ROWS (column names, then one value array per row):
 {sample_rows_str}
-
+{targets_str}
 OPTIMIZATION RULES - ALWAYS FIND IMPROVEMENTS:
 1. ALWAYS rewrite query with at least ONE concrete improvement (even 0.1% counts)
 2. Replace SELECT * with explicit columns (reduces data transfer)
@@ -47,6 +56,8 @@ OPTIMIZATION RULES - ALWAYS FIND IMPROVEMENTS:
 7. Use covering indexes to avoid table lookups
 8. Detect: full table scans (type=ALL), filesort, temp tables, cross joins
 9. Never return original query unchanged - improve it
+10. Never recommend an index that already exists or whose columns are a left prefix of an existing index
+11. Use table rows and index cardinality to judge selectivity before suggesting an index
 
 RESPONSE FORMAT - RETURN VALID JSON ONLY:
 {{
@@ -54,7 +65,6 @@ RESPONSE FORMAT - RETURN VALID JSON ONLY:
   "why_faster": "explanation",
   "recommendations": ["tip1", "tip2", "tip3"],
   "warnings": ["warning1"],
-  "estimated_impact": "low|medium|high",
   "engine_advice": ["MariaDB specific advice"],
   "materialization_advice": ["advice"]
 }}
@@ -63,51 +73,96 @@ CRITICAL RULES:
 - optimized_query MUST be different from original query (show concrete improvements)
 - Recommendations MUST be 3+ specific actionable items
 - Even if query seems optimal, suggest indexes, explicit columns, or covering indexes
-- Estimate impact realistically based on EXPLAIN rows and scan types
+- optimized_query MUST be one statement of the same kind as the original (put index DDL in recommendations) so its EXPLAIN can be compared with the original
 - If SELECT *, ALWAYS rewrite with explicit columns
 - If type=ALL in EXPLAIN, MUST suggest indexes"""
+    return prompt
 
-    try:
-        logger.debug(f"Calling Groq API for query optimization")
-        resp = await call_claude_json(prompt, max_tokens=2000, temperature=0.3)
-        
-        if "error" in resp:
-            logger.warning(f"Query optimizer error: {resp.get('error')}")
-            return {
-                "status": "error",
-                "details": {
-                    "error": resp.get("error"),
-                    "optimized_query": sql,
-                    "recommendations": [],
-                    "warnings": ["Unable to optimize query"],
-                    "estimated_impact": "unknown"
-                }
-            }
-        
-        required_fields = ["optimized_query", "why_faster", "recommendations", "warnings", "estimated_impact"]
-        missing_fields = [f for f in required_fields if f not in resp]
-        
-        if missing_fields:
-            logger.warning(f"Query optimizer missing fields: {missing_fields}")
-        
-        resp.setdefault("optimized_query", sql)
-        resp.setdefault("why_faster", "Performance optimization analysis complete")
-        resp.setdefault("recommendations", ["Add indexes on JOIN and WHERE columns", "Consider using explicit columns instead of SELECT *", "Implement covering indexes for better query efficiency"])
-        resp.setdefault("warnings", [])
-        resp.setdefault("estimated_impact", "medium")
-        resp.setdefault("engine_advice", ["Use InnoDB for better concurrent access"])
-        resp.setdefault("materialization_advice", [])
-        
-        return {"status": "success", "details": resp}
-    except Exception as e:
-        logger.exception(f"Query optimization exception: {e}")
+
+def _result(resp: Dict[str, Any], sql: str) -> Dict[str, Any]:
+    """Agent result from the parsed model answer, with defaults for missing fields."""
+    if "error" in resp:
+        logger.warning(f"Query optimizer error: {resp.get('error')}")
         return {
             "status": "error",
             "details": {
-                "error": str(e),
+                "error": resp.get("error"),
                 "optimized_query": sql,
                 "recommendations": [],
-                "warnings": [f"Query optimization failed: {str(e)}"],
-                "estimated_impact": "unknown"
+                "warnings": ["Unable to optimize query"],
             }
         }
+    
+    required_fields = ["optimized_query", "why_faster", "recommendations", "warnings"]
+    missing_fields = [f for f in required_fields if f not in resp]
+    
+    if missing_fields:
+        logger.warning(f"Query optimizer missing fields: {missing_fields}")
+    
+    resp.setdefault("optimized_query", sql)
+    resp.setdefault("why_faster", "Performance optimization analysis complete")
+    resp.setdefault("recommendations", ["Add indexes on JOIN and WHERE columns", "Consider using explicit columns instead of SELECT *", "Implement covering indexes for better query efficiency"])
+    resp.setdefault("warnings", [])
+    resp.setdefault("engine_advice", ["Use InnoDB for better concurrent access"])
+    resp.setdefault("materialization_advice", [])
+    
+    return {"status": "success", "details": resp}
+
+
+def _exception_result(e: Exception, sql: str) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "details": {
+            "error": str(e),
+            "optimized_query": sql,
+            "recommendations": [],
+            "warnings": [f"Query optimization failed: {str(e)}"],
+        }
+    }
+
+
+async def optimize_query(sql: str,
+                   schema: Dict[str, Any],
+                   explain: Dict[str, Any],
+                   sample_rows: Dict[str, Any],
+                   target_engine: str = "mariadb",
+                   index_catalog: Dict[str, Any] = None,
+                   target_comparison: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Groq-powered Query Optimizer (MariaDB-focused)
+    - Calls Groq with schema + existing indexes/table stats + EXPLAIN + SQL
+    - Expects structured JSON with optimized query, recommendations, warnings, etc.
+    - Impact is not asked of the model: agents.plan_diff measures it from the EXPLAIN of the rewrite
+    """
+    prompt = build_prompt(sql, schema, explain, sample_rows, index_catalog, target_comparison)
+    try:
+        logger.debug(f"Calling Groq API for query optimization")
+        resp = await call_claude_json(prompt, max_tokens=2000, temperature=0.3, agent="query_optimizer", schema=OptimizerOutput)
+        return _result(resp, sql)
+    except Exception as e:
+        logger.exception(f"Query optimization exception: {e}")
+        return _exception_result(e, sql)
+
+
+async def stream_optimize_query(sql: str,
+                                schema: Dict[str, Any],
+                                explain: Dict[str, Any],
+                                sample_rows: Dict[str, Any],
+                                target_engine: str = "mariadb",
+                                index_catalog: Dict[str, Any] = None,
+                                target_comparison: Dict[str, Any] = None):
+    """
+    Streaming ``optimize_query``: yields ``{"type": "field", "key", "value"}`` as the model
+    completes each top-level field (``optimized_query`` is usually first), then
+    ``{"type": "result", "result": ...}`` with the same dict ``optimize_query`` returns.
+    """
+    prompt = build_prompt(sql, schema, explain, sample_rows, index_catalog, target_comparison)
+    try:
+        async for event in stream_claude_json(prompt, max_tokens=2000, temperature=0.3, agent="query_optimizer", schema=OptimizerOutput):
+            if event["type"] == "field":
+                yield event
+            else:
+                yield {"type": "result", "result": _result(event["data"], sql)}
+    except Exception as e:
+        logger.exception(f"Query optimization exception: {e}")
+        yield {"type": "result", "result": _exception_result(e, sql)}
@@ -3,6 +3,7 @@ import json
 import logging
 import re
 from utils.claude_client import call_claude_json
+from utils.llm_schemas import SchemaOutput, UnsafeOutput
 
 logger = logging.getLogger(__name__)
 FORBIDDEN = ["insert", "update", "delete", "drop", "truncate", "alter", "create", "replace"]
@@ -11,7 +12,37 @@ def _is_safe(sql: str):
     q = sql.lower()
     return not any(re.search(rf"\b{kw}\b", q) for kw in FORBIDDEN)
 
-async def advise_schema(sql: str, schema: dict):
+CREATE_INDEX_RE = re.compile(r"create\s+(?:unique\s+)?index\s+`?\w+`?\s+on\s+`?(?:\w+`?\.`?)?(\w+)`?\s*\(([^)]*)\)", re.IGNORECASE)
+
+def _drop_existing_indexes(recommended: list, index_catalog: dict):
+    """Split recommendations into (new, already_covered) using the existing index catalog.
+
+    A recommendation is covered when an existing index on the same table starts with
+    the same columns in the same order.
+    """
+    if not index_catalog or not isinstance(index_catalog, dict) or "error" in index_catalog:
+        return recommended, []
+    # Table names are compared case-insensitively, as in workload_advisor and index_auditor
+    catalog = {name.lower(): entry for name, entry in index_catalog.items()}
+    kept, covered = [], []
+    for stmt in recommended:
+        match = CREATE_INDEX_RE.search(stmt) if isinstance(stmt, str) else None
+        table = match and catalog.get(match.group(1).lower())
+        if not table:
+            kept.append(stmt)
+            continue
+        cols = [c.strip().strip("`").split("(")[0].split()[0].lower() for c in match.group(2).split(",") if c.strip()]
+        existing = (
+            [c.split("(")[0].lower() for c in idx.get("columns", [])]
+            for idx in table.get("indexes", [])
+        )
+        if any(e[:len(cols)] == cols for e in existing):
+            covered.append(stmt)
+        else:
+            kept.append(stmt)
+    return kept, covered
+
+async def advise_schema(sql: str, schema: dict, index_catalog: dict = None):
     base = {"agent": "schema_advisor", "status": None, "query": sql, "safe_query": None, "details": {}}
     
     if not _is_safe(sql):
@@ -21,7 +52,7 @@ Return JSON with safe SELECT equivalent:
 {{ "safe_preview": "SELECT ...", "explanation": "Why it's unsafe" }}"""
         
         try:
-            resp = await call_claude_json(prompt, max_tokens=400)
+            resp = await call_claude_json(prompt, max_tokens=400, agent="schema_advisor", schema=UnsafeOutput)
             if "error" in resp:
                 return {**base, "status": "error", "details": {"error": resp.get("error")}}
             return {**base, "status": "unsafe", "safe_query": resp.get("safe_preview", ""), "details": {"reasoning": resp.get("explanation", "Query contains unsafe operations")}}
@@ -30,6 +61,7 @@ Return JSON with safe SELECT equivalent:
             return {**base, "status": "unsafe", "safe_query": "", "details": {"reasoning": "Query contains unsafe operations"}}
 
     schema_str = json.dumps(schema, indent=2, default=str) if schema and isinstance(schema, dict) else "Schema unavailable"
+    catalog_str = json.dumps(index_catalog, separators=(",", ":"), default=str) if index_catalog and isinstance(index_catalog, dict) and "error" not in index_catalog else "Index catalog unavailable"
     
     prompt = f"""You are a Schema Advisor for MariaDB/MySQL. Suggest schema improvements for query performance.
 
@@ -39,7 +71,11 @@ SQL:
 SCHEMA:
 {schema_str}
 
+EXISTING INDEXES & TABLE STATS (table rows, avg row/data/index bytes; index columns in order with per-prefix cardinality):
+{catalog_str}
+
 TASK: Suggest indexes, partitioning, column type optimizations for faster queries.
+Never recommend an index whose columns are already covered, in the same order, by an existing index.
 Focus on: BTREE indexes for InnoDB, partitioning for large tables, VARCHAR vs TEXT, DECIMAL precision.
 Consider denormalization for costly joins or normalization for redundancy.
 
@@ -54,16 +90,21 @@ If no changes needed, return valid JSON with empty arrays."""
     
     try:
         logger.debug("Calling Groq API for schema analysis")
-        resp = await call_claude_json(prompt, max_tokens=1000, temperature=0.3)
+        resp = await call_claude_json(prompt, max_tokens=1000, temperature=0.3, agent="schema_advisor", schema=SchemaOutput)
         
         if "error" in resp:
             logger.warning(f"Schema advisor error: {resp.get('error')}")
             return {**base, "status": "error", "details": {"error": resp.get("error")}}
         
+        recommended, covered = _drop_existing_indexes(resp.get("recommended_indexes", []), index_catalog)
+        warnings = resp.get("warnings", [])
+        if covered:
+            logger.info(f"Dropped {len(covered)} index recommendations already covered by existing indexes")
+            warnings = warnings + [f"Skipped (already covered by an existing index): {stmt}" for stmt in covered]
         details = {
-            "recommended_indexes": resp.get("recommended_indexes", []),
+            "recommended_indexes": recommended,
             "schema_changes": resp.get("schema_changes", []),
-            "warnings": resp.get("warnings", [])
+            "warnings": warnings
         }
         return {**base, "status": "success", "details": details}
     except Exception as e:
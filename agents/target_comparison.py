@@ -0,0 +1,156 @@
+# agents/target_comparison.py
+import json
+from agents.plan_diff import summarize_plan, estimated_work
+
+# Table row counts, index cardinalities or plan work differing by more than this factor across targets are drift
+DRIFT_FACTOR = 2.0
+
+
+def _unique_labels(labels):
+    seen = {}
+    out = []
+    for label in labels:
+        seen[label] = seen.get(label, 0) + 1
+        out.append(label if seen[label] == 1 else f"{label}#{seen[label]}")
+    return out
+
+
+def _ok(value, kind):
+    return isinstance(value, kind) and not (isinstance(value, dict) and "error" in value)
+
+
+def _spread(values: dict):
+    """max / min of the positive values in ``{label: n}``, or None when fewer than two can be compared."""
+    known = [float(v) for v in values.values() if v]
+    if len(known) < 2:
+        return None
+    return max(known) / min(known)
+
+
+def _columns(schema_context) -> dict:
+    """``{table: {column: "type null key"}}`` from DESCRIBE rows."""
+    return {
+        table: {r.get("Field"): f"{r.get('Type')} {'NULL' if r.get('Null') == 'YES' else 'NOT NULL'} {r.get('Key') or ''}".strip()
+                for r in rows}
+        for table, rows in schema_context.items() if isinstance(rows, list)
+    }
+
+
+def _indexes(index_catalog) -> dict:
+    return {
+        table: {i["name"]: ("UNIQUE " if i.get("unique") else "") + f"({', '.join(i['columns'])})"
+                for i in entry.get("indexes", [])}
+        for table, entry in index_catalog.items() if isinstance(entry, dict)
+    }
+
+
+def _schema_differences(primary, other) -> list:
+    """What ``other`` has differently from ``primary``, per table: missing/extra/changed columns and indexes."""
+    diffs = []
+    for kind, a_all, b_all in (("column", _columns(primary["schema_context"]), _columns(other["schema_context"])),
+                               ("index", _indexes(primary["index_catalog"]), _indexes(other["index_catalog"]))):
+        for table in sorted(set(a_all) | set(b_all)):
+            a, b = a_all.get(table, {}), b_all.get(table, {})
+            for name in sorted(set(a) | set(b)):
+                if name not in b:
+                    diffs.append({"table": table, kind: name, "change": "missing", "primary": a[name]})
+                elif name not in a:
+                    diffs.append({"table": table, kind: name, "change": "extra", "target": b[name]})
+                elif a[name] != b[name]:
+                    diffs.append({"table": table, kind: name, "change": "differs", "primary": a[name], "target": b[name]})
+    return diffs
+
+
+def compare_targets(targets: list) -> dict:
+    """Side-by-side view of one query on several targets (replicas or shards), the primary first.
+
+    ``targets`` holds ``{"target", "schema_context", "index_catalog", "explain"}`` per target, or ``{"target",
+    "error"}`` for one that could not be read. Returns the per-target plan summary and modelled work
+    (``agents.plan_diff``), then what diverges: tables whose access type or key differs between plans, column and
+    index differences from the primary, and table rows, index cardinalities or plan work that differ by more than
+    ``DRIFT_FACTOR``.
+    """
+    labels = _unique_labels([t["target"] for t in targets])
+    summaries, plans = [], {}
+    for label, t in zip(labels, targets):
+        if "error" in t:
+            summaries.append({"target": label, "status": "error", "error": t["error"]})
+            continue
+        entry = {"target": label, "status": "success"}
+        if _ok(t.get("explain"), list):
+            plans[label] = summarize_plan(t["explain"])
+            entry["plan"] = [{k: e[k] for k in ("table", "type", "key", "rows")} for e in plans[label]]
+            entry["estimated_work"] = estimated_work(t["explain"])["work"]
+        elif t.get("explain"):
+            entry["explain_error"] = t["explain"].get("error") if isinstance(t["explain"], dict) else str(t["explain"])
+        if _ok(t.get("index_catalog"), dict):
+            entry["table_rows"] = {table: e.get("rows") for table, e in t["index_catalog"].items() if isinstance(e, dict)}
+        summaries.append(entry)
+
+    # Tables whose plans group the targets in more than one (access type, key) way
+    plan_divergence = []
+    tables = list(dict.fromkeys(e["table"] for plan in plans.values() for e in plan))
+    for table in tables:
+        groups = {}
+        for label, plan in plans.items():
+            e = next((e for e in plan if e["table"] == table), None)
+            shape = (e["type"], e["key"]) if e else (None, None)
+            groups.setdefault(shape, []).append({"target": label, "rows": e["rows"] if e else None})
+        if len(groups) > 1:
+            plan_divergence.append({"table": table, "plans": [
+                {"type": shape[0], "key": shape[1], "targets": [m["target"] for m in members],
+                 "rows": {m["target"]: m["rows"] for m in members}}
+                for shape, members in groups.items()
+            ]})
+
+    readable = [(label, t) for label, t in zip(labels, targets)
+                if "error" not in t and _ok(t.get("schema_context"), dict) and _ok(t.get("index_catalog"), dict)]
+    schema_divergence = []
+    if readable:
+        primary = readable[0][1]
+        for label, t in readable[1:]:
+            differences = _schema_differences(primary, t)
+            if differences:
+                schema_divergence.append({"target": label, "differences": differences})
+
+    stats_drift = []
+    table_rows = {}
+    cardinality = {}
+    for label, t in readable:
+        for table, entry in t["index_catalog"].items():
+            if not isinstance(entry, dict):
+                continue
+            table_rows.setdefault(table, {})[label] = entry.get("rows")
+            for index in entry.get("indexes", []):
+                # Cardinality of the full key: the last column's
+                if index.get("cardinality"):
+                    cardinality.setdefault((table, index["name"]), {})[label] = index["cardinality"][-1]
+    for table, rows in table_rows.items():
+        spread = _spread(rows)
+        if spread and spread > DRIFT_FACTOR:
+            stats_drift.append({"table": table, "stat": "rows", "values": rows, "spread": round(spread, 2)})
+    for (table, index), values in cardinality.items():
+        spread = _spread(values)
+        if spread and spread > DRIFT_FACTOR:
+            stats_drift.append({"table": table, "index": index, "stat": "cardinality", "values": values,
+                                "spread": round(spread, 2)})
+
+    work = {s["target"]: s["estimated_work"] for s in summaries if "estimated_work" in s}
+    work_spread = _spread(work)
+    return {
+        "targets": summaries,
+        "plan_divergence": plan_divergence,
+        "schema_divergence": schema_divergence,
+        "stats_drift": stats_drift,
+        "work_spread": round(work_spread, 2) if work_spread else None,
+        "diverged": bool(plan_divergence or schema_divergence or (work_spread and work_spread > DRIFT_FACTOR)),
+    }
+
+
+def comparison_text(comparison: dict) -> str:
+    """Compact JSON of a ``compare_targets`` result for a prompt: per-target work and errors, then the divergence."""
+    targets = [{k: t[k] for k in ("target", "estimated_work", "error", "explain_error") if k in t}
+               for t in comparison["targets"]]
+    return json.dumps({"targets": targets, **{k: comparison[k] for k in
+                                               ("plan_divergence", "schema_divergence", "stats_drift", "work_spread")}},
+                      separators=(",", ":"), default=str)
@@ -0,0 +1,609 @@
+# agents/workload_advisor.py
+import math
+import re
+import logging
+from utils.sql_tokenizer import Token, tokenize, fingerprint, fingerprint_id, statement_type, WRITE_TYPES
+
+logger = logging.getLogger(__name__)
+
+# What-if cost model. Costs are in "rows examined"; the constants are deliberately
+# simple so recommendations are reproducible and easy to reason about.
+DEFAULT_EQ_SELECTIVITY = 0.05   # equality on a column with no cardinality statistics
+RANGE_SELECTIVITY = 0.3         # <, >, BETWEEN, LIKE 'prefix%'
+SORT_COST_FACTOR = 0.1          # filesort: factor * rows * log2(rows)
+WRITE_COST_ROWS = 5.0           # maintaining one secondary index on one write
+MAX_INDEX_COLUMNS = 4
+ROW_OVERHEAD_BYTES = 13         # InnoDB record header + page directory share
+PAGE_FILL = 0.7                 # typical B-tree page fill after random inserts
+DEFAULT_TABLE_ROWS = 1000
+MAX_REPORTED_FINGERPRINTS = 100
+
+KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "like", "between", "join", "inner",
+    "left", "right", "outer", "cross", "natural", "straight_join", "on", "using", "group", "order", "by",
+    "having", "limit", "offset", "as", "asc", "desc", "union", "all", "distinct", "exists", "case", "when",
+    "then", "else", "end", "insert", "into", "values", "value", "update", "set", "delete", "replace", "with",
+    "interval", "true", "false", "force", "use", "ignore", "index", "key", "for", "lock", "share", "mode",
+    "window", "over", "partition", "div", "mod", "xor", "regexp", "rlike", "escape", "binary", "collate",
+    "duplicate", "low_priority", "high_priority", "quick", "returning", "recursive", "any", "some",
+}
+CONSTANT_WORDS = {"null", "true", "false", "current_date", "current_time", "current_timestamp", "interval"}
+EQ_OPS = {"=", "<=>"}
+RANGE_OPS = {"<", ">", "<=", ">="}
+DOT = Token("punct", ".")
+
+_FIXED_WIDTHS = {
+    "tinyint": 1, "smallint": 2, "mediumint": 3, "int": 4, "integer": 4, "bigint": 8,
+    "float": 4, "double": 8, "real": 8, "date": 3, "time": 3, "year": 1, "datetime": 5,
+    "timestamp": 4, "bool": 1, "boolean": 1, "enum": 2, "set": 8, "bit": 8, "uuid": 16,
+}
+_TYPE_RE = re.compile(r"^(\w+)(?:\((\d+)(?:,\s*(\d+))?\))?")
+
+
+# --- Parsing ---
+
+def _name_at(tokens, i):
+    """Read ``name`` / ``qualifier.name`` at ``i``: ``(qualifier, name, next_i)`` or ``None``."""
+    if i >= len(tokens):
+        return None
+    tok = tokens[i]
+    if tok.kind not in ("word", "ident") or (tok.kind == "word" and tok.value in KEYWORDS):
+        return None
+    parts = [tok.value.lower()]
+    j = i + 1
+    while j + 1 < len(tokens) and tokens[j] == DOT and tokens[j + 1].kind in ("word", "ident"):
+        parts.append(tokens[j + 1].value.lower())
+        j += 2
+    qualifier = parts[-2] if len(parts) > 1 else None
+    return qualifier, parts[-1], j
+
+
+def _column_at(tokens, i):
+    """Like ``_name_at`` but rejects function calls (``name(``)."""
+    ref = _name_at(tokens, i)
+    if ref is None:
+        return None
+    if ref[2] < len(tokens) and tokens[ref[2]] == Token("punct", "("):
+        return None
+    return ref
+
+
+def _is_value(tokens, i):
+    """Index after a constant expression at ``i`` (literal, parameter, constant function), else ``None``."""
+    if i >= len(tokens):
+        return None
+    tok = tokens[i]
+    if tok.kind in ("string", "number", "param", "var"):
+        return i + 1
+    if tok.kind == "op" and tok.value in ("-", "+") and i + 1 < len(tokens) and tokens[i + 1].kind == "number":
+        return i + 2
+    if tok.kind == "word" and tok.value in CONSTANT_WORDS:
+        return i + 1
+    if tok.kind == "word" and i + 1 < len(tokens) and tokens[i + 1] == Token("punct", "("):
+        depth = 0
+        for j in range(i + 1, len(tokens)):
+            if tokens[j] == Token("punct", "("):
+                depth += 1
+            elif tokens[j] == Token("punct", ")"):
+                depth -= 1
+                if depth == 0:
+                    return j + 1
+    return None
+
+
+def _read_predicate(tokens, i, preds):
+    """Record the predicate starting at ``i`` (if it is indexable); return the next index."""
+    n = len(tokens)
+    left = _column_at(tokens, i)
+    if left is None:
+        # reversed form: 10 < col
+        after = _is_value(tokens, i)
+        if after is not None and after + 1 < n and tokens[after].kind == "op":
+            right = _column_at(tokens, after + 1)
+            if right:
+                kind = "eq" if tokens[after].value in EQ_OPS else "range" if tokens[after].value in RANGE_OPS else None
+                if kind:
+                    preds.append((kind, right[:2]))
+                return right[2]
+        return i + 1
+    j = left[2]
+    if j >= n:
+        return j
+    tok = tokens[j]
+    col = left[:2]
+    if tok.kind == "op" and (tok.value in EQ_OPS or tok.value in RANGE_OPS):
+        kind = "eq" if tok.value in EQ_OPS else "range"
+        right = _column_at(tokens, j + 1)
+        if right:
+            if kind == "eq":
+                preds.append(("join", col, right[:2]))
+            return right[2]
+        if _is_value(tokens, j + 1) is not None:
+            preds.append((kind, col))
+        return j + 1
+    if tok.kind != "word":
+        return j
+    if tok.value == "in":
+        preds.append(("eq", col))
+    elif tok.value == "between":
+        preds.append(("range", col))
+    elif tok.value == "like" and j + 1 < n and tokens[j + 1].kind == "string":
+        if tokens[j + 1].value[1:2] not in ("%", "_"):
+            preds.append(("range", col))
+    elif tok.value == "is" and j + 1 < n and tokens[j + 1].value == "null":
+        preds.append(("eq", col))
+    return j + 1
+
+
+def extract_access_patterns(sql: str, columns_by_table: dict = None):
+    """Indexable access patterns of one statement, per table.
+
+    Returns ``{"type", "tables": [...], "patterns": {table: {eq, range, join, order, group, set}}}``.
+    Column references are resolved through aliases; unqualified columns are attributed
+    to the only table in the statement, or to the single table whose columns
+    (``columns_by_table``) contain them.
+    """
+    tokens = tokenize(sql)
+    stype = statement_type(tokens)
+    aliases, tables = {}, []
+    preds, set_cols = [], []
+    lists = {"order": [], "group": []}
+    bad_lists = set()
+    clause = None
+    element_start = False
+    n = len(tokens)
+    i = 0
+    while i < n:
+        tok = tokens[i]
+        if tok.kind == "word" and tok.value in KEYWORDS:
+            w = tok.value
+            nxt = tokens[i + 1].value if i + 1 < n else None
+            if w in ("from", "join", "straight_join", "into") or (w == "update" and stype == "update"):
+                clause = "table_ref"
+            elif w in ("where", "on", "having"):
+                clause = "pred"
+            elif w in ("order", "group") and nxt == "by":
+                clause, element_start = w, True
+                i += 2
+                continue
+            elif w == "set" and stype == "update":
+                clause, element_start = "set", True
+            elif w in ("select", "limit", "union", "values", "value", "using", "returning", "duplicate"):
+                clause = None
+            elif w == "desc" and clause in ("order", "group") and lists[clause]:
+                lists[clause][-1].append("desc")
+            i += 1
+            continue
+
+        if clause == "table_ref":
+            ref = _name_at(tokens, i)
+            if ref is None:
+                if tok == Token("punct", "("):
+                    clause = None  # derived table or column list
+                i += 1
+                continue
+            table = ref[1]
+            j = ref[2]
+            if j < n and tokens[j] == Token("word", "as"):
+                j += 1
+            alias = _name_at(tokens, j)
+            if alias and alias[0] is None:
+                aliases[alias[1]] = table
+                j = alias[2]
+            aliases[table] = table
+            if table not in tables:
+                tables.append(table)
+            if j < n and tokens[j] == Token("punct", ","):
+                j += 1
+            else:
+                clause = "after_table"
+            i = j
+            continue
+
+        if clause == "pred":
+            i = _read_predicate(tokens, i, preds)
+            continue
+
+        if clause in ("order", "group", "set"):
+            if tok == Token("punct", ","):
+                element_start = True
+                i += 1
+                continue
+            if element_start:
+                element_start = False
+                ref = _column_at(tokens, i)
+                if clause == "set":
+                    if ref and ref[2] < n and tokens[ref[2]] == Token("op", "="):
+                        set_cols.append(ref[:2])
+                    i = ref[2] if ref else i + 1
+                    continue
+                ends = ref and (ref[2] >= n or tokens[ref[2]] in (Token("punct", ","), Token("punct", ")"), Token("punct", ";"))
+                                or tokens[ref[2]].value in KEYWORDS)
+                if ends:
+                    lists[clause].append([ref[:2]])
+                    i = ref[2]
+                    continue
+            if clause != "set":
+                bad_lists.add(clause)
+            i += 1
+            continue
+        i += 1
+
+    columns_by_table = {t.lower(): {c.lower() for c in cols} for t, cols in (columns_by_table or {}).items()}
+    distinct_tables = sorted(set(aliases.values()))
+
+    def resolve(ref):
+        qualifier, name = ref
+        if qualifier:
+            return aliases.get(qualifier)
+        if len(distinct_tables) == 1:
+            return distinct_tables[0]
+        owners = [t for t in distinct_tables if name in columns_by_table.get(t, ())]
+        return owners[0] if len(owners) == 1 else None
+
+    patterns = {t: {"eq": [], "range": [], "join": [], "order": [], "group": [], "set": []} for t in tables}
+
+    def add(table, key, name):
+        if table in patterns and name not in patterns[table][key]:
+            patterns[table][key].append(name)
+
+    for pred in preds:
+        if pred[0] == "join":
+            lt, rt = resolve(pred[1]), resolve(pred[2])
+            if lt and rt and lt != rt:
+                add(lt, "join", pred[1][1])
+                add(rt, "join", pred[2][1])
+        else:
+            table = resolve(pred[1])
+            if table:
+                add(table, pred[0], pred[1][1])
+    for ref in set_cols:
+        add(resolve(ref) or (tables[0] if tables else None), "set", ref[1])
+    for key in ("order", "group"):
+        items = lists[key]
+        if not items or key in bad_lists:
+            continue
+        owners = {resolve(item[0]) for item in items}
+        directions = {len(item) > 1 for item in items}
+        if len(owners) == 1 and None not in owners and len(directions) == 1:
+            table = owners.pop()
+            for item in items:
+                add(table, key, item[0][1])
+    return {"type": stype, "tables": tables, "patterns": patterns}
+
+
+def build_workload(queries):
+    """Group raw statements by fingerprint, summing frequencies (most frequent first)."""
+    grouped = {}
+    for q in queries:
+        sql = (q.get("sql") or "").strip()
+        if not sql:
+            continue
+        fp = fingerprint(sql)
+        entry = grouped.get(fp)
+        if entry is None:
+            grouped[fp] = entry = {
+                "fingerprint_id": fingerprint_id(sql),
+                "fingerprint": fp,
+                "sql": sql,
+                "type": statement_type(sql),
+                "frequency": 0.0,
+            }
+        entry["frequency"] += float(q.get("frequency", 1) or 0)
+    return sorted(grouped.values(), key=lambda e: (-e["frequency"], e["fingerprint"]))
+
+
+# --- Cost model ---
+
+def column_width(column_type: str) -> int:
+    """Approximate bytes one value of ``column_type`` occupies in an index record."""
+    match = _TYPE_RE.match((column_type or "").lower())
+    if not match:
+        return 8
+    base, length, _ = match.group(1), match.group(2), match.group(3)
+    if base in _FIXED_WIDTHS:
+        return _FIXED_WIDTHS[base]
+    if base in ("decimal", "numeric"):
+        return int(length or 10) // 2 + 1
+    if base in ("char", "binary"):
+        return int(length or 1)
+    if base in ("varchar", "varbinary"):
+        # assume half full; InnoDB index prefixes top out at 767/3072 bytes anyway
+        return min(int(length or 255), 767) // 2 + 2
+    if base.endswith("text") or base.endswith("blob") or base == "json":
+        return 257
+    return 8
+
+
+class TableModel:
+    """Row count, column widths and known cardinalities of one table, from the index catalog."""
+
+    def __init__(self, name, catalog_entry, columns):
+        catalog_entry = catalog_entry or {}
+        self.name = name
+        self.rows = max(1, int(catalog_entry.get("rows") or DEFAULT_TABLE_ROWS))
+        self.indexes = [
+            [c.split("(")[0].lower() for c in idx.get("columns", [])]
+            for idx in catalog_entry.get("indexes", [])
+            if idx.get("type") in (None, "BTREE")
+        ]
+        self.columns = {(c.get("COLUMN_NAME") or "").lower(): c for c in columns or []}
+        self.ndv = {}
+        for idx in catalog_entry.get("indexes", []):
+            cols = [c.split("(")[0].lower() for c in idx.get("columns", [])]
+            card = idx.get("cardinality") or []
+            if cols and card and card[0]:
+                self.ndv[cols[0]] = max(self.ndv.get(cols[0], 0), int(card[0]))
+            if idx.get("unique") and len(cols) == 1:
+                self.ndv[cols[0]] = self.rows
+        primary = next((idx for idx in catalog_entry.get("indexes", []) if idx.get("name") == "PRIMARY"), None)
+        pk_cols = [c.split("(")[0].lower() for c in primary["columns"]] if primary else []
+        self.pk_width = sum(self.width(c) for c in pk_cols) if pk_cols else 6  # implicit row id
+
+    def selectivity(self, column):
+        ndv = self.ndv.get(column)
+        sel = 1.0 / ndv if ndv else DEFAULT_EQ_SELECTIVITY
+        return max(sel, 1.0 / self.rows)
+
+    def width(self, column):
+        col = self.columns.get(column)
+        return column_width(col.get("COLUMN_TYPE") or col.get("DATA_TYPE")) if col else 8
+
+    def index_size(self, cols):
+        per_row = sum(self.width(c) for c in cols) + self.pk_width + ROW_OVERHEAD_BYTES
+        return int(self.rows * per_row / PAGE_FILL)
+
+    def covered(self, cols):
+        """True when an existing index starts with ``cols``."""
+        return any(existing[:len(cols)] == list(cols) for existing in self.indexes)
+
+
+def _sort_cost(rows):
+    return SORT_COST_FACTOR * rows * math.log2(rows + 1)
+
+
+def access_cost(pattern, cols, table: TableModel):
+    """Estimated rows examined (plus sort work) for ``pattern`` through an index on ``cols``.
+
+    Returns ``None`` when the index cannot be used for the pattern at all.
+    """
+    eq = set(pattern["eq"]) | set(pattern["join"])
+    sel, k = 1.0, 0
+    for c in cols:
+        if c not in eq:
+            break
+        sel *= table.selectivity(c)
+        k += 1
+    used_range = k < len(cols) and cols[k] in pattern["range"]
+    if used_range:
+        sel *= RANGE_SELECTIVITY
+    order = [c for c in pattern["order"] if c not in cols[:k]]
+    sorted_by_index = bool(pattern["order"]) and cols[k:k + len(order)] == order
+    if k == 0 and not used_range and not sorted_by_index:
+        return None
+    est = max(1.0, table.rows * max(sel, 1.0 / table.rows))
+    if pattern["order"] and not sorted_by_index:
+        est += _sort_cost(est)
+    return est
+
+
+def _explain_rows(explain, table):
+    """(rows, filesort) for ``table`` from EXPLAIN output, or ``None`` when it is absent."""
+    if not isinstance(explain, list):
+        return None
+    filesort = any("filesort" in str(r.get("Extra") or "").lower() for r in explain)
+    for r in explain:
+        if str(r.get("table") or "").lower() == table and r.get("rows") is not None:
+            return float(r["rows"]), filesort
+    return None
+
+
+def _candidate_columns(pattern, usage, table: TableModel):
+    """Candidate index column lists for one pattern, most shareable columns first."""
+    eq = pattern["eq"] + [c for c in pattern["join"] if c not in pattern["eq"]]
+    eq = sorted(eq, key=lambda c: (-usage.get(c, 0), table.selectivity(c), c))
+    lists = []
+    if eq:
+        lists.append(eq)
+    for r in pattern["range"][:2]:
+        if r not in eq:
+            lists.append(eq + [r])
+    for key in ("order", "group"):
+        tail = [c for c in pattern[key] if c not in eq]
+        if pattern[key] and tail:
+            lists.append(eq + tail)
+    out = []
+    for cols in lists:
+        cols = cols[:MAX_INDEX_COLUMNS]
+        if table.columns:
+            cols = [c for c in cols if c in table.columns]
+        if cols and cols not in out:
+            out.append(cols)
+    return out
+
+
+def _index_name(table, cols):
+    return f"idx_{table}_{'_'.join(cols)}"[:64]
+
+
+def advise_workload(workload, index_catalog: dict, columns: dict = None, explains: dict = None,
+                    storage_budget_bytes: float = None, write_budget: float = None, max_indexes: int = 10):
+    """Choose a small set of new indexes for a whole workload, without an LLM.
+
+    ``workload`` is the output of ``build_workload``; ``explains`` maps fingerprint ids
+    to EXPLAIN rows (used as the current cost where available). Candidates come from
+    equality/join predicates, ranges, ORDER BY and GROUP BY; each is costed with the
+    what-if model above and picked greedily by net benefit (per byte when a storage
+    budget is set). Ties break on table and column names, so output is deterministic.
+    """
+    base = {"agent": "workload_advisor", "status": None, "details": {}}
+    catalog = {k.lower(): v for k, v in (index_catalog or {}).items()} if isinstance(index_catalog, dict) and "error" not in index_catalog else {}
+    columns = {k.lower(): v for k, v in (columns or {}).items()}
+    explains = explains or {}
+    column_names = {t: [c.get("COLUMN_NAME") for c in cols] for t, cols in columns.items()}
+
+    models, items, writes, unparsed = {}, [], [], 0
+    for q in workload:
+        parsed = extract_access_patterns(q["sql"], column_names)
+        if not parsed["tables"]:
+            unparsed += 1
+            continue
+        for t in parsed["tables"]:
+            if t not in models:
+                models[t] = TableModel(t, catalog.get(t), columns.get(t))
+        if parsed["type"] in WRITE_TYPES:
+            for t in parsed["tables"][:1]:
+                writes.append((q, parsed["type"], t, set(parsed["patterns"].get(t, {}).get("set", []))))
+        for t, pattern in parsed["patterns"].items():
+            if parsed["type"] in ("insert", "replace") and t == parsed["tables"][0]:
+                continue  # the target of an insert is written, not searched
+            table = models[t]
+            seen = _explain_rows(explains.get(q["fingerprint_id"]), t)
+            if seen:
+                current = seen[0] + (_sort_cost(seen[0]) if seen[1] and pattern["order"] else 0)
+            else:
+                existing = [c for c in (access_cost(pattern, cols, table) for cols in table.indexes) if c is not None]
+                full = table.rows + (_sort_cost(table.rows) if pattern["order"] else 0)
+                current = min(existing + [full])
+            items.append({"query": q, "table": t, "pattern": pattern, "baseline": current})
+
+    # Frequency-weighted column usage decides the column order of composite candidates
+    usage = {}
+    for item in items:
+        for c in item["pattern"]["eq"] + item["pattern"]["join"]:
+            key = usage.setdefault(item["table"], {})
+            key[c] = key.get(c, 0) + item["query"]["frequency"]
+
+    candidates = {}
+    for item in items:
+        table = models[item["table"]]
+        for cols in _candidate_columns(item["pattern"], usage.get(item["table"], {}), table):
+            key = (item["table"], tuple(cols))
+            if key in candidates or table.covered(cols):
+                continue
+            candidates[key] = {
+                "table": item["table"], "columns": cols, "serves": [], "size": table.index_size(cols),
+                "write_ops": sum(q["frequency"] for q, kind, t, set_cols in writes
+                                 if t == item["table"] and (kind != "update" or set_cols & set(cols))),
+            }
+    # Every candidate is costed against every pattern on its table, not just the one that proposed it
+    for (t, _), cand in candidates.items():
+        for n, item in enumerate(items):
+            if item["table"] == t:
+                cost = access_cost(item["pattern"], cand["columns"], models[t])
+                if cost is not None:
+                    cand["serves"].append((n, cost))
+
+    current = [item["baseline"] for item in items]
+
+    def gain(cand):
+        return sum(items[n]["query"]["frequency"] * (current[n] - cost)
+                   for n, cost in cand["serves"] if cost < current[n])
+
+    chosen, used_bytes, used_writes, rejected = [], 0, 0.0, {}
+    pool = sorted(candidates.values(), key=lambda c: (c["table"], c["columns"]))
+    while len(chosen) < max_indexes:
+        best, best_key = None, None
+        for cand in pool:
+            if cand in chosen:
+                continue
+            net = gain(cand) - cand["write_ops"] * WRITE_COST_ROWS
+            if net <= 0:
+                continue
+            if storage_budget_bytes is not None and used_bytes + cand["size"] > storage_budget_bytes:
+                rejected[(cand["table"], tuple(cand["columns"]))] = "storage_budget"
+                continue
+            if write_budget is not None and used_writes + cand["write_ops"] > write_budget:
+                rejected[(cand["table"], tuple(cand["columns"]))] = "write_budget"
+                continue
+            score = net / max(cand["size"], 1) if storage_budget_bytes is not None else net
+            key = (-score, cand["size"], cand["table"], cand["columns"])
+            if best_key is None or key < best_key:
+                best, best_key = cand, key
+        if best is None:
+            break
+        best["benefit"] = gain(best)
+        for n, cost in best["serves"]:
+            current[n] = min(current[n], cost)
+        chosen.append(best)
+        used_bytes += best["size"]
+        used_writes += best["write_ops"]
+        rejected.pop((best["table"], tuple(best["columns"])), None)
+
+    # Drop picks made redundant by later, wider picks (e.g. (a) once (a, b) is chosen)
+    for cand in list(reversed(chosen)):
+        others = [c for c in chosen if c is not cand]
+        loss = 0.0
+        for n, cost in cand["serves"]:
+            alternatives = [items[n]["baseline"]] + [c2 for o in others for m, c2 in o["serves"] if m == n]
+            loss += items[n]["query"]["frequency"] * max(0.0, min(alternatives) - current[n])
+        if loss <= cand["write_ops"] * WRITE_COST_ROWS:
+            chosen.remove(cand)
+            used_bytes -= cand["size"]
+            used_writes -= cand["write_ops"]
+            for n, _ in cand["serves"]:
+                current[n] = min([items[n]["baseline"]] + [c2 for o in chosen for m, c2 in o["serves"] if m == n])
+
+    if len(chosen) >= max_indexes:
+        for cand in pool:
+            key = (cand["table"], tuple(cand["columns"]))
+            if cand not in chosen and key not in rejected and gain(cand) - cand["write_ops"] * WRITE_COST_ROWS > 0:
+                rejected[key] = "max_indexes"
+
+    recommended = []
+    for cand in chosen:
+        helped = sorted({items[n]["query"]["fingerprint_id"] for n, cost in cand["serves"] if cost <= current[n]})
+        recommended.append({
+            "table": cand["table"],
+            "columns": cand["columns"],
+            "ddl": f"CREATE INDEX `{_index_name(cand['table'], cand['columns'])}` ON `{cand['table']}` "
+                   f"({', '.join(f'`{c}`' for c in cand['columns'])})",
+            "estimated_size_bytes": cand["size"],
+            "write_ops": round(cand["write_ops"], 3),
+            "benefit_rows": round(cand.get("benefit", 0.0), 3),
+            "queries_helped": len(helped),
+            "fingerprint_ids": helped,
+        })
+
+    baseline_total = sum(item["query"]["frequency"] * item["baseline"] for item in items)
+    optimized_total = sum(items[n]["query"]["frequency"] * current[n] for n in range(len(items)))
+    per_query = {}
+    for n, item in enumerate(items):
+        entry = per_query.setdefault(item["query"]["fingerprint_id"], {
+            "fingerprint_id": item["query"]["fingerprint_id"],
+            "fingerprint": item["query"]["fingerprint"],
+            "type": item["query"]["type"],
+            "frequency": item["query"]["frequency"],
+            "baseline_cost": 0.0,
+            "optimized_cost": 0.0,
+        })
+        entry["baseline_cost"] += item["baseline"]
+        entry["optimized_cost"] += current[n]
+    fingerprints = sorted(per_query.values(),
+                          key=lambda e: (-(e["baseline_cost"] - e["optimized_cost"]) * e["frequency"], e["fingerprint"]))
+    for entry in fingerprints:
+        entry["baseline_cost"] = round(entry["baseline_cost"], 3)
+        entry["optimized_cost"] = round(entry["optimized_cost"], 3)
+
+    details = {
+        "workload": {
+            "distinct_fingerprints": len(workload),
+            "statements": round(sum(q["frequency"] for q in workload), 3),
+            "write_fingerprints": len(writes),
+            "unparsed_fingerprints": unparsed,
+        },
+        "recommended_indexes": recommended,
+        "rejected_candidates": [
+            {"table": t, "columns": list(cols), "reason": reason} for (t, cols), reason in sorted(rejected.items())
+        ],
+        "totals": {
+            "baseline_cost": round(baseline_total, 3),
+            "optimized_cost": round(optimized_total, 3),
+            "improvement_pct": round(100 * (1 - optimized_total / baseline_total), 2) if baseline_total else 0.0,
+            "storage_bytes": used_bytes,
+            "write_ops": round(used_writes, 3),
+        },
+        "budget": {"storage_bytes": storage_budget_bytes, "write_ops": write_budget, "max_indexes": max_indexes},
+        "fingerprints": fingerprints[:MAX_REPORTED_FINGERPRINTS],
+    }
+    return {**base, "status": "success", "details": details}
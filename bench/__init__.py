@@ -0,0 +1,3 @@
+"""
+Benchmark and load-test tooling for QueryVault (not imported by the app).
+"""
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the QueryVault HTTP API.
+
+Drives /analyze, /analyze-schema and the auth endpoints at one or more concurrency
+levels and reports p50/p95/p99 latency, throughput and the per-stage breakdown the
+server returns in its Server-Timing header. Results are written as JSON so runs can
+be compared across commits.
+
+Usage:
+    # start a server with the offline LLM stand-in, load the sample schema, run
+    python -m bench.load_test run --spawn-server --setup-db --concurrency 1,8,32 --requests 200
+
+    # throughput as the worker count changes (gunicorn + UvicornWorker, shared cache)
+    for w in 1 2 4; do
+        python -m bench.load_test run --spawn-server --server gunicorn --workers $w --label workers-$w
+    done
+
+    # compare two result files
+    python -m bench.load_test compare bench/results/a.json bench/results/b.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from utils.config import Config
+from bench.stats import summarize, parse_server_timing, run_metadata, save_results, compare_summaries
+
+SCENARIOS = ["analyze", "analyze-schema", "login", "register"]
+DEFAULT_SQL = (
+    "SELECT c.customer_name, s.product_name, s.sale_amount "
+    "FROM customers c JOIN sales s ON c.customer_id = s.customer_id "
+    "WHERE s.sale_amount > 100"
+)
+BENCH_PASSWORD = "bench-password-123"
+
+
+# --- Environment setup ---
+
+async def setup_sample_db(args):
+    """Load db/init_db.sql into the target MariaDB (same approach as setup_database.py)."""
+    import aiomysql
+
+    sql_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "init_db.sql")
+    with open(sql_path, "r") as f:
+        script = f.read()
+
+    conn = await aiomysql.connect(
+        host=args.db_host, port=args.db_port,
+        user=args.db_root_user, password=args.db_root_password,
+        autocommit=True
+    )
+    try:
+        async with conn.cursor() as cur:
+            for statement in (s.strip() for s in script.split(";")):
+                if statement and not statement.startswith("--"):
+                    await cur.execute(statement)
+    finally:
+        conn.close()
+    print(f"Loaded sample schema from {sql_path}")
+
+
+def spawn_server(args):
+    """Start uvicorn or gunicorn with the offline LLM backend and wait until it answers.
+
+    Each run gets an empty shared cache, so results do not depend on earlier runs.
+    """
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "local",
+        "LOCAL_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "LOCAL_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "LOCAL_LLM_RATE_LIMIT_RATE": str(args.llm_rate_limit_rate),
+        "SHARED_CACHE_PATH": "" if args.no_shared_cache
+        else os.path.join(tempfile.mkdtemp(prefix="queryvault-bench-"), "cache.sqlite"),
+    }
+    if args.server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py", "--workers", str(args.workers),
+               "--bind", f"127.0.0.1:{args.port}", "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+               "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{args.base_url}/about", timeout=1.0).status_code < 500:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("Server did not become ready within 30s")
+
+
+# --- Request drivers ---
+
+def database_config(args):
+    return {
+        "host": args.db_host,
+        "port": args.db_port,
+        "user": args.db_user,
+        "password": args.db_password,
+        "database": args.db_name,
+    }
+
+
+async def register_user(client, email):
+    return await client.post("/auth/register", json={
+        "email": email, "password": BENCH_PASSWORD, "full_name": "Bench User"
+    })
+
+
+async def login(client, email):
+    return await client.post("/auth/login", data={"username": email, "password": BENCH_PASSWORD})
+
+
+def make_request_fn(scenario, args, run_id):
+    """Return ``async fn(client, i) -> httpx.Response`` for a scenario."""
+    db = database_config(args)
+    if scenario == "analyze":
+        body = {"sql": args.sql, "database": db, "run_in_sandbox": True}
+        return lambda client, i: client.post("/analyze", json=body)
+    if scenario == "analyze-schema":
+        body = {"database": db}
+        return lambda client, i: client.post("/analyze-schema", json=body)
+    if scenario == "login":
+        return lambda client, i: login(client, args.bench_email)
+    if scenario == "register":
+        return lambda client, i: register_user(client, f"bench-{run_id}-{i}@example.com")
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def is_ok(scenario, resp):
+    if scenario == "login":
+        return resp.status_code == 302
+    return 200 <= resp.status_code < 300
+
+
+async def run_scenario(scenario, concurrency, args, cookies, run_id):
+    fn = make_request_fn(scenario, args, run_id)
+    latencies, stages, statuses, errors = [], {}, {}, 0
+    counter = iter(range(args.requests + args.warmup))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, cookies=cookies, limits=limits,
+                                 timeout=args.timeout, follow_redirects=False) as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    resp = await fn(client, i)
+                except httpx.HTTPError as e:
+                    if i >= args.warmup:
+                        errors += 1
+                        statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+                    continue
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if i < args.warmup:
+                    continue
+                statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+                if not is_ok(scenario, resp):
+                    errors += 1
+                    continue
+                latencies.append(elapsed_ms)
+                for stage, ms in parse_server_timing(resp.headers.get("server-timing")).items():
+                    stages.setdefault(stage, []).append(ms)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "errors": errors,
+        "status_counts": statuses,
+        "wall_time_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "latency": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in stages.items()},
+    }
+
+
+async def run_benchmark(args):
+    if args.setup_db:
+        await setup_sample_db(args)
+
+    run_id = uuid.uuid4().hex[:8]
+    args.bench_email = args.bench_email or f"bench-{run_id}@example.com"
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, follow_redirects=False) as client:
+        await register_user(client, args.bench_email)
+        resp = await login(client, args.bench_email)
+        if resp.status_code != 302 or "access_token" not in resp.cookies:
+            raise RuntimeError(f"Login failed ({resp.status_code}): {resp.text[:200]}")
+        cookies = {"access_token": resp.cookies["access_token"]}
+
+    runs = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            result = await run_scenario(scenario, concurrency, args, cookies, run_id)
+            lat = result["latency"]
+            print(f"{scenario:<15} c={concurrency:<4} rps={result['throughput_rps']:<9} "
+                  f"p50={lat.get('p50_ms')}ms p95={lat.get('p95_ms')}ms p99={lat.get('p99_ms')}ms "
+                  f"errors={result['errors']}")
+            runs.append(result)
+
+    return {
+        "meta": run_metadata(label=args.label, base_url=args.base_url, spawned_server=args.spawn_server,
+                             workers=args.workers if args.spawn_server else None,
+                             server=args.server if args.spawn_server else None,
+                             shared_cache=not args.no_shared_cache if args.spawn_server else None,
+                             llm_latency_ms=args.llm_latency_ms, sql=args.sql),
+        "runs": runs,
+    }
+
+
+# --- Comparison ---
+
+def compare_files(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    index = {(r["scenario"], r["concurrency"]): r for r in before.get("runs", [])}
+    print(f"before: {before['meta'].get('git_commit')}  after: {after['meta'].get('git_commit')}")
+    for run in after.get("runs", []):
+        prev = index.get((run["scenario"], run["concurrency"]))
+        if not prev:
+            continue
+        diff = compare_summaries(
+            {**prev["latency"], "throughput_rps": prev["throughput_rps"]},
+            {**run["latency"], "throughput_rps": run["throughput_rps"]},
+        )
+        cells = ", ".join(f"{k} {v['before']} -> {v['after']} ({v['change_pct']:+}%)"
+                          for k, v in diff.items() if v["change_pct"] is not None)
+        print(f"{run['scenario']:<15} c={run['concurrency']:<4} {cells}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QueryVault load and latency benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmark")
+    run.add_argument("--base-url", default=None, help="Server URL (default http://127.0.0.1:<port>)")
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument("--spawn-server", action="store_true", help="Start uvicorn with LLM_BACKEND=local")
+    run.add_argument("--workers", type=int, default=1, help="Worker processes when spawning the server")
+    run.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn",
+                     help="Server to spawn; gunicorn uses gunicorn.conf.py")
+    run.add_argument("--no-shared-cache", action="store_true",
+                     help="Spawn the server without the shared LLM/schema cache")
+    run.add_argument("--llm-latency-ms", type=float, default=0)
+    run.add_argument("--llm-error-rate", type=float, default=0)
+    run.add_argument("--llm-rate-limit-rate", type=float, default=0)
+    run.add_argument("--scenarios", default=",".join(SCENARIOS))
+    run.add_argument("--concurrency", default="1,8", help="Comma-separated concurrency levels")
+    run.add_argument("--requests", type=int, default=50, help="Measured requests per scenario and level")
+    run.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario and level")
+    run.add_argument("--timeout", type=float, default=120.0)
+    run.add_argument("--sql", default=DEFAULT_SQL)
+    run.add_argument("--db-host", default=Config.DB_HOST or "127.0.0.1")
+    run.add_argument("--db-port", type=int, default=Config.DB_PORT)
+    run.add_argument("--db-user", default=Config.DB_USER or "appuser")
+    run.add_argument("--db-password", default=Config.DB_PASSWORD or "app_pass123")
+    run.add_argument("--db-name", default=Config.DB_NAME or "testdb")
+    run.add_argument("--setup-db", action="store_true", help="Load db/init_db.sql before running")
+    run.add_argument("--db-root-user", default="root")
+    run.add_argument("--db-root-password", default="")
+    run.add_argument("--bench-email", default=None)
+    run.add_argument("--label", default=None, help="Free-form label stored with the results")
+    run.add_argument("--out", default=os.path.join("bench", "results"))
+
+    cmp_ = sub.add_parser("compare", help="Compare two result files")
+    cmp_.add_argument("before")
+    cmp_.add_argument("after")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        args.base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+        args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+        args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "compare":
+        compare_files(args.before, args.after)
+        return 0
+
+    proc = spawn_server(args) if args.spawn_server else None
+    try:
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=10)
+    path = save_results(results, args.out, "load")
+    print(f"Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Workload capture replay against a sandbox MariaDB target.
+
+Reads a captured workload (a slow query log, a general query log, or JSONL with one
+``{"sql": ..., "params": [...]}`` per line) and replays it at a configurable
+concurrency and rate. Records throughput and the latency distribution, overall and
+per query fingerprint (utils.sql_tokenizer), so two runs can be compared: typically
+one before and one after applying the indexes /analyze (schema_improvements) or
+/advise-workload recommend.
+
+Statements run in the same read-only sandbox session as /analyze (READ ONLY
+transaction, SANDBOX_* limits); anything that is not a read-only SELECT is skipped
+unless --allow-writes is given, which replays writes on plain connections.
+
+With --rate, statement i is due at start + i / rate (open loop): ``latency`` is
+measured from when a statement was due, so time spent queued behind slow statements
+counts; ``service`` is the statement's own execute-and-fetch time.
+
+Usage:
+    python -m bench.replay run --workload slow.log --concurrency 8 --rate 200 --label before
+    python -m bench.replay run --workload slow.log --concurrency 8 --rate 200 --ddl analysis.json --label after
+    python -m bench.replay compare bench/results/replay-<before>.json bench/results/replay-<after>.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from utils.config import Config
+from utils.sql_tokenizer import fingerprint, fingerprint_id, read_only_violation
+from bench.stats import summarize, run_metadata, save_results, compare_summaries
+
+FORMATS = ["slow", "general", "jsonl"]
+FINGERPRINT_TEXT_CHARS = 300
+ERROR_SAMPLES = 5             # distinct error messages kept with an example statement
+
+# Slow log lines that are not part of a statement: server banner and column header
+SLOW_LOG_NOISE = re.compile(r"^(\S*(mysqld|mariadbd)\S*, Version:|Tcp port:|Time\s+Id\s+Command\s+Argument)")
+# Statements the slow log adds around each query
+SLOW_LOG_SESSION = re.compile(r"^(set\s+timestamp\s*=|use\s+\S+;?$)", re.IGNORECASE)
+# General log entry: optional time (MariaDB "241019 10:00:00" or MySQL ISO), thread id, command, argument
+GENERAL_LOG_ENTRY = re.compile(
+    r"^(?:\d{6}\s+\d{1,2}:\d{2}:\d{2}|\d{4}-\d{2}-\d{2}T\S+)?\s*(\d+)\s+([A-Z][A-Za-z ]*?)\t(.*)$")
+GENERAL_LOG_COMMANDS = {"Query", "Execute"}
+
+
+# --- Workload parsing ---
+
+def parse_slow_log(lines):
+    """Statements of a slow query log, without the ``SET timestamp`` / ``use db`` lines around each one."""
+    current = []
+    for line in lines:
+        text = line.rstrip("\n")
+        if not current and (text.startswith("#") or SLOW_LOG_NOISE.match(text) or not text.strip()):
+            continue
+        current.append(text)
+        if text.rstrip().endswith(";"):
+            sql = "\n".join(current).strip().rstrip(";").strip()
+            current = []
+            if sql and not SLOW_LOG_SESSION.match(sql):
+                yield {"sql": sql}
+    if current and "\n".join(current).strip():
+        yield {"sql": "\n".join(current).strip().rstrip(";")}
+
+
+def parse_general_log(lines):
+    """Query and Execute entries of a general query log; lines without an entry header continue the previous one."""
+    command, parts = None, []
+    for line in lines:
+        text = line.rstrip("\n")
+        match = GENERAL_LOG_ENTRY.match(text)
+        if match:
+            if command in GENERAL_LOG_COMMANDS and "\n".join(parts).strip():
+                yield {"sql": "\n".join(parts).strip().rstrip(";")}
+            command, parts = match.group(2).strip(), [match.group(3)]
+        elif command is not None:
+            parts.append(text)
+    if command in GENERAL_LOG_COMMANDS and "\n".join(parts).strip():
+        yield {"sql": "\n".join(parts).strip().rstrip(";")}
+
+
+def parse_jsonl(lines):
+    """``{"sql" (or "query"), "params" (list or dict, optional), "repeat" (optional)}`` per line."""
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {n}: {e}") from None
+        sql = entry.get("sql") or entry.get("query")
+        if not sql:
+            raise ValueError(f"line {n}: no sql")
+        for _ in range(int(entry.get("repeat", 1))):
+            yield {"sql": sql.strip().rstrip(";"), "params": entry.get("params")}
+
+
+PARSERS = {"slow": parse_slow_log, "general": parse_general_log, "jsonl": parse_jsonl}
+
+
+def detect_format(path: str) -> str:
+    if path.endswith((".jsonl", ".json")):
+        return "jsonl"
+    with open(path, errors="replace") as f:
+        head = f.read(4096)
+    if "# Query_time:" in head or "# User@Host:" in head:
+        return "slow"
+    return "general"
+
+
+def load_workload(path: str, fmt: str = None, allow_writes: bool = False, limit: int = None):
+    """``(statements, skipped)``: the replayable statements with their fingerprints, and skip reasons counted."""
+    fmt = fmt or detect_format(path)
+    statements, skipped = [], {}
+    with open(path, errors="replace") as f:
+        for entry in PARSERS[fmt](f):
+            violation = "" if allow_writes else read_only_violation(entry["sql"])
+            if violation:
+                skipped[violation] = skipped.get(violation, 0) + 1
+                continue
+            entry["fingerprint_id"] = fingerprint_id(entry["sql"])
+            statements.append(entry)
+            if limit and len(statements) >= limit:
+                break
+    return statements, skipped
+
+
+def load_ddl(path: str) -> list:
+    """Statements to apply before a run: a .sql file, or a saved /analyze or /advise-workload response
+    (``schema_improvements.recommended_indexes`` or ``details.recommended_indexes[].ddl``)."""
+    with open(path) as f:
+        text = f.read()
+    if not path.endswith(".json"):
+        # One statement per ";" at the end of a line
+        return [s.strip() for s in re.split(r";\s*$", text, flags=re.MULTILINE) if s.strip()]
+    doc = json.loads(text)
+    doc = doc.get("data", doc)  # a /jobs/{id} document wraps the result
+    ddl = list((doc.get("schema_improvements") or {}).get("recommended_indexes") or [])
+    ddl += [r["ddl"] for r in (doc.get("details") or {}).get("recommended_indexes") or [] if isinstance(r, dict)]
+    return [s for s in ddl if isinstance(s, str) and s.strip()]
+
+
+# --- Replay ---
+
+def make_client(args, pool_size: int):
+    from db.mariadb_client import MariaDBClient
+
+    return MariaDBClient(args.db_host, args.db_user, args.db_password, args.db_name, port=args.db_port,
+                         min_size=0, max_size=pool_size)
+
+
+async def apply_ddl(client, statements):
+    applied = []
+    async with client.connection() as conn:
+        async with conn.cursor() as cur:
+            for sql in statements:
+                start = time.perf_counter()
+                await cur.execute(sql)
+                applied.append({"sql": sql, "ms": round((time.perf_counter() - start) * 1000, 3)})
+                print(f"applied in {applied[-1]['ms']}ms: {sql}")
+    return applied
+
+
+async def execute(client, entry, allow_writes: bool):
+    """Run one statement; returns ``(service_ms, rows)``. Reads run in the sandbox session."""
+    session = client.connection() if allow_writes else client.sandbox()
+    async with session as conn:
+        async with conn.cursor() as cur:
+            start = time.perf_counter()
+            await cur.execute(entry["sql"], entry.get("params"))
+            rows = len(await cur.fetchall()) if cur.description else cur.rowcount
+            return (time.perf_counter() - start) * 1000, rows
+
+
+def schedule(statements, loops: int, duration: float, start: float):
+    """``(i, statement)`` in workload order, ``loops`` times over, or until ``duration`` seconds have passed."""
+    i = 0
+    loop = 0
+    while duration or loop < loops:
+        for entry in statements:
+            if duration and time.perf_counter() - start >= duration:
+                return
+            yield i, entry
+            i += 1
+        loop += 1
+
+
+async def replay(client, statements, concurrency: int, rate: float = 0, loops: int = 1, duration: float = 0,
+                 allow_writes: bool = False) -> dict:
+    latencies, services, rows_total = [], [], 0
+    per_fp, errors, error_samples = {}, {}, []
+    start = time.perf_counter()
+    work = schedule(statements, loops, duration, start)
+
+    async def worker():
+        nonlocal rows_total
+        for i, entry in work:
+            due = start + i / rate if rate else time.perf_counter()
+            if rate:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            stats = per_fp.setdefault(entry["fingerprint_id"], {"sql": entry["sql"], "service": [], "errors": 0})
+            try:
+                service_ms, rows = await execute(client, entry, allow_writes)
+            except Exception as e:
+                kind = type(e).__name__
+                errors[kind] = errors.get(kind, 0) + 1
+                stats["errors"] += 1
+                message = f"{kind}: {e}"
+                if len(error_samples) < ERROR_SAMPLES and all(x["error"] != message for x in error_samples):
+                    error_samples.append({"error": message, "sql": entry["sql"][:FINGERPRINT_TEXT_CHARS]})
+                continue
+            latencies.append((time.perf_counter() - due) * 1000)
+            services.append(service_ms)
+            stats["service"].append(service_ms)
+            rows_total += rows if rows and rows > 0 else 0
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    fingerprints = []
+    for fp_id, stats in per_fp.items():
+        fingerprints.append({
+            "fingerprint_id": fp_id,
+            "fingerprint": fingerprint(stats["sql"])[:FINGERPRINT_TEXT_CHARS],
+            "executed": len(stats["service"]),
+            "errors": stats["errors"],
+            "total_ms": round(sum(stats["service"]), 3),
+            "service": summarize(stats["service"]),
+        })
+    fingerprints.sort(key=lambda f: -f["total_ms"])
+    return {
+        "summary": {
+            "executed": len(services),
+            "errors": sum(errors.values()),
+            "error_counts": errors,
+            "error_samples": error_samples,
+            "rows": rows_total,
+            "wall_time_s": round(wall, 3),
+            "throughput_qps": round(len(services) / wall, 3) if wall else None,
+            "latency": summarize(latencies),
+            "service": summarize(services),
+        },
+        "fingerprints": fingerprints,
+    }
+
+
+async def run_replay(args):
+    statements, skipped = load_workload(args.workload, args.format, args.allow_writes, args.limit)
+    if skipped:
+        print(f"skipped {sum(skipped.values())} statements: " + "; ".join(f"{n}x {r}" for r, n in skipped.items()))
+    if not statements:
+        raise RuntimeError("No replayable statements in the workload")
+    print(f"{len(statements)} statements, {len({s['fingerprint_id'] for s in statements})} fingerprints")
+
+    client = make_client(args, args.concurrency + 1)
+    await client.connect()
+    if client.pool is None:
+        raise RuntimeError(f"Cannot connect to {args.db_host}:{args.db_port}/{args.db_name}")
+    try:
+        applied = await apply_ddl(client, load_ddl(args.ddl)) if args.ddl else []
+        if args.warmup:
+            await replay(client, statements[:args.warmup], min(args.concurrency, args.warmup),
+                         allow_writes=args.allow_writes)
+        result = await replay(client, statements, args.concurrency, args.rate, args.loops, args.duration,
+                              args.allow_writes)
+    finally:
+        await client.disconnect()
+
+    s = result["summary"]
+    print(f"executed={s['executed']} errors={s['errors']} qps={s['throughput_qps']} "
+          f"latency p50={s['latency'].get('p50_ms')}ms p95={s['latency'].get('p95_ms')}ms "
+          f"p99={s['latency'].get('p99_ms')}ms")
+    for fp in result["fingerprints"][:args.top]:
+        print(f"  {fp['fingerprint_id']} n={fp['executed']:<6} total={fp['total_ms']}ms "
+              f"p95={fp['service'].get('p95_ms')}ms  {fp['fingerprint'][:80]}")
+    return {
+        "meta": run_metadata(label=args.label, workload=os.path.abspath(args.workload),
+                             format=args.format or detect_format(args.workload),
+                             target=f"{args.db_host}:{args.db_port}/{args.db_name}", concurrency=args.concurrency,
+                             rate=args.rate, loops=args.loops, duration=args.duration,
+                             allow_writes=args.allow_writes, ddl=applied),
+        "workload": {"statements": len(statements), "skipped": skipped,
+                     "fingerprints": len({s["fingerprint_id"] for s in statements})},
+        **result,
+    }
+
+
+# --- Comparison ---
+
+def compare_files(before_path, after_path, top: int = 10):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('label') or before['meta'].get('git_commit')}  "
+          f"after: {after['meta'].get('label') or after['meta'].get('git_commit')}")
+    for ddl in after["meta"].get("ddl") or []:
+        print(f"  applied: {ddl['sql']}")
+    keys = ("p50_ms", "p95_ms", "p99_ms", "throughput_qps")
+    for metric in ("latency", "service"):
+        diff = compare_summaries({**before["summary"][metric], "throughput_qps": before["summary"]["throughput_qps"]},
+                                 {**after["summary"][metric], "throughput_qps": after["summary"]["throughput_qps"]},
+                                 keys=keys if metric == "latency" else keys[:3])
+        cells = ", ".join(f"{k} {v['before']} -> {v['after']} ({v['change_pct']:+}%)"
+                          for k, v in diff.items() if v["change_pct"] is not None)
+        print(f"{metric:<8} {cells}")
+    print(f"errors   {before['summary']['errors']} -> {after['summary']['errors']}")
+
+    # Per fingerprint, largest change in total service time first
+    old = {f["fingerprint_id"]: f for f in before["fingerprints"]}
+    rows = []
+    for fp in after["fingerprints"]:
+        prev = old.get(fp["fingerprint_id"])
+        if not prev or not prev["service"].get("count") or not fp["service"].get("count"):
+            continue
+        diff = compare_summaries(prev["service"], fp["service"], keys=("p50_ms", "p95_ms"))
+        rows.append((fp["total_ms"] - prev["total_ms"], fp, diff))
+    rows.sort(key=lambda r: -abs(r[0]))
+    for delta, fp, diff in rows[:top]:
+        cells = ", ".join(f"{k} {v['before']} -> {v['after']}" + (f" ({v['change_pct']:+}%)" if v["change_pct"] is not None else "")
+                          for k, v in diff.items())
+        print(f"  {fp['fingerprint_id']} total {delta:+.1f}ms  {cells}  {fp['fingerprint'][:60]}")
+    only = set(old) ^ {f["fingerprint_id"] for f in after["fingerprints"]}
+    if only:
+        print(f"  {len(only)} fingerprints ran in only one of the runs")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QueryVault workload replay")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Replay a captured workload")
+    run.add_argument("--workload", required=True, help="Slow log, general log or JSONL file")
+    run.add_argument("--format", choices=FORMATS, default=None, help="Workload format (default: detected)")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--rate", type=float, default=0, help="Statements per second across workers; 0 = unthrottled")
+    run.add_argument("--loops", type=int, default=1, help="Times to replay the workload")
+    run.add_argument("--duration", type=float, default=0, help="Replay for this many seconds instead of --loops")
+    run.add_argument("--limit", type=int, default=None, help="Read at most this many statements")
+    run.add_argument("--warmup", type=int, default=0, help="Unmeasured statements run first")
+    run.add_argument("--allow-writes", action="store_true",
+                     help="Also replay writes, outside the read-only sandbox (only against a disposable copy)")
+    run.add_argument("--ddl", default=None,
+                     help="Apply these statements first: a .sql file or a saved /analyze or /advise-workload JSON")
+    run.add_argument("--db-host", default=Config.DB_HOST or "127.0.0.1")
+    run.add_argument("--db-port", type=int, default=Config.DB_PORT)
+    run.add_argument("--db-user", default=Config.DB_USER or "appuser")
+    run.add_argument("--db-password", default=Config.DB_PASSWORD or "app_pass123")
+    run.add_argument("--db-name", default=Config.DB_NAME or "testdb")
+    run.add_argument("--top", type=int, default=10, help="Fingerprints printed")
+    run.add_argument("--label", default=None, help="Free-form label stored with the results")
+    run.add_argument("--out", default=os.path.join("bench", "results"))
+
+    cmp_ = sub.add_parser("compare", help="Compare two replay result files")
+    cmp_.add_argument("before")
+    cmp_.add_argument("after")
+    cmp_.add_argument("--top", type=int, default=10)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if args.concurrency < 1:
+            parser.error("--concurrency must be at least 1")
+        if args.duration < 0 or args.rate < 0 or args.loops < 1:
+            parser.error("--duration and --rate must be >= 0 and --loops >= 1")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "compare":
+        compare_files(args.before, args.after, args.top)
+        return 0
+    results = asyncio.run(run_replay(args))
+    path = save_results(results, args.out, "replay")
+    print(f"Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+CPU and bytes-on-wire benchmark for /analyze response rendering.
+
+Builds synthetic /analyze payloads (schema context, EXPLAIN rows, sample rows with the
+Decimal/datetime values aiomysql returns) at several sizes and measures:
+
+  - baseline: FastAPI's default path, jsonable_encoder + JSONResponse (json.dumps)
+  - orjson:   utils.serialization.dumps, as used by json_response / ORJSONResponse
+  - orjson_columnar: the same with sample rows in the columnar encoding (sample_rows_encoding)
+  - gzip / br: compressing the rendered body at the levels CompressionMiddleware uses
+
+CPU time is process time per render, so it is not inflated by other load on the host.
+
+Usage:
+    python -m bench.serialization --sizes 10,100,1000 --iterations 200
+"""
+import sys
+import time
+import gzip
+import random
+import argparse
+from decimal import Decimal
+from datetime import datetime, date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.config import Config
+from utils.serialization import dumps
+from utils.compression import brotli
+from bench.stats import summarize, run_metadata, save_results
+
+
+def build_payload(rows: int, tables: int = 8, seed: int = 0):
+    """An /analyze-shaped result with ``rows`` sample rows and ``tables`` tables of schema context."""
+    rng = random.Random(seed)
+    schema = {
+        f"table_{t}": [
+            {"Field": f"col_{c}", "Type": rng.choice(["int(11)", "varchar(255)", "decimal(10,2)", "datetime"]),
+             "Null": "YES", "Key": "", "Default": None, "Extra": ""}
+            for c in range(12)
+        ]
+        for t in range(tables)
+    }
+    explain = [
+        {"id": 1, "select_type": "SIMPLE", "table": f"table_{t}", "type": rng.choice(["ALL", "ref", "eq_ref"]),
+         "possible_keys": "PRIMARY", "key": "PRIMARY", "key_len": "4", "ref": "const",
+         "rows": rng.randint(1, 10 ** 6), "Extra": "Using where"}
+        for t in range(tables)
+    ]
+    start = datetime(2024, 1, 1)
+    sample = [
+        {
+            "customer_id": i,
+            "customer_name": f"Customer {i}",
+            "sale_amount": Decimal(f"{rng.randint(1, 10 ** 6)}.{rng.randint(0, 99):02d}"),
+            "sale_date": start + timedelta(minutes=rng.randint(0, 10 ** 6)),
+            "signup": date(2020, 1, 1) + timedelta(days=rng.randint(0, 1500)),
+            "notes": "lorem ipsum dolor sit amet " * rng.randint(0, 4),
+        }
+        for i in range(rows)
+    ]
+    return {
+        "status": "success",
+        "query": "SELECT * FROM sales JOIN customers USING (customer_id)",
+        "summary": {"issues_found": 3, "estimated_impact": "high"},
+        "recommendations": {"optimized_query": "SELECT ...", "indexes": ["CREATE INDEX idx ON sales(customer_id)"]},
+        "technical_details": {
+            "schema_context": schema,
+            "explain_plan": explain,
+            "sample_rows": {"rows": sample, "message": f"{rows} rows"},
+        },
+    }
+
+
+def columnar(payload):
+    """``payload`` with its sample rows in the ``sample_rows_encoding: "columnar"`` shape."""
+    rows = payload["technical_details"]["sample_rows"]["rows"]
+    sample = {"columns": list(rows[0]) if rows else [], "rows": [tuple(row.values()) for row in rows],
+              "message": payload["technical_details"]["sample_rows"]["message"]}
+    return {**payload, "technical_details": {**payload["technical_details"], "sample_rows": sample}}
+
+
+def _cpu_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return summarize(samples)
+
+
+def bench_size(rows, iterations):
+    payload = build_payload(rows)
+    baseline_body = JSONResponse(jsonable_encoder(payload)).body
+    orjson_body = dumps(payload)
+    columnar_payload = columnar(payload)
+    result = {
+        "sample_rows": rows,
+        "render_cpu": {
+            "baseline": _cpu_ms(lambda: JSONResponse(jsonable_encoder(payload)).body, iterations),
+            "orjson": _cpu_ms(lambda: dumps(payload), iterations),
+            "orjson_columnar": _cpu_ms(lambda: dumps(columnar_payload), iterations),
+        },
+        "bytes": {
+            "baseline": len(baseline_body),
+            "orjson": len(orjson_body),
+            "orjson_columnar": len(dumps(columnar_payload)),
+            "gzip": len(gzip.compress(orjson_body, compresslevel=Config.GZIP_LEVEL)),
+        },
+        "compress_cpu": {
+            "gzip": _cpu_ms(lambda: gzip.compress(orjson_body, compresslevel=Config.GZIP_LEVEL), iterations),
+        },
+    }
+    if brotli is not None:
+        result["bytes"]["br"] = len(brotli.compress(orjson_body, quality=Config.BROTLI_QUALITY))
+        result["compress_cpu"]["br"] = _cpu_ms(
+            lambda: brotli.compress(orjson_body, quality=Config.BROTLI_QUALITY), iterations)
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="QueryVault response serialization benchmark")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated sample row counts")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--label", default=None, help="Free-form label stored with the results")
+    parser.add_argument("--out", default="bench/results")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = []
+    for rows in args.sizes:
+        result = bench_size(rows, args.iterations)
+        cpu, size = result["render_cpu"], result["bytes"]
+        print(f"rows={rows:<6} render p50 baseline={cpu['baseline']['p50_ms']}ms orjson={cpu['orjson']['p50_ms']}ms  "
+              f"bytes baseline={size['baseline']} orjson={size['orjson']} columnar={size['orjson_columnar']} "
+              f"gzip={size['gzip']}"
+              + (f" br={size['br']}" if "br" in size else ""))
+        runs.append(result)
+    results = {
+        "meta": run_metadata(label=args.label, iterations=args.iterations, brotli=brotli is not None,
+                             gzip_level=Config.GZIP_LEVEL, brotli_quality=Config.BROTLI_QUALITY),
+        "runs": runs,
+    }
+    print(f"Results written to {save_results(results, args.out, 'serialization')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
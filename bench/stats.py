@@ -0,0 +1,90 @@
+import os
+import re
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime
+
+
+def percentile(values, pct: float):
+    """Linear-interpolated percentile of ``values`` (pct in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (pct / 100.0) * (len(ordered) - 1)
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies_ms):
+    """p50/p95/p99/mean/max summary of a list of latencies in milliseconds."""
+    if not latencies_ms:
+        return {"count": 0}
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def parse_server_timing(header: str):
+    """Parse a ``Server-Timing`` header into ``{stage: duration_ms}``."""
+    stages = {}
+    if not header:
+        return stages
+    for part in header.split(","):
+        match = re.match(r"\s*([\w\-.]+)\s*;.*?dur=([\d.]+)", part)
+        if match:
+            stages[match.group(1)] = float(match.group(2))
+    return stages
+
+
+def run_metadata(**extra):
+    """Commit, host and interpreter details stored alongside every result file."""
+    def _git(*args):
+        try:
+            return subprocess.check_output(["git", *args], stderr=subprocess.DEVNULL, text=True).strip()
+        except Exception:
+            return None
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def save_results(results: dict, out_dir: str, prefix: str):
+    """Write ``results`` to ``out_dir/<prefix>-<utc time>-<short sha>.json`` and return the path."""
+    os.makedirs(out_dir, exist_ok=True)
+    commit = (results.get("meta", {}).get("git_commit") or "nogit")[:10]
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(out_dir, f"{prefix}-{stamp}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    return path
+
+
+def compare_summaries(before: dict, after: dict, keys=("p50_ms", "p95_ms", "p99_ms", "throughput_rps")):
+    """Per-key ``{before, after, change_pct}`` for two result summaries."""
+    diff = {}
+    for key in keys:
+        b, a = before.get(key), after.get(key)
+        if b is None or a is None:
+            continue
+        change = ((a - b) / b * 100.0) if b else None
+        diff[key] = {"before": b, "after": a, "change_pct": round(change, 2) if change is not None else None}
+    return diff
@@ -1,62 +1,316 @@
 import aiomysql
 import re
+import time
+import asyncio
 import logging
+import anyio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from utils.config import Config
+from utils.metrics import DB_POOL_ACQUIRE_WAIT, DB_POOL_ACQUIRE_TIMEOUTS, DB_POOL_IN_USE
+from utils.shared_cache import get_cache, cache_key
+from utils.sql_tokenizer import read_only_violation
+from utils.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the client's ``acquire_timeout``."""
+
+
+class PoolUsage:
+    """How one request used the connection pools: acquires, how many had to queue for a busy pool,
+    time spent waiting, and the peak number of connections in use."""
+
+    def __init__(self):
+        self.acquires = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.peak_in_use = 0
+        self.max_size = 0
+
+    def record(self, wait_ms: float, in_use: int, max_size: int, queued: bool):
+        self.acquires += 1
+        self.queued += queued
+        self.wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.peak_in_use = max(self.peak_in_use, in_use)
+        self.max_size = max(self.max_size, max_size)
+
+    def as_dict(self) -> dict:
+        return {
+            "acquires": self.acquires,
+            "queued": self.queued,
+            "wait_ms": round(self.wait_ms, 3),
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "peak_in_use": self.peak_in_use,
+            "max_size": self.max_size,
+            "timeouts": self.timeouts,
+            # An acquire found every connection busy and had to wait for one
+            "saturated": self.queued > 0 or self.timeouts > 0,
+        }
+
+
+_pool_usage: ContextVar[PoolUsage] = ContextVar("pool_usage", default=None)
+
+
+def track_pool_usage() -> PoolUsage:
+    """Start recording pool use for the current request (and the tasks it spawns from here on)."""
+    usage = PoolUsage()
+    _pool_usage.set(usage)
+    return usage
+
+
+def _sandbox_limits():
+    """SANDBOX_* session limits as ``(limit, [(variable, value), ...])``; the first variable a server accepts is used."""
+    limits = []
+    if Config.SANDBOX_STATEMENT_TIMEOUT_SECONDS > 0:
+        seconds = Config.SANDBOX_STATEMENT_TIMEOUT_SECONDS
+        # MariaDB, then MySQL (milliseconds, SELECT only)
+        limits.append(("statement time", [("max_statement_time", seconds), ("max_execution_time", int(seconds * 1000))]))
+    if Config.SANDBOX_MAX_MEMORY_MB > 0:
+        limits.append(("memory", [("max_session_mem_used", Config.SANDBOX_MAX_MEMORY_MB * 1024 * 1024)]))
+    if Config.SANDBOX_LOW_PRIORITY:
+        # MariaDB thread pool; other servers have no per-session priority
+        limits.append(("priority", [("thread_pool_priority", "low")]))
+    return limits
+
+
+def _snapshot_ok(value) -> bool:
+    """Whether a schema fetch result may be cached: no top-level or per-table errors."""
+    if not isinstance(value, dict) or "error" in value:
+        return False
+    return not any(isinstance(v, dict) and "error" in v for v in value.values())
+
+
+# Aggregate spellings in result column names, rewritten to readable keys
+_AGGREGATE_NAMES = (("COUNT(*)", "total_count"), ("SUM(", "sum_"), (")", ""), ("AVG(", "avg_"), ("MAX(", "max_"),
+                    ("MIN(", "min_"), ("GROUP_CONCAT(", "group_concat_"), ("STDDEV(", "stddev_"),
+                    ("VARIANCE(", "variance_"))
+
+
+def sample_column_names(names) -> list:
+    """Sample-row keys for a result's column names, e.g. ``SUM(total)`` -> ``sum_total``; repeats get ``_2``, ``_3``.
+
+    Computed once per result set rather than per cell.
+    """
+    keys, seen = [], {}
+    for name in names:
+        for spelling, replacement in _AGGREGATE_NAMES:
+            name = name.replace(spelling, replacement)
+        # fallback: lowercase & replace spaces
+        key = re.sub(r"\W+", "_", name).strip("_").lower()
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}_{seen[key]}")
+    return keys
+
+
 class MariaDBClient:
-    def __init__(self, host, user, password, database, port=3306):
+    def __init__(self, host, user, password, database, port=3306, min_size=None, max_size=None,
+                 recycle_seconds=None, acquire_timeout_seconds=None):
         self.host = host
         self.user = user
         self.password = password
         self.database = database
         self.port = port
+        # Pool settings; unset ones come from the DB_POOL_* environment defaults
+        self.min_size = Config.DB_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = Config.DB_POOL_MAX_SIZE if max_size is None else max_size
+        self.recycle_seconds = Config.DB_POOL_RECYCLE_SECONDS if recycle_seconds is None else recycle_seconds
+        self.acquire_timeout_seconds = (Config.DB_POOL_ACQUIRE_TIMEOUT_SECONDS if acquire_timeout_seconds is None
+                                        else acquire_timeout_seconds)
         self.pool = None
+        # Set once connect() has logged in to the target with these credentials; gates the shared schema cache
+        self.login_verified = False
+        # Connections checked out or being waited for through ``connection()``
+        self._claims = 0
+        # Sandbox session variables this server accepts, found on the first sandboxed statement
+        self._sandbox_vars = None
 
     async def connect(self, host=None, port=None):
         if self.pool is None:
             try:
-                self.pool = await aiomysql.create_pool(
-                    host=host or self.host,
-                    user=self.user,
-                    password=self.password,
-                    db=self.database,
-                    port=port or self.port,
-                    autocommit=True,
-                    connect_timeout=10,
-                )
+                with start_span("db.pool_create", **{"db.name": self.database}):
+                    self.pool = await aiomysql.create_pool(
+                        host=host or self.host,
+                        user=self.user,
+                        password=self.password,
+                        db=self.database,
+                        port=port or self.port,
+                        autocommit=True,
+                        connect_timeout=10,
+                        minsize=self.min_size,
+                        maxsize=self.max_size,
+                        pool_recycle=self.recycle_seconds,
+                    )
+                    if self.min_size == 0:
+                        # An empty pool opens no connection, so it would "connect" with any credentials
+                        async with self.pool.acquire() as conn:
+                            await conn.ping(reconnect=False)
+                self.login_verified = True
                 logger.info("MariaDB connection pool created successfully")
             except Exception as e:
                 logger.error(f"Failed to connect to MariaDB: {e}")
+                if self.pool is not None:
+                    self.pool.close()
+                    await self.pool.wait_closed()
                 self.pool = None
 
+    @property
+    def in_use(self) -> int:
+        """Connections checked out of the pool, or being waited for, through ``connection()``."""
+        return self._claims
+
+    @asynccontextmanager
+    async def connection(self):
+        """A pooled connection. Records the acquire wait and connections in use, and raises
+        ``PoolTimeout`` when none is free within ``acquire_timeout_seconds``."""
+        start = time.perf_counter()
+        queued = self._claims >= self.pool.maxsize
+        self._claims += 1
+        try:
+            conn = await asyncio.wait_for(self.pool.acquire(), self.acquire_timeout_seconds)
+        except BaseException as e:
+            self._claims -= 1
+            if not isinstance(e, asyncio.TimeoutError):
+                raise
+            DB_POOL_ACQUIRE_TIMEOUTS.labels(database=self.database).inc()
+            usage = _pool_usage.get()
+            if usage is not None:
+                usage.timeouts += 1
+            raise PoolTimeout(f"No free connection to {self.database} within {self.acquire_timeout_seconds}s "
+                              f"({self.pool.size}/{self.pool.maxsize} in use)") from None
+        waited = time.perf_counter() - start
+        DB_POOL_ACQUIRE_WAIT.labels(database=self.database).observe(waited)
+        usage = _pool_usage.get()
+        if usage is not None:
+            usage.record(waited * 1000, min(self._claims, self.pool.maxsize), self.pool.maxsize, queued)
+        in_use = DB_POOL_IN_USE.labels(database=self.database)
+        in_use.inc()
+        try:
+            yield conn
+        finally:
+            self._claims -= 1
+            in_use.dec()
+            self.pool.release(conn)
+
+    async def _sandbox_variables(self, cur):
+        """Set the sandbox session limits on ``cur``'s connection; returns the ``(variable, value)`` pairs set."""
+        if self._sandbox_vars is None:
+            found = []
+            for limit, options in _sandbox_limits():
+                for name, value in options:
+                    try:
+                        await self._execute(cur, f"SET SESSION {name} = %s", (value,))
+                        found.append((name, value))
+                        break
+                    except Exception as e:
+                        logger.info(f"{name} not settable on {self.database}: {e}")
+                else:
+                    logger.warning(f"Sandbox {limit} limit unavailable on {self.database}")
+            self._sandbox_vars = found
+        elif self._sandbox_vars:
+            await self._execute(cur, "SET SESSION " + ", ".join(f"{name} = %s" for name, _ in self._sandbox_vars),
+                                [value for _, value in self._sandbox_vars])
+        return self._sandbox_vars
+
+    @asynccontextmanager
+    async def sandbox(self):
+        """A pooled connection inside ``START TRANSACTION READ ONLY``, with the SANDBOX_* statement time and memory
+        limits and low priority set where the server supports them. The transaction is rolled back and the limits
+        reset before the connection goes back to the pool; a connection that cannot be reset is closed instead."""
+        async with self.connection() as conn:
+            try:
+                async with conn.cursor() as cur:
+                    variables = await self._sandbox_variables(cur)
+                    await self._execute(cur, "START TRANSACTION READ ONLY")
+            except Exception:
+                conn.close()
+                raise
+            try:
+                yield conn
+            finally:
+                try:
+                    async with conn.cursor() as cur:
+                        await self._execute(cur, "ROLLBACK")
+                        if variables:
+                            await self._execute(cur, "SET SESSION " + ", ".join(f"{name} = DEFAULT" for name, _ in variables))
+                except Exception as e:
+                    logger.warning(f"Sandbox reset failed, dropping the connection: {e}")
+                    conn.close()
+
+    async def _execute(self, cur, sql: str, args=None):
+        """Execute one statement inside a ``db.statement`` trace span."""
+        with start_span("db.statement", **{"db.system": "mariadb", "db.name": self.database, "db.statement": sql[:1000]}):
+            return await cur.execute(sql, args)
+
     async def disconnect(self):
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
             self.pool = None
+            self.login_verified = False
             logger.info("MariaDB connection pool closed")
 
+    @property
+    def cache_namespace(self) -> str:
+        """Shared-cache namespace for this target's schema snapshots, per login: what DESCRIBE, STATISTICS and
+        information_schema return depends on the user's grants."""
+        return f"schema:{self.user}@{self.host}:{self.port}/{self.database}"
+
+    async def _snapshot(self, name: str, loader, *parts):
+        """``loader()`` served from the shared cache for ``SCHEMA_CACHE_TTL`` seconds; results with errors are not kept.
+
+        The namespace carries no password, so only a client that has logged in (``connect``) reads or fills it.
+        """
+        cache = get_cache() if Config.SCHEMA_CACHE_TTL > 0 and self.login_verified else None
+        if cache is None:
+            return await loader()
+        return await cache.get_or_load(self.cache_namespace, cache_key(name, *parts), loader,
+                                       Config.SCHEMA_CACHE_TTL, cacheable=_snapshot_ok)
+
+    async def invalidate_schema_cache(self) -> int:
+        """Drop this target's cached schema snapshots in every worker."""
+        cache = get_cache()
+        if cache is None:
+            return 0
+        return await anyio.to_thread.run_sync(cache.invalidate, self.cache_namespace)
+
     async def explain(self, query: str):
+        """EXPLAIN one SELECT, in the sandbox session (plan-only: the query itself never runs)."""
         if self.pool is None:
             return {"error": "Database connection not available"}
+        violation = read_only_violation(query, plan_only=True)
+        if violation:
+            return {"error": f"Not explained: {violation}"}
         try:
-            async with self.pool.acquire() as conn:
+            async with self.sandbox() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cur:
-                    await cur.execute(f"EXPLAIN {query}")
+                    await self._execute(cur, f"EXPLAIN {query}")
                     return await cur.fetchall()
         except Exception as e:
             logger.error(f"EXPLAIN failed: {e}")
             return {"error": str(e)}
 
     async def fetch_sample_rows(self, query: str, limit: int = 5):
-        """Fetch sample rows from query safely (works with aggregates too)."""
+        """Fetch sample rows from query safely (works with aggregates too).
+
+        Only read-only SELECTs (``read_only_violation``) are run, in the sandbox session. Returns
+        ``{"columns": [name, ...], "rows": [tuple, ...], "message"}``; ``ResponseFormatter.encode_sample_rows``
+        turns it into the response shape.
+        """
         if self.pool is None:
             return {"error": "Database connection not available"}
-        async with self.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                try:
-                    q = query.rstrip(";")
+        violation = read_only_violation(query)
+        if violation:
+            return {"error": f"Sample rows not fetched: {violation}"}
+        try:
+            async with self.sandbox() as conn:
+                async with conn.cursor() as cur:
+                    q = query.strip().rstrip(";")
 
                     # If query already has LIMIT, run as is
                     if re.search(r"\blimit\b", q, re.IGNORECASE):
@@ -64,54 +318,69 @@ class MariaDBClient:
                     else:
                         safe_query = f"SELECT * FROM ({q}) AS subq LIMIT {limit}"
 
-                    await cur.execute(safe_query)
-                    rows = await cur.fetchall()
+                    await self._execute(cur, safe_query)
+                    columns = sample_column_names(d[0] for d in cur.description)
+                    rows = await cur.fetchmany(limit)
 
                     if not rows:
-                        return {"rows": [], "message": "Query returned no rows"}
-
-                    # Clean up aggregate column names
-                    cleaned_rows = []
-                    for row in rows:
-                        new_row = {}
-                        for k, v in row.items():
-                            clean_key = (
-                                k.replace("COUNT(*)", "total_count")
-                                .replace("SUM(", "sum_")
-                                .replace(")", "")
-                                .replace("AVG(", "avg_")
-                                .replace("MAX(", "max_")
-                                .replace("MIN(", "min_")
-                                .replace("GROUP_CONCAT(", "group_concat_")
-                                .replace("STDDEV(", "stddev_")
-                                .replace("VARIANCE(", "variance_")
-                            )
-                            # fallback: lowercase & replace spaces
-                            clean_key = re.sub(r"\W+", "_", clean_key).strip("_").lower()
-                            new_row[clean_key] = v
-                        cleaned_rows.append(new_row)
+                        return {"columns": columns, "rows": [], "message": "Query returned no rows"}
 
                     return {
-                        "rows": cleaned_rows,
+                        "columns": columns,
+                        "rows": rows,
                         "message": f"Showing up to {limit} rows from actual query"
                     }
 
-                except Exception as e:
-                    logger.error(f"Sample row fetch failed: {e}")
-                    return {"error": f"Sample row fetch failed: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Sample row fetch failed: {e}")
+            return {"error": f"Sample row fetch failed: {str(e)}"}
+
+    async def fetch_profile_sample(self, query: str, limit: int = None):
+        """Up to ``limit`` (PROFILE_SAMPLE_ROWS) result rows for column profiling, read through an unbuffered
+        cursor ``PROFILE_FETCH_BATCH`` rows at a time, in the sandbox session.
+
+        Returns ``{"columns": [{name, type_code, length, scale, nullable}], "rows": [tuple, ...], "limit"}``.
+        """
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        violation = read_only_violation(query)
+        if violation:
+            return {"error": f"Profile sample not fetched: {violation}"}
+        limit = limit or Config.PROFILE_SAMPLE_ROWS
+        try:
+            async with self.sandbox() as conn:
+                async with conn.cursor(aiomysql.SSCursor) as cur:
+                    await self._execute(cur, f"SELECT * FROM ({query.strip().rstrip(';')}) AS subq LIMIT {int(limit)}")
+                    columns = [{"name": d[0], "type_code": d[1], "length": d[4], "scale": d[5], "nullable": d[6]}
+                               for d in cur.description]
+                    rows = []
+                    while True:
+                        batch = await cur.fetchmany(Config.PROFILE_FETCH_BATCH)
+                        if not batch:
+                            break
+                        rows.extend(batch)
+            return {"columns": columns, "rows": rows, "limit": limit}
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            logger.error(f"Profile sample fetch failed: {e}")
+            return {"error": f"Profile sample fetch failed: {str(e)}"}
 
     async def get_schema_context(self, query: str):
         """Extract table names from query and return schema details."""
         if self.pool is None:
             return {"error": "Database connection not available"}
-        tables = self._extract_tables(query)
+        tables = sorted(self._extract_tables(query))
+        return await self._snapshot("schema_context", lambda: self._load_schema_context(tables), tables)
+
+    async def _load_schema_context(self, tables):
         schema = {}
         try:
-            async with self.pool.acquire() as conn:
+            async with self.connection() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cur:
                     for tbl in tables:
                         try:
-                            await cur.execute(f"DESCRIBE {tbl}")
+                            await self._execute(cur, f"DESCRIBE {tbl}")
                             schema[tbl] = await cur.fetchall()
                         except Exception as e:
                             schema[tbl] = {"error": str(e)}
@@ -120,14 +389,85 @@ class MariaDBClient:
             logger.error(f"Schema context failed: {e}")
             return {"error": str(e)}
 
+    async def get_foreign_keys(self, query: str):
+        """Declared foreign keys of the tables ``query`` reads: ``{table: [{constraint, columns,
+        referenced_schema, referenced_table, referenced_columns}]}``."""
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        tables = sorted(self._extract_tables(query))
+        if not tables:
+            return {}
+        return await self._snapshot("foreign_keys", lambda: self._load_foreign_keys(tables), tables)
+
+    async def _load_foreign_keys(self, tables):
+        placeholders = ", ".join(["%s"] * len(tables))
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await self._execute(
+                        cur,
+                        f"""
+                        SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_SCHEMA,
+                               REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+                        FROM information_schema.KEY_COLUMN_USAGE
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+                          AND REFERENCED_TABLE_NAME IS NOT NULL
+                        ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+                        """,
+                        tables,
+                    )
+                    rows = await cur.fetchall()
+        except Exception as e:
+            logger.error(f"Foreign key fetch failed: {e}")
+            return {"error": str(e)}
+        grouped = {}
+        for r in rows:
+            keys = grouped.setdefault(r["TABLE_NAME"], {})
+            fk = keys.setdefault(r["CONSTRAINT_NAME"], {
+                "constraint": r["CONSTRAINT_NAME"], "columns": [], "referenced_schema": r["REFERENCED_TABLE_SCHEMA"],
+                "referenced_table": r["REFERENCED_TABLE_NAME"], "referenced_columns": [],
+            })
+            fk["columns"].append(r["COLUMN_NAME"])
+            fk["referenced_columns"].append(r["REFERENCED_COLUMN_NAME"])
+        return {table: list(keys.values()) for table, keys in grouped.items()}
+
+    async def count_orphans(self, table: str, foreign_keys: list):
+        """Rows of ``table`` whose foreign key values match no referenced row, per constraint:
+        ``{constraint: n}``. One aggregate over ``table`` covers all of ``foreign_keys``, in the sandbox session."""
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        q = self._quote_ident
+        counts = []
+        for fk in foreign_keys:
+            present = " AND ".join(f"c.{q(col)} IS NOT NULL" for col in fk["columns"])
+            match = " AND ".join(f"r.{q(ref)} = c.{q(col)}" for col, ref in zip(fk["columns"], fk["referenced_columns"]))
+            parent = f"{q(fk['referenced_schema'])}.{q(fk['referenced_table'])}"
+            counts.append(f"COALESCE(SUM({present} AND NOT EXISTS (SELECT 1 FROM {parent} r WHERE {match})), 0)")
+        sql = f"SELECT {', '.join(counts)} FROM {q(table)} c"
+        try:
+            async with self.sandbox() as conn:
+                async with conn.cursor() as cur:
+                    await self._execute(cur, sql)
+                    row = await cur.fetchone()
+            return {fk["constraint"]: int(n) for fk, n in zip(foreign_keys, row)}
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            logger.warning(f"Orphan count on {table} failed: {e}")
+            return {"error": str(e)}
+
     async def get_full_schema(self):
         """Return full database schema overview via information_schema."""
         if self.pool is None:
             return {"error": "Database connection not available"}
+        return await self._snapshot("full_schema", self._load_full_schema)
+
+    async def _load_full_schema(self):
         try:
-            async with self.pool.acquire() as conn:
+            async with self.connection() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cur:
-                    await cur.execute(
+                    await self._execute(
+                        cur,
                         """
                         SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_TYPE
                         FROM information_schema.columns
@@ -145,6 +485,266 @@ class MariaDBClient:
             logger.error(f"Full schema fetch failed: {e}")
             return {"error": str(e)}
 
+    @staticmethod
+    def _like_pattern(table_filter: str) -> str:
+        """Plain text matches as a substring; text containing ``%`` is used as a LIKE pattern."""
+        if "%" in table_filter:
+            return table_filter
+        escaped = table_filter.replace("\\", "\\\\").replace("_", "\\_")
+        return f"%{escaped}%"
+
+    async def list_tables(self, after: str = None, limit: int = None, table_filter: str = None):
+        """Table names (with row/size estimates) in name order, paged by keyset on TABLE_NAME."""
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        sql = """
+            SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+        """
+        args = []
+        if after:
+            sql += " AND TABLE_NAME > %s"
+            args.append(after)
+        if table_filter:
+            sql += " AND TABLE_NAME LIKE %s"
+            args.append(self._like_pattern(table_filter))
+        sql += " ORDER BY TABLE_NAME"
+        if limit:
+            sql += " LIMIT %s"
+            args.append(int(limit))
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await self._execute(cur, sql, args)
+                    return await cur.fetchall()
+        except Exception as e:
+            logger.error(f"Table listing failed: {e}")
+            return {"error": str(e)}
+
+    async def _fetch_columns(self, cur, tables):
+        """Column metadata for ``tables`` grouped by table name, in ordinal order."""
+        placeholders = ", ".join(["%s"] * len(tables))
+        await self._execute(
+            cur,
+            f"""
+            SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_TYPE
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND TABLE_NAME IN ({placeholders})
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """,
+            list(tables),
+        )
+        grouped = {t: [] for t in tables}
+        for r in await cur.fetchall():
+            grouped.setdefault(r.pop("TABLE_NAME"), []).append(r)
+        return grouped
+
+    async def get_columns(self, tables):
+        """Column metadata (name, types, key) for ``tables``: ``{table: [column, ...]}``."""
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        if not tables:
+            return {}
+        tables = sorted(tables)
+        return await self._snapshot("columns", lambda: self._load_columns(tables), tables)
+
+    async def _load_columns(self, tables):
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    return await self._fetch_columns(cur, tables)
+        except Exception as e:
+            logger.error(f"Column fetch failed: {e}")
+            return {"error": str(e)}
+
+    @staticmethod
+    def _group_index_rows(rows):
+        """Fold STATISTICS rows (one per index column) into ``{table: {index_name: index}}``."""
+        grouped = {}
+        for r in rows:
+            if r.get("INDEX_NAME") is None:
+                continue
+            idx = grouped.setdefault(r["TABLE_NAME"], {}).setdefault(r["INDEX_NAME"], {
+                "name": r["INDEX_NAME"],
+                "unique": not r["NON_UNIQUE"],
+                "columns": [],
+                "cardinality": [],
+            })
+            idx["columns"].append(r["COLUMN_NAME"] if not r.get("SUB_PART") else f"{r['COLUMN_NAME']}({r['SUB_PART']})")
+            idx["cardinality"].append(r.get("CARDINALITY"))
+            if r.get("INDEX_TYPE") and r["INDEX_TYPE"] != "BTREE":
+                idx["type"] = r["INDEX_TYPE"]
+        return grouped
+
+    async def _fetch_indexes(self, cur, tables):
+        """Index definitions for ``tables``: ``{table: [{name, unique, columns, cardinality}]}``."""
+        placeholders = ", ".join(["%s"] * len(tables))
+        await self._execute(
+            cur,
+            f"""
+            SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART, CARDINALITY, INDEX_TYPE
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """,
+            list(tables),
+        )
+        grouped = self._group_index_rows(await cur.fetchall())
+        return {t: list(grouped.get(t, {}).values()) for t in tables}
+
+    async def get_index_catalog(self, query: str = None, tables=None):
+        """Existing indexes (column order, cardinality) and size stats for the tables a query references.
+
+        TABLES and STATISTICS are joined so the whole catalog costs one round-trip:
+        ``{table: {rows, avg_row_length, data_length, index_length, indexes: [...]}}``.
+        """
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        tables = sorted(tables) if tables is not None else sorted(self._extract_tables(query or ""))
+        if not tables:
+            return {}
+        return await self._snapshot("index_catalog", lambda: self._load_index_catalog(tables), tables)
+
+    async def _load_index_catalog(self, tables):
+        placeholders = ", ".join(["%s"] * len(tables))
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await self._execute(
+                        cur,
+                        f"""
+                        SELECT t.TABLE_NAME, t.TABLE_ROWS, t.AVG_ROW_LENGTH, t.DATA_LENGTH, t.INDEX_LENGTH,
+                               s.INDEX_NAME, s.NON_UNIQUE, s.SEQ_IN_INDEX, s.COLUMN_NAME, s.SUB_PART,
+                               s.CARDINALITY, s.INDEX_TYPE
+                        FROM information_schema.TABLES t
+                        LEFT JOIN information_schema.STATISTICS s
+                          ON s.TABLE_SCHEMA = t.TABLE_SCHEMA AND s.TABLE_NAME = t.TABLE_NAME
+                        WHERE t.TABLE_SCHEMA = DATABASE() AND t.TABLE_NAME IN ({placeholders})
+                        ORDER BY t.TABLE_NAME, s.INDEX_NAME, s.SEQ_IN_INDEX
+                        """,
+                        tables,
+                    )
+                    rows = await cur.fetchall()
+        except Exception as e:
+            logger.error(f"Index catalog fetch failed: {e}")
+            return {"error": str(e)}
+
+        catalog = {}
+        for r in rows:
+            catalog.setdefault(r["TABLE_NAME"], {
+                "rows": r["TABLE_ROWS"],
+                "avg_row_length": r["AVG_ROW_LENGTH"],
+                "data_length": r["DATA_LENGTH"],
+                "index_length": r["INDEX_LENGTH"],
+                "indexes": [],
+            })
+        for table, indexes in self._group_index_rows(rows).items():
+            catalog[table]["indexes"] = list(indexes.values())
+        return catalog
+
+    async def iter_schema(self, after: str = None, limit: int = None, table_filter: str = None,
+                          include_indexes: bool = False, include_row_counts: bool = False,
+                          batch_size: int = 200):
+        """Yield one schema entry per table, fetching columns/indexes ``batch_size`` tables at a time.
+
+        Only one batch is held in memory, so very large databases can be streamed.
+        """
+        if self.pool is None:
+            raise RuntimeError("Database connection not available")
+        remaining = limit
+        cursor_name = after
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+            tables = await self.list_tables(after=cursor_name, limit=page_size, table_filter=table_filter)
+            if isinstance(tables, dict):
+                raise RuntimeError(tables["error"])
+            if not tables:
+                return
+            names = [t["TABLE_NAME"] for t in tables]
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    columns = await self._fetch_columns(cur, names)
+                    indexes = await self._fetch_indexes(cur, names) if include_indexes else {}
+            for t in tables:
+                entry = {"name": t["TABLE_NAME"], "columns": columns.get(t["TABLE_NAME"], [])}
+                if include_indexes:
+                    entry["indexes"] = indexes.get(t["TABLE_NAME"], [])
+                if include_row_counts:
+                    entry["rows"] = t["TABLE_ROWS"]
+                    entry["data_length"] = t["DATA_LENGTH"]
+                    entry["index_length"] = t["INDEX_LENGTH"]
+                yield entry
+            cursor_name = names[-1]
+            if remaining is not None:
+                remaining -= len(names)
+            if len(names) < page_size:
+                return
+
+    @staticmethod
+    def _quote_ident(name: str) -> str:
+        return "`" + str(name).replace("`", "``") + "`"
+
+    async def get_index_usage(self):
+        """Index usage counters and on-disk sizes, from whichever sources the server exposes.
+
+        ``rows_read`` ({table: {index: n}}) comes from INDEX_STATISTICS when MariaDB runs with
+        ``userstat=ON``; otherwise ``unused`` ({table: [index]}) comes from sys.schema_unused_indexes
+        when performance_schema is on. ``sizes`` ({table: {index: bytes}}) comes from
+        mysql.innodb_index_stats. Missing or unreadable sources are left out.
+        """
+        if self.pool is None:
+            return {"error": "Database connection not available"}
+        usage = {"source": None, "uptime_seconds": None, "rows_read": {}, "unused": {}, "sizes": {}}
+        async with self.connection() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                try:
+                    await self._execute(cur, "SHOW GLOBAL STATUS LIKE 'Uptime'")
+                    row = await cur.fetchone()
+                    usage["uptime_seconds"] = int(row["Value"]) if row else None
+                except Exception as e:
+                    logger.info(f"Uptime unavailable: {e}")
+                try:
+                    # An empty INDEX_STATISTICS only means "unused" when statistics are being collected
+                    await self._execute(cur, "SELECT @@userstat AS userstat")
+                    if (await cur.fetchone() or {}).get("userstat"):
+                        await self._execute(
+                            cur,
+                            "SELECT TABLE_NAME, INDEX_NAME, ROWS_READ FROM information_schema.INDEX_STATISTICS "
+                            "WHERE TABLE_SCHEMA = DATABASE()",
+                        )
+                        for r in await cur.fetchall():
+                            usage["rows_read"].setdefault(r["TABLE_NAME"], {})[r["INDEX_NAME"]] = int(r["ROWS_READ"])
+                        usage["source"] = "index_statistics"
+                except Exception as e:
+                    logger.info(f"INDEX_STATISTICS unavailable: {e}")
+                if usage["source"] is None:
+                    try:
+                        await self._execute(cur, "SELECT @@performance_schema AS ps")
+                        if (await cur.fetchone() or {}).get("ps"):
+                            await self._execute(
+                                cur,
+                                "SELECT object_name AS TABLE_NAME, index_name AS INDEX_NAME "
+                                "FROM sys.schema_unused_indexes WHERE object_schema = DATABASE()",
+                            )
+                            for r in await cur.fetchall():
+                                usage["unused"].setdefault(r["TABLE_NAME"], []).append(r["INDEX_NAME"])
+                            usage["source"] = "sys.schema_unused_indexes"
+                    except Exception as e:
+                        logger.info(f"sys.schema_unused_indexes unavailable: {e}")
+                try:
+                    await self._execute(
+                        cur,
+                        "SELECT table_name AS TABLE_NAME, index_name AS INDEX_NAME, "
+                        "stat_value * @@innodb_page_size AS SIZE_BYTES FROM mysql.innodb_index_stats "
+                        "WHERE database_name = DATABASE() AND stat_name = 'size'",
+                    )
+                    for r in await cur.fetchall():
+                        usage["sizes"].setdefault(r["TABLE_NAME"], {})[r["INDEX_NAME"]] = int(r["SIZE_BYTES"])
+                except Exception as e:
+                    logger.info(f"innodb_index_stats unavailable: {e}")
+        return usage
+
     def _extract_tables(self, query: str):
         """More tolerant regex-based table extractor: handles backticks, schema-qualified, subqueries/CTEs."""
         # matches from/join followed by optional schema and backticks, also in subqueries
@@ -0,0 +1,207 @@
+import io
+import time
+import asyncio
+import hashlib
+import logging
+
+import anyio
+
+from db.mariadb_client import MariaDBClient
+from utils.serialization import dumps
+from utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+def target_key(config) -> str:
+    """Registry key for a ``DatabaseConfig``: every field, credentials included, hashed."""
+    return hashlib.sha256(dumps(config.model_dump())).hexdigest()
+
+
+def _open_tunnel(config):
+    # paramiko (via sshtunnel) is slow to import and only needed for tunnelled targets
+    from sshtunnel import SSHTunnelForwarder
+
+    ssh_cfg = config.ssh_config
+    tunnel_kwargs = {
+        "ssh_address_or_host": (ssh_cfg.host, ssh_cfg.port),
+        "ssh_username": ssh_cfg.user,
+        "remote_bind_address": (config.host, config.port),
+    }
+    if ssh_cfg.private_key:
+        tunnel_kwargs["ssh_pkey"] = io.StringIO(ssh_cfg.private_key)
+    else:
+        tunnel_kwargs["ssh_password"] = ssh_cfg.password
+    tunnel = SSHTunnelForwarder(**tunnel_kwargs)
+    tunnel.start()
+    return tunnel
+
+
+def _client(config) -> MariaDBClient:
+    pool = getattr(config, "pool", None)
+    settings = pool.model_dump(exclude_none=True) if pool is not None else {}
+    return MariaDBClient(host=config.host, user=config.user, password=config.password,
+                         database=config.database, port=config.port, **settings)
+
+
+class PooledTarget:
+    """One target's connection pool and SSH tunnel, shared by the requests that lease it."""
+
+    def __init__(self, key: str, client: MariaDBClient, tunnel=None, pinned: bool = False):
+        self.key = key
+        self.client = client
+        self.tunnel = tunnel
+        self.pinned = pinned
+        self.leases = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def healthy(self) -> bool:
+        pool = self.client.pool
+        if pool is None or getattr(pool, "closed", False):
+            return False
+        # aiomysql pools only work on the event loop that created them
+        if hasattr(pool, "get_loop") and pool.get_loop() is not asyncio.get_running_loop():
+            return False
+        return self.tunnel is None or self.tunnel.is_active
+
+    def stats(self) -> dict:
+        pool = self.client.pool
+        return {
+            "target": self.key[:12],
+            "ssh": self.tunnel is not None,
+            "pinned": self.pinned,
+            "leases": self.leases,
+            "pool": {"size": getattr(pool, "size", None), "free": getattr(pool, "freesize", None),
+                     "in_use": self.client.in_use, "min": self.client.min_size, "max": self.client.max_size,
+                     "recycle_seconds": self.client.recycle_seconds,
+                     "acquire_timeout_seconds": self.client.acquire_timeout_seconds},
+            "age_seconds": round(time.monotonic() - self.created_at, 1),
+            "idle_seconds": round(time.monotonic() - self.last_used, 1) if not self.leases else 0.0,
+        }
+
+
+class PoolRegistry:
+    """Connection pools and SSH tunnels kept per target and reused across requests.
+
+    ``acquire`` returns a connected ``MariaDBClient`` for a ``DatabaseConfig``, opening the tunnel
+    and pool on first use; ``release`` hands it back. Targets nobody has leased for ``idle_seconds``
+    are closed by the sweep started with ``start``, except pinned ones (warm-up targets). A client
+    whose pool could not be created is returned unregistered, with ``pool`` unset, as before.
+    """
+
+    def __init__(self, idle_seconds: float = 300, max_targets: int = 32):
+        self.idle_seconds = idle_seconds
+        self.max_targets = max_targets
+        self._targets = {}
+        self._draining = {}
+        self._locks = {}
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for target in list(self._targets.values()):
+            await self._close(target)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(self.idle_seconds / 4, 60.0)))
+            now = time.monotonic()
+            for target in list(self._targets.values()):
+                if not target.leases and not target.pinned and now - target.last_used > self.idle_seconds:
+                    logger.info(f"Closing idle pool {target.key[:12]}")
+                    await self._close(target)
+            for key in [k for k, lock in self._locks.items() if k not in self._targets and not lock.locked()]:
+                del self._locks[key]
+
+    async def acquire(self, config, pin: bool = False) -> MariaDBClient:
+        key = target_key(config)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            target = self._targets.get(key)
+            if target is not None and not target.healthy():
+                logger.warning(f"Dropping unhealthy pool {key[:12]}")
+                await self._close(target)
+                target = None
+            if target is None:
+                target = await self._open(key, config, pin)
+                if target is None:
+                    return _client(config)
+            target.pinned = target.pinned or pin
+            target.leases += 1
+            target.last_used = time.monotonic()
+            return target.client
+
+    async def release(self, client: MariaDBClient):
+        for target in self._targets.values():
+            if target.client is client:
+                target.leases -= 1
+                target.last_used = time.monotonic()
+                return
+        target = self._draining.get(id(client))
+        if target is None:
+            # Unregistered: the pool could not be created
+            await client.disconnect()
+            return
+        target.leases -= 1
+        if not target.leases:
+            del self._draining[id(client)]
+            await self._shutdown(target)
+
+    async def _open(self, key: str, config, pinned: bool):
+        tunnel, host, port = None, config.host, config.port
+        if config.use_ssh and config.ssh_config:
+            with start_span("db.tunnel_open", **{"db.name": config.database}):
+                try:
+                    tunnel = await anyio.to_thread.run_sync(_open_tunnel, config)
+                except Exception as e:
+                    logger.error(f"SSH tunnel failed: {e}")
+                    return None
+            host, port = "127.0.0.1", tunnel.local_bind_port
+        client = _client(config)
+        await client.connect(host=host, port=port)
+        if client.pool is None:
+            if tunnel:
+                await anyio.to_thread.run_sync(tunnel.stop)
+            return None
+        if len(self._targets) >= self.max_targets:
+            await self._evict_one()
+        target = PooledTarget(key, client, tunnel, pinned)
+        self._targets[key] = target
+        return target
+
+    async def _evict_one(self):
+        idle = [t for t in self._targets.values() if not t.leases and not t.pinned]
+        if idle:
+            await self._close(min(idle, key=lambda t: t.last_used))
+
+    async def _close(self, target: PooledTarget):
+        self._targets.pop(target.key, None)
+        if target.leases:
+            # Still in use: the last ``release`` closes it
+            self._draining[id(target.client)] = target
+        else:
+            await self._shutdown(target)
+
+    async def _shutdown(self, target: PooledTarget):
+        try:
+            await target.client.disconnect()
+            if target.tunnel:
+                await anyio.to_thread.run_sync(target.tunnel.stop)
+        except Exception as e:
+            logger.warning(f"Closing pool {target.key[:12]} failed: {e}")
+
+    def stats(self) -> dict:
+        targets = [t.stats() for t in self._targets.values()]
+        return {
+            "pools": len(targets),
+            "tunnels": sum(1 for t in self._targets.values() if t.tunnel is not None),
+            "connections": sum(t["pool"]["size"] or 0 for t in targets),
+            "leased": sum(t["leases"] for t in targets),
+            "targets": targets,
+        }
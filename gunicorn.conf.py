@@ -0,0 +1,32 @@
+# gunicorn.conf.py - multi-worker deployment
+#   gunicorn -c gunicorn.conf.py main:app
+# Workers share LLM results and schema snapshots through the SQLite cache at SHARED_CACHE_PATH
+# and Prometheus metrics through PROMETHEUS_MULTIPROC_DIR, so no external service is needed.
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2, 8)))
+worker_class = "uvicorn.workers.UvicornWorker"
+# /analyze waits on several LLM calls; a worker silent for longer than this is restarted
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 180))
+graceful_timeout = 30
+keepalive = 5
+
+# Set before any worker imports prometheus_client; every worker inherits it
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "queryvault-prometheus"))
+
+
+def on_starting(server):
+    # Counters from a previous run would otherwise be summed into this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,35 +1,89 @@
-from fastapi import FastAPI, HTTPException, Request, Depends, status, Form
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, status, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime, timedelta
 import os
 import re
+import json
+import time
+import base64
 import logging
-from sshtunnel import SSHTunnelForwarder
-import io
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 import aiomysql
-from typing import Optional, List
-import certifi
+from typing import Optional, List, Literal
 
 # Internal imports
 from utils.config import Config
 from utils.response_formatter import ResponseFormatter
-from db.mariadb_client import MariaDBClient
-from agents.query_optimizer import optimize_query
+from utils.timing import StageTimer
+from utils.metrics import IN_FLIGHT, render_metrics
+from utils.tracing import start_trace, current_span, current_trace_id, TraceIdLogFilter
+from utils.profiler import SamplingProfiler, PROFILE_ID_RE
+from utils.sql_tokenizer import tokenize, statement_type
+from utils.serialization import ORJSONResponse, dumps, json_response
+from utils.compression import CompressionMiddleware
+from utils.shared_cache import get_cache
+from utils.jobs import JobManager, JobQueueFull
+from utils.llm_backends import get_backend, close_backend
+from db.mariadb_client import MariaDBClient, PoolTimeout, track_pool_usage
+from db.pool_registry import PoolRegistry
+from agents.query_optimizer import optimize_query, stream_optimize_query
+from agents.plan_diff import add_plan_diff
+from agents.column_profiler import collect_profile
+from agents.data_quality_rules import check_integrity
+from agents.target_comparison import compare_targets
 from agents.cost_advisor import estimate_cost
 from agents.schema_advisor import advise_schema
 from agents.data_validator import validate_query
-from utils.auth_utils import get_password_hash, verify_password, create_access_token, decode_access_token
+from agents.workload_advisor import advise_workload, build_workload, extract_access_patterns
+from agents.index_auditor import audit_indexes, trial_without_indexes
+from utils.auth_utils import get_password_hash, verify_password, create_access_token, decode_access_token, is_admin, admin_email_from_cookie
 
 # Logging
-logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s')
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(TraceIdLogFilter())
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="QueryVault Enterprise")
+# MongoDB, mail and the job pool are built at startup, not import, so workers and tools can import
+# main without those services configured. Their client libraries are imported there too.
+mongo_client = None
+db = None
+fastmail = None
+jobs = None
+pools = PoolRegistry(idle_seconds=Config.DB_POOL_IDLE_SECONDS, max_targets=Config.DB_POOL_MAX_TARGETS)
+STARTED_AT = time.time()
+# Outcome of each startup warm-up step, for /healthz and /readyz
+warmup = {"done": False, "steps": {}}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global mongo_client, db, fastmail, jobs
+    mongo_client, db = connect_app_db()
+    fastmail = build_mailer()
+    jobs = JobManager(db.analysis_jobs, concurrency=Config.JOB_CONCURRENCY, max_queued=Config.JOB_QUEUE_MAX,
+                      lease_seconds=Config.JOB_LEASE_SECONDS, ttl_hours=Config.JOB_TTL_HOURS)
+    await jobs.start()
+    await pools.start()
+    # Runs in the background so a slow dependency delays readiness, not startup
+    warmup_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        await jobs.stop()
+        await pools.stop()
+        await close_backend()
+        mongo_client.close()
+
+app = FastAPI(title="QueryVault Enterprise", default_response_class=ORJSONResponse, lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 
 app.add_middleware(
@@ -39,32 +93,141 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=Config.COMPRESSION_MIN_BYTES,
+                   gzip_level=Config.GZIP_LEVEL, brotli_quality=Config.BROTLI_QUALITY)
+
+# Endpoints with their own in-flight gauge series; everything else is counted as "other"
+IN_FLIGHT_ENDPOINTS = {"/analyze", "/analyze-schema", "/auth/login", "/auth/register"}
 
-from motor.motor_asyncio import AsyncIOMotorClient
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
-from bson import ObjectId
+@app.middleware("http")
+async def track_in_flight(request: Request, call_next):
+    endpoint = request.url.path if request.url.path in IN_FLIGHT_ENDPOINTS else "other"
+    with IN_FLIGHT.labels(endpoint=endpoint).track_inprogress():
+        return await call_next(request)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with start_trace(f"{request.method} {request.url.path}", request.headers.get("traceparent"),
+                     **{"http.method": request.method, "http.target": request.url.path}) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        response.headers["traceparent"] = span.traceparent
+        response.headers["X-Trace-Id"] = span.trace_id
+        return response
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    # Only admin requests that opt in with X-Profile are sampled; everything else goes straight through
+    if not request.headers.get("X-Profile"):
+        return await call_next(request)
+    admin_email = admin_email_from_cookie(request.cookies.get("access_token"))
+    if not admin_email:
+        logger.warning("Ignoring X-Profile header from non-admin request")
+        return await call_next(request)
+
+    # Samples the event-loop thread, so concurrent requests on this worker show up too
+    profiler = SamplingProfiler(threading.get_ident(), Config.PROFILE_INTERVAL_MS)
+    profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    profile_id = profiler.save(Config.PROFILE_DIR, {
+        "method": request.method,
+        "path": request.url.path,
+        "status_code": response.status_code,
+        "requested_by": admin_email,
+        "trace_id": response.headers.get("X-Trace-Id"),
+        "server_timing": response.headers.get("Server-Timing"),
+    })
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Url"] = f"/admin/profiles/{profile_id}"
+    return response
 
 # --- Database Helper for App Data (MongoDB) ---
-mongo_client = AsyncIOMotorClient(
-    os.getenv("MONGO_URI", "mongodb://localhost:27017"),
-    tlsCAFile=certifi.where()
-)
-db = mongo_client[os.getenv("MONGO_DB_NAME", "queryvault_db")]
+def connect_app_db():
+    import certifi
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    # The client connects on first use, so startup does not wait for MongoDB
+    client = AsyncIOMotorClient(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        tlsCAFile=certifi.where()
+    )
+    return client, client[os.getenv("MONGO_DB_NAME", "queryvault_db")]
 
 # --- Mail Configuration ---
-mail_conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("MAIL_FROM"),
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME"),
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
-fastmail = FastMail(mail_conf)
+def build_mailer():
+    missing = [name for name in ("MAIL_USERNAME", "MAIL_PASSWORD", "MAIL_FROM") if not os.getenv(name)]
+    if missing:
+        logger.warning(f"Password reset emails disabled: {', '.join(missing)} not set")
+        return None
+
+    from fastapi_mail import ConnectionConfig, FastMail
+
+    mail_conf = ConnectionConfig(
+        MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
+        MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
+        MAIL_FROM=os.getenv("MAIL_FROM"),
+        MAIL_PORT=587,
+        MAIL_SERVER="smtp.gmail.com",
+        MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME"),
+        MAIL_STARTTLS=True,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True
+    )
+    return FastMail(mail_conf)
+
+# --- Warm-up ---
+def default_database():
+    """The DB_* target from the environment, or ``None`` when DB_HOST is unset."""
+    if not Config.DB_HOST:
+        return None
+    return DatabaseConfig(host=Config.DB_HOST, port=Config.DB_PORT, user=Config.DB_USER or "",
+                          password=Config.DB_PASSWORD or "", database=Config.DB_NAME or "")
+
+def precompile_templates():
+    # Compiled templates stay in the Jinja environment's cache
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return {"templates": len(names)}
+
+async def warm_default_db():
+    db_client = await pools.acquire(default_database(), pin=True)
+    try:
+        if db_client.pool is None:
+            raise RuntimeError("could not connect")
+        return {"pool_size": db_client.pool.size}
+    finally:
+        await pools.release(db_client)
+
+async def timed_check(name: str, check, timeout: float) -> dict:
+    """Run ``check()`` with a timeout: ``{"ok", "ms"}`` plus its details or the error."""
+    start = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(check(), timeout)
+        outcome = {**(detail if isinstance(detail, dict) else {}), "ok": True}
+    except Exception as e:
+        logger.warning(f"{name} check failed: {e!r}")
+        outcome = {"ok": False, "error": str(e) or type(e).__name__}
+    return {"ms": round((time.perf_counter() - start) * 1000, 1), **outcome}
+
+async def warm_up():
+    """Pre-connect MongoDB, open the LLM connection, compile templates and create the default database pool."""
+    steps = {
+        "mongo": lambda: db.command("ping"),
+        "llm": lambda: get_backend().warm_up(),
+        "templates": lambda: run_in_threadpool(precompile_templates),
+    }
+    if Config.WARMUP_DEFAULT_DB and Config.DB_HOST:
+        steps["default_db"] = warm_default_db
+    results = await asyncio.gather(*(timed_check(name, step, Config.WARMUP_TIMEOUT_SECONDS) for name, step in steps.items()))
+    warmup["steps"] = dict(zip(steps, results))
+    warmup["done"] = True
+    summary = ", ".join(f"{name}={r['ms']}ms" + ("" if r["ok"] else " (failed)") for name, r in warmup["steps"].items())
+    logger.info(f"Warm-up finished: {summary}")
 
 # --- Authentication Dependency ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
@@ -104,6 +267,19 @@ class SSHConfig(BaseModel):
     password: Optional[str] = None
     private_key: Optional[str] = None
 
+class PoolSettings(BaseModel):
+    # Unset fields use the DB_POOL_* defaults
+    min_size: Optional[int] = Field(None, ge=0, le=50)
+    max_size: Optional[int] = Field(None, ge=1, le=100)
+    recycle_seconds: Optional[int] = Field(None, ge=-1)  # replace connections older than this; -1 never
+    acquire_timeout_seconds: Optional[float] = Field(None, gt=0, le=300)
+
+    @model_validator(mode="after")
+    def check_sizes(self):
+        if self.min_size is not None and self.max_size is not None and self.min_size > self.max_size:
+            raise ValueError("pool min_size cannot exceed max_size")
+        return self
+
 class DatabaseConfig(BaseModel):
     host: str
     port: int = 3306
@@ -112,73 +288,319 @@ class DatabaseConfig(BaseModel):
     database: str
     use_ssh: bool = False
     ssh_config: Optional[SSHConfig] = None
+    pool: Optional[PoolSettings] = None
 
 class QueryRequest(BaseModel):
     sql: str
     database: DatabaseConfig
+    # True: the query runs read-only under the SANDBOX_* limits for sample rows. False (production): plan-only,
+    # the query is EXPLAINed but never executed
     run_in_sandbox: bool = True
+    # Sections to compute and return (e.g. ["summary", "optimization"]); omit for all of them
+    fields: Optional[List[str]] = None  # also accepted as "include"
+    max_section_bytes: Optional[int] = Field(None, ge=1024)  # per technical_details part; default ANALYZE_SECTION_MAX_BYTES
+    # technical_details.sample_rows as a dict per row, or "columnar": column names once plus value arrays
+    sample_rows_encoding: Literal["objects", "columnar"] = "objects"
+    # More replicas/shards with the same schema: their schema, index stats and EXPLAIN are compared with `database`'s
+    targets: List[DatabaseConfig] = Field([], max_length=Config.FANOUT_MAX_TARGETS)
+    async_job: bool = False  # return a job id at once (also selected by Prefer: respond-async)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _include_alias(cls, data):
+        if isinstance(data, dict) and "include" in data and "fields" not in data:
+            data = {**data, "fields": data["include"]}
+        return data
 
 class SchemaRequest(BaseModel):
     database: DatabaseConfig
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    limit: Optional[int] = Field(None, ge=1, le=5000)  # tables per page; omit for all tables
+    table_filter: Optional[str] = None  # substring, or LIKE pattern when it contains %
+    include_indexes: bool = False
+    include_row_counts: bool = False
+    stream: bool = False  # NDJSON, one line per table (also selected by Accept: application/x-ndjson)
+
+class WorkloadQuery(BaseModel):
+    sql: str
+    frequency: float = Field(1.0, ge=0)  # executions per workload period
+
+class WorkloadRequest(BaseModel):
+    database: DatabaseConfig
+    queries: List[WorkloadQuery] = Field(..., min_length=1)
+    storage_budget_mb: Optional[float] = Field(None, gt=0)  # total size of new indexes
+    write_budget: Optional[float] = Field(None, ge=0)  # extra index writes per workload period
+    max_indexes: int = Field(10, ge=1, le=50)
+    use_explain: bool = True
+
+class IndexAuditRequest(BaseModel):
+    database: DatabaseConfig
+    table_filter: Optional[str] = None  # substring, or LIKE pattern when it contains %
+    trial_in_sandbox: bool = False  # re-EXPLAIN trial_queries with IGNORE INDEX hints for each finding (no DDL)
+    trial_queries: List[str] = []
+
+class CacheInvalidateRequest(BaseModel):
+    namespace: str = Field("schema", pattern="^(schema|llm)$")
+    database: Optional[DatabaseConfig] = None  # schema snapshots of this target; omit (admin) for every target
 
 # --- Helper Logic ---
-async def get_connection_details(db_config: DatabaseConfig):
-    tunnel = None
-    host = db_config.host
-    port = db_config.port
-
-    if db_config.use_ssh and db_config.ssh_config:
-        ssh_cfg = db_config.ssh_config
-        tunnel_kwargs = {
-            "ssh_address_or_host": (ssh_cfg.host, ssh_cfg.port),
-            "ssh_username": ssh_cfg.user,
-            "remote_bind_address": (db_config.host, db_config.port),
-        }
-        if ssh_cfg.private_key:
-            tunnel_kwargs["ssh_pkey"] = io.StringIO(ssh_cfg.private_key)
-        else:
-            tunnel_kwargs["ssh_password"] = ssh_cfg.password
-
-        tunnel = SSHTunnelForwarder(**tunnel_kwargs)
-        tunnel.start()
-        host = "127.0.0.1"
-        port = tunnel.local_bind_port
-
-    db_client = MariaDBClient(
-        host=db_config.host,
-        user=db_config.user,
-        password=db_config.password,
-        database=db_config.database,
-        port=db_config.port
-    )
-    return db_client, tunnel, host, port
+def encode_schema_cursor(table_name: str) -> str:
+    return base64.urlsafe_b64encode(table_name.encode()).decode().rstrip("=")
+
+def decode_schema_cursor(cursor: Optional[str]) -> Optional[str]:
+    if not cursor:
+        return None
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid schema cursor")
+
+async def stream_schema_ndjson(db_client, request: "SchemaRequest", after: Optional[str]):
+    """NDJSON body for /analyze-schema: a meta line, one line per table, then an end line with the cursor."""
+    try:
+        yield json.dumps({"type": "meta", "database": request.database.database}) + "\n"
+        count, last = 0, None
+        try:
+            async for entry in db_client.iter_schema(
+                after=after, limit=request.limit, table_filter=request.table_filter,
+                include_indexes=request.include_indexes, include_row_counts=request.include_row_counts,
+                batch_size=Config.SCHEMA_BATCH_SIZE,
+            ):
+                count, last = count + 1, entry["name"]
+                yield json.dumps({"type": "table", **entry}, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Schema stream failed: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        next_cursor = encode_schema_cursor(last) if request.limit and count == request.limit else None
+        yield json.dumps({"type": "end", "tables": count, "next_cursor": next_cursor}) + "\n"
+    finally:
+        await pools.release(db_client)
+
+def execution_profile(sandbox: bool) -> dict:
+    """How /analyze touches the target: ``sandbox`` runs the query read-only under limits, ``production`` only EXPLAINs it."""
+    if not sandbox:
+        return {"mode": "production", "plan_only": True}
+    return {"mode": "sandbox", "read_only": True,
+            "statement_timeout_seconds": Config.SANDBOX_STATEMENT_TIMEOUT_SECONDS,
+            "max_memory_mb": Config.SANDBOX_MAX_MEMORY_MB, "low_priority": Config.SANDBOX_LOW_PRIORITY}
+
+PLAN_ONLY_RESULT = {"error": "The query is not executed in production mode (run_in_sandbox is false): plan-only"}
+
+async def fetch_analysis_inputs(db_client, query: str, needed: set, timer: StageTimer, sandbox: bool = True):
+    """Schema context, index catalog, EXPLAIN, sample rows, column profile and foreign key orphan counts for
+    /analyze, fetching only what ``needed`` lists.
+
+    Outside the sandbox (production mode) nothing but schema reads and EXPLAIN runs on the target, so there are no
+    sample rows, profile or orphan counts.
+    """
+    is_select = statement_type(query) == "select"
+    fetches = {
+        "schema_context": ("schema_fetch", lambda: db_client.get_schema_context(query), True),
+        "index_catalog": ("index_catalog", lambda: db_client.get_index_catalog(query), True),
+        "explain": ("explain", lambda: db_client.explain(query), is_select),
+        "sample_rows": ("sample_fetch", lambda: db_client.fetch_sample_rows(query), is_select and sandbox),
+        "column_profile": ("profile_fetch", lambda: collect_profile(db_client, query), is_select and sandbox),
+        "integrity": ("integrity_check", lambda: check_integrity(db_client, query), is_select and sandbox),
+    }
+
+    async def fetch(stage, load):
+        with timer.stage(stage):
+            return await load()
+
+    # Each fetch takes its own pooled connection, so they overlap up to the pool's max_size
+    wanted = [name for name, (_, _, applies) in fetches.items() if name in needed and applies]
+    results = await asyncio.gather(*(fetch(*fetches[name][:2]) for name in wanted))
+    inputs = dict(zip(wanted, results))
+    if not sandbox:
+        inputs.update((name, PLAN_ONLY_RESULT) for name in ("sample_rows", "column_profile", "integrity")
+                      if name in needed)
+    return tuple(inputs.get(name, {}) for name in fetches)
+
+# What the target comparison reads from every target
+FANOUT_INPUTS = {"schema_context", "index_catalog", "explain"}
+
+def target_label(target: DatabaseConfig) -> str:
+    return f"{target.host}:{target.port}/{target.database}"
+
+async def fetch_target_inputs(target: DatabaseConfig, query: str) -> dict:
+    """Schema context, index catalog and EXPLAIN of ``query`` on one fan-out target, from that target's own pool,
+    FANOUT_TARGET_CONCURRENCY fetches at a time. A target that fails or misses FANOUT_TARGET_TIMEOUT_SECONDS is
+    reported with its error instead of failing the analysis."""
+    label = target_label(target)
+    try:
+        db_client = await pools.acquire(target)
+    except Exception as e:
+        logger.warning(f"Fan-out target {label} unavailable: {e}")
+        return {"target": label, "error": str(e)}
+    try:
+        limit = asyncio.Semaphore(max(1, min(Config.FANOUT_TARGET_CONCURRENCY, db_client.max_size)))
+
+        async def fetch(load):
+            async with limit:
+                return await load()
+
+        loads = [lambda: db_client.get_schema_context(query), lambda: db_client.get_index_catalog(query)]
+        if statement_type(query) == "select":
+            loads.append(lambda: db_client.explain(query))
+        results = await asyncio.wait_for(asyncio.gather(*(fetch(load) for load in loads)),
+                                         Config.FANOUT_TARGET_TIMEOUT_SECONDS)
+        return {"target": label, **dict(zip(("schema_context", "index_catalog", "explain"), results))}
+    except asyncio.TimeoutError:
+        logger.warning(f"Fan-out target {label} timed out")
+        return {"target": label, "error": f"No answer within {Config.FANOUT_TARGET_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        logger.warning(f"Fan-out target {label} failed: {e}")
+        return {"target": label, "error": str(e)}
+    finally:
+        await pools.release(db_client)
+
+async def fetch_inputs_with_targets(db_client, request: QueryRequest, query: str, needed: set, timer: StageTimer):
+    """``fetch_analysis_inputs`` on ``request.database``, with ``request.targets`` read concurrently (stage
+    ``fanout``) and compared with it. Returns ``(inputs, comparison)``; the comparison is None without targets."""
+    if not request.targets:
+        return await fetch_analysis_inputs(db_client, query, needed, timer, request.run_in_sandbox), None
+
+    async def fan_out():
+        with timer.stage("fanout"):
+            return await asyncio.gather(*(fetch_target_inputs(t, query) for t in request.targets))
+
+    inputs, others = await asyncio.gather(
+        fetch_analysis_inputs(db_client, query, needed | FANOUT_INPUTS, timer, request.run_in_sandbox), fan_out())
+    schema_context, index_catalog, explain_plan = inputs[:3]
+    primary = {"target": target_label(request.database), "schema_context": schema_context,
+               "index_catalog": index_catalog, "explain": explain_plan}
+    with timer.stage("compare_targets"):
+        comparison = compare_targets([primary, *others])
+    return inputs, comparison
+
+# Agent name -> Server-Timing stage, as in /analyze
+AGENT_STAGES = {
+    "optimizer": "llm_query_optimizer",
+    "cost_advisor": "llm_cost_advisor",
+    "schema_advisor": "llm_schema_advisor",
+    "data_validator": "llm_data_validator",
+}
+
+async def stream_analysis_ndjson(query: str, inputs: tuple, needed: set, selected: set, target: DatabaseConfig,
+                                 max_section_bytes: int, traceparent: Optional[str], trace_id: Optional[str],
+                                 pool: Optional[dict] = None, execution: Optional[dict] = None,
+                                 sample_rows_encoding: str = "objects", comparison: Optional[dict] = None):
+    """NDJSON body for /analyze/stream.
+
+    A meta line; a ``field`` line for each optimizer field as the model completes it, with the
+    partial sections built so far; an ``agent`` line with each agent's sections when it finishes
+    (agents run concurrently); then a ``result`` line holding the document /analyze returns.
+    The optimizer's rewrite is EXPLAINed on a connection leased from ``target``'s pool again. With fan-out
+    targets, the optimizer also gets their ``comparison`` and the result carries it as ``targets``.
+    """
+    schema_context, index_catalog, explain_plan, sample_rows, column_profile, integrity = inputs
+    timer = StageTimer(endpoint="analyze_stream")
+    queue = asyncio.Queue()
+
+    async def run(agent):
+        # The request span has finished by the time the body streams, so each agent reports under its own span
+        with start_trace("analyze_stream.agent", traceparent=traceparent, agent=agent):
+            try:
+                with timer.stage(AGENT_STAGES[agent]):
+                    if agent == "optimizer":
+                        partial = {}
+                        async for event in stream_optimize_query(query, schema_context, explain_plan, sample_rows,
+                                                                 index_catalog=index_catalog,
+                                                                 target_comparison=comparison):
+                            if event["type"] == "field":
+                                partial[event["key"]] = event["value"]
+                                await queue.put({
+                                    "type": "field", "agent": agent, "key": event["key"], "value": event["value"],
+                                    "sections": ResponseFormatter.format_agent(
+                                        agent, {"status": "partial", "details": partial}, selected),
+                                })
+                            else:
+                                result = event["result"]
+                    elif agent == "cost_advisor":
+                        result = await estimate_cost(query, explain_plan, index_catalog)
+                    elif agent == "schema_advisor":
+                        result = await advise_schema(query, schema_context, index_catalog)
+                    else:
+                        result = await validate_query(query, column_profile, schema_context, integrity)
+                if agent == "optimizer" and result.get("status") == "success" and isinstance(explain_plan, list):
+                    with timer.stage("explain_optimized"):
+                        db_client = await pools.acquire(target)
+                        try:
+                            result = await add_plan_diff(db_client, query, explain_plan, result)
+                        finally:
+                            await pools.release(db_client)
+            except Exception as e:
+                logger.exception(f"Streamed {agent} failed: {e}")
+                result = {"status": "error", "details": {"error": str(e)}}
+        await queue.put({"type": "agent", "agent": agent, "result": result})
+
+    yield dumps({"type": "meta", "database": target.database, "original_query": query, "trace_id": trace_id}) + b"\n"
+    tasks = [asyncio.create_task(run(agent)) for agent in AGENT_STAGES if agent in needed]
+    outputs = {}
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event["type"] == "agent":
+                remaining -= 1
+                result = outputs[event["agent"]] = event.pop("result")
+                event["status"] = result.get("status")
+                event["sections"] = ResponseFormatter.format_agent(event["agent"], result, selected)
+            yield dumps(event) + b"\n"
+        result = ResponseFormatter.format_analysis(
+            query, schema_context, explain_plan, sample_rows, outputs.get("optimizer"), outputs.get("cost_advisor"),
+            outputs.get("schema_advisor"), outputs.get("data_validator"), target.database,
+            index_catalog=index_catalog, fields=selected, max_section_bytes=max_section_bytes,
+            sample_rows_encoding=sample_rows_encoding
+        )
+        result["trace_id"] = trace_id
+        result["pool"] = pool
+        result["execution"] = execution
+        if comparison is not None:
+            result["targets"] = comparison
+        yield dumps({"type": "result", "data": result, "timing": timer.as_dict()}) + b"\n"
+    finally:
+        # Client went away mid-stream: stop paying for LLM calls nobody will read
+        for task in tasks:
+            task.cancel()
 
 # --- AUTH ENDPOINTS ---
 @app.post("/auth/register")
-async def register(user: UserRegister):
-    existing_user = await db.users.find_one({"email": user.email})
+async def register(user: UserRegister, response: Response):
+    timer = StageTimer(endpoint="register")
+    with timer.stage("user_lookup"):
+        existing_user = await db.users.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Identity already registered")
     
-    hashed_pw = get_password_hash(user.password)
-    await db.users.insert_one({
-        "email": user.email,
-        "hashed_password": hashed_pw,
-        "full_name": user.full_name,
-        "created_at": datetime.utcnow()
-    })
+    with timer.stage("password_hash"):
+        hashed_pw = get_password_hash(user.password)
+    with timer.stage("user_insert"):
+        await db.users.insert_one({
+            "email": user.email,
+            "hashed_password": hashed_pw,
+            "full_name": user.full_name,
+            "created_at": datetime.utcnow()
+        })
+    response.headers["Server-Timing"] = timer.server_timing()
     return {"status": "success"}
 
 @app.post("/auth/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await db.users.find_one({"email": form_data.username})
+    timer = StageTimer(endpoint="login")
+    with timer.stage("user_lookup"):
+        user = await db.users.find_one({"email": form_data.username})
 
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    with timer.stage("password_verify"):
+        valid = bool(user) and verify_password(form_data.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid neural key")
 
     access_token = create_access_token(data={"sub": user["email"]})
     response = RedirectResponse(url="/studio", status_code=status.HTTP_302_FOUND)
     response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
+    response.headers["Server-Timing"] = timer.server_timing()
     return response
 
 @app.post("/auth/forgot-password")
@@ -192,13 +614,18 @@ async def forgot_password(request: Request):
         reset_token = create_access_token(data={"sub": email, "type": "reset"}, expires_delta=timedelta(minutes=30))
         reset_link = f"{request.base_url}reset-password?token={reset_token}"
         
-        message = MessageSchema(
-            subject="QueryVault Emergency Access Reset",
-            recipients=[email],
-            body=f"Neural identity recovery initiated. Use this link to reset your access key: {reset_link}",
-            subtype=MessageType.plain
-        )
-        await fastmail.send_message(message)
+        if fastmail is None:
+            logger.warning("Password reset requested but mail is not configured")
+        else:
+            from fastapi_mail import MessageSchema, MessageType
+
+            message = MessageSchema(
+                subject="QueryVault Emergency Access Reset",
+                recipients=[email],
+                body=f"Neural identity recovery initiated. Use this link to reset your access key: {reset_link}",
+                subtype=MessageType.plain
+            )
+            await fastmail.send_message(message)
     
     return {"message": "If this identity exists, a recovery signal has been broadcasted."}
 
@@ -269,40 +696,411 @@ async def vault_page(request: Request, user=Depends(get_current_user)):
 async def about_page(request: Request, user=Depends(get_current_user)):
     return templates.TemplateResponse("about.html", {"request": request, "user": user})
 
+async def run_analysis(request: QueryRequest, selected: set, timer: StageTimer) -> dict:
+    """The /analyze pipeline: fetch the inputs the ``selected`` sections need, run their agents, format."""
+    # Only the stages the selected sections depend on run; skipped stages are absent from Server-Timing
+    needed = ResponseFormatter.required_inputs(selected)
+    query = request.sql.strip()
+    opt = cost = schema_adv = data_val = None
+    usage = track_pool_usage()
+    with timer.stage("pool_connect"):
+        db_client = await pools.acquire(request.database)
+    try:
+        inputs, comparison = await fetch_inputs_with_targets(db_client, request, query, needed, timer)
+        schema_context, index_catalog, explain_plan, sample_rows, column_profile, integrity = inputs
+
+        if "optimizer" in needed:
+            with timer.stage("llm_query_optimizer"):
+                opt = await optimize_query(query, schema_context, explain_plan, sample_rows, index_catalog=index_catalog,
+                                           target_comparison=comparison)
+            with timer.stage("explain_optimized"):
+                opt = await add_plan_diff(db_client, query, explain_plan, opt)
+        if "cost_advisor" in needed:
+            with timer.stage("llm_cost_advisor"):
+                cost = await estimate_cost(query, explain_plan, index_catalog)
+        if "schema_advisor" in needed:
+            with timer.stage("llm_schema_advisor"):
+                schema_adv = await advise_schema(query, schema_context, index_catalog)
+        if "data_validator" in needed:
+            with timer.stage("llm_data_validator"):
+                data_val = await validate_query(query, column_profile, schema_context, integrity)
+
+        with timer.stage("format"):
+            result = ResponseFormatter.format_analysis(
+                query, schema_context, explain_plan, sample_rows, opt, cost, schema_adv, data_val, request.database.database,
+                index_catalog=index_catalog, fields=selected,
+                max_section_bytes=request.max_section_bytes or Config.ANALYZE_SECTION_MAX_BYTES,
+                sample_rows_encoding=request.sample_rows_encoding
+            )
+        result["trace_id"] = current_trace_id()
+        result["pool"] = usage.as_dict()
+        result["execution"] = execution_profile(request.run_in_sandbox)
+        if comparison is not None:
+            result["targets"] = comparison
+        return result
+    finally:
+        await pools.release(db_client)
+
+def job_summary(request: QueryRequest) -> dict:
+    """What is stored with an analysis job: the query and target, never passwords or SSH keys."""
+    target = request.database
+    return {"sql": request.sql, "fields": request.fields, "run_in_sandbox": request.run_in_sandbox,
+            "database": {"host": target.host, "port": target.port, "user": target.user,
+                         "database": target.database, "use_ssh": target.use_ssh},
+            "targets": [target_label(t) for t in request.targets]}
+
 # --- ANALYSIS ENDPOINTS ---
 @app.post("/analyze")
-async def analyze(request: QueryRequest, user=Depends(get_current_user)):
+async def analyze(request: QueryRequest, http_request: Request, response: Response, user=Depends(get_current_user)):
     if not user: raise HTTPException(status_code=401)
-    query = request.sql.strip()
-    db_client, tunnel, host, port = await get_connection_details(request.database)
     try:
-        await db_client.connect(host=host, port=port)
-        schema_context = await db_client.get_schema_context(query)
-        explain_plan = await db_client.explain(query) if query.lower().startswith("select") else {}
-        sample_rows = await db_client.fetch_sample_rows(query) if query.lower().startswith("select") else {}
-        
-        opt = await optimize_query(query, schema_context, explain_plan, sample_rows)
-        cost = await estimate_cost(query, explain_plan)
-        schema_adv = await advise_schema(query, schema_context)
-        data_val = await validate_query(query, sample_rows)
+        selected = ResponseFormatter.resolve_fields(request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.async_job or "respond-async" in http_request.headers.get("prefer", ""):
+        async def work():
+            timer = StageTimer(endpoint="analyze_job")
+            result = await run_analysis(request, selected, timer)
+            result["timing"] = timer.as_dict()
+            return result
 
-        return ResponseFormatter.format_analysis(
-            query, schema_context, explain_plan, sample_rows, opt, cost, schema_adv, data_val, request.database.database
-        )
+        span = current_span()
+        try:
+            job = await jobs.submit(user["email"], "analyze", job_summary(request), work,
+                                    traceparent=span.traceparent if span else None)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=f"Analysis queue is full ({e}); retry later",
+                                headers={"Retry-After": "30"})
+        job.update(status_url=f"/jobs/{job['job_id']}", events_url=f"/jobs/{job['job_id']}/events")
+        return ORJSONResponse(job, status_code=202, headers={"Location": job["status_url"]})
+
+    timer = StageTimer(endpoint="analyze")
+    try:
+        result = await run_analysis(request, selected, timer)
+    finally:
+        response.headers["Server-Timing"] = timer.server_timing()
+    # Rendered directly: technical_details is the bulk of the body and needs no jsonable_encoder pass
+    return json_response(result, response)
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: QueryRequest, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    try:
+        selected = ResponseFormatter.resolve_fields(request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    needed = ResponseFormatter.required_inputs(selected)
+    timer = StageTimer(endpoint="analyze_stream")
+    query = request.sql.strip()
+    usage = track_pool_usage()
+    with timer.stage("pool_connect"):
+        db_client = await pools.acquire(request.database)
+    try:
+        inputs, comparison = await fetch_inputs_with_targets(db_client, request, query, needed, timer)
     finally:
-        await db_client.disconnect()
-        if tunnel: tunnel.stop()
+        # The agents only need the fetched inputs, so the pool is released before streaming starts
+        await pools.release(db_client)
+    span = current_span()
+    return StreamingResponse(
+        stream_analysis_ndjson(
+            query, inputs, needed, selected, request.database,
+            request.max_section_bytes or Config.ANALYZE_SECTION_MAX_BYTES,
+            span.traceparent if span else None, current_trace_id(), usage.as_dict(),
+            execution_profile(request.run_in_sandbox), request.sample_rows_encoding, comparison,
+        ),
+        media_type="application/x-ndjson",
+        headers={"Server-Timing": timer.server_timing()},
+    )
 
 @app.post("/analyze-schema")
-async def analyze_schema(request: SchemaRequest, user=Depends(get_current_user)):
+async def analyze_schema(request: SchemaRequest, http_request: Request, response: Response, user=Depends(get_current_user)):
     if not user: raise HTTPException(status_code=401)
-    db_client, tunnel, host, port = await get_connection_details(request.database)
+    timer = StageTimer(endpoint="analyze_schema")
+    after = decode_schema_cursor(request.cursor)
+    stream = request.stream or "application/x-ndjson" in http_request.headers.get("accept", "")
+    paged = any([request.cursor, request.limit, request.table_filter, request.include_indexes, request.include_row_counts])
+    usage = track_pool_usage()
+    with timer.stage("pool_connect"):
+        db_client = await pools.acquire(request.database)
+    streaming = False
     try:
-        await db_client.connect(host=host, port=port)
-        return {"database": request.database.database, "tables": await db_client.get_full_schema()}
+        if stream:
+            # The generator holds the lease from here on and releases it when the body is done
+            streaming = True
+            return StreamingResponse(
+                stream_schema_ndjson(db_client, request, after),
+                media_type="application/x-ndjson",
+                headers={"Server-Timing": timer.server_timing()},
+            )
+        if not paged:
+            with timer.stage("schema_fetch"):
+                tables = await db_client.get_full_schema()
+            return {"database": request.database.database, "tables": tables, "pool": usage.as_dict()}
+
+        tables, table_meta, last = {}, {}, None
+        with timer.stage("schema_fetch"):
+            try:
+                async for entry in db_client.iter_schema(
+                    after=after, limit=request.limit, table_filter=request.table_filter,
+                    include_indexes=request.include_indexes, include_row_counts=request.include_row_counts,
+                    batch_size=Config.SCHEMA_BATCH_SIZE,
+                ):
+                    last = entry.pop("name")
+                    tables[last] = entry.pop("columns")
+                    if entry:
+                        table_meta[last] = entry
+            except Exception as e:
+                logger.error(f"Paged schema fetch failed: {e}")
+                return {"database": request.database.database, "tables": {"error": str(e)}, "next_cursor": None}
+        result = {
+            "database": request.database.database,
+            "tables": tables,
+            "next_cursor": encode_schema_cursor(last) if request.limit and len(tables) == request.limit else None,
+            "pool": usage.as_dict(),
+        }
+        if table_meta:
+            result["table_meta"] = table_meta
+        return result
     finally:
-        await db_client.disconnect()
-        if tunnel: tunnel.stop()
+        if not streaming:
+            await pools.release(db_client)
+        response.headers["Server-Timing"] = timer.server_timing()
+
+@app.post("/advise-workload")
+async def advise_workload_endpoint(request: WorkloadRequest, response: Response, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    timer = StageTimer(endpoint="advise_workload")
+    with timer.stage("fingerprint"):
+        workload = build_workload([q.model_dump() for q in request.queries])
+    usage = track_pool_usage()
+    with timer.stage("pool_connect"):
+        db_client = await pools.acquire(request.database)
+    try:
+        tables = sorted({t for q in workload for t in extract_access_patterns(q["sql"])["tables"]})
+        with timer.stage("index_catalog"):
+            index_catalog = await db_client.get_index_catalog(tables=tables)
+            columns = await db_client.get_columns(tables)
+        explains = {}
+        if request.use_explain:
+            # Statements with placeholders cannot be EXPLAINed; the catalog-based estimate is used instead
+            targets = [q for q in workload if q["type"] == "select"
+                       and not any(t.kind == "param" for t in tokenize(q["sql"]))][:Config.WORKLOAD_EXPLAIN_LIMIT]
+            # More concurrent EXPLAINs than pool connections would only queue on the pool
+            limit = asyncio.Semaphore(max(1, min(Config.WORKLOAD_EXPLAIN_CONCURRENCY, db_client.max_size)))
+
+            async def explain_one(q):
+                async with limit:
+                    explains[q["fingerprint_id"]] = await db_client.explain(q["sql"])
+
+            with timer.stage("explain"):
+                await asyncio.gather(*(explain_one(q) for q in targets))
+        with timer.stage("advise"):
+            result = await run_in_threadpool(
+                advise_workload, workload, index_catalog,
+                columns if isinstance(columns, dict) and "error" not in columns else {}, explains,
+                storage_budget_bytes=request.storage_budget_mb * 1024 * 1024 if request.storage_budget_mb else None,
+                write_budget=request.write_budget, max_indexes=request.max_indexes,
+            )
+        result["database"] = request.database.database
+        result["explained_fingerprints"] = sum(1 for e in explains.values() if isinstance(e, list))
+        result["trace_id"] = current_trace_id()
+        result["pool"] = usage.as_dict()
+        return result
+    finally:
+        await pools.release(db_client)
+        response.headers["Server-Timing"] = timer.server_timing()
+
+@app.post("/analyze-indexes")
+async def analyze_indexes(request: IndexAuditRequest, response: Response, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    if request.trial_in_sandbox and not request.trial_queries:
+        raise HTTPException(status_code=400, detail="trial_in_sandbox needs trial_queries to compare plans")
+    timer = StageTimer(endpoint="analyze_indexes")
+    pool_usage = track_pool_usage()
+    with timer.stage("pool_connect"):
+        db_client = await pools.acquire(request.database)
+    try:
+        with timer.stage("index_catalog"):
+            tables = await db_client.list_tables(table_filter=request.table_filter)
+            if isinstance(tables, dict):
+                return {"database": request.database.database, "agent": "index_auditor", "status": "error", "details": tables}
+            names = [t["TABLE_NAME"] for t in tables]
+            catalog, columns = {}, {}
+            for i in range(0, len(names), Config.SCHEMA_BATCH_SIZE):
+                batch = names[i:i + Config.SCHEMA_BATCH_SIZE]
+                for target, part in ((catalog, await db_client.get_index_catalog(tables=batch)),
+                                     (columns, await db_client.get_columns(batch))):
+                    if "error" in part:
+                        return {"database": request.database.database, "agent": "index_auditor", "status": "error", "details": part}
+                    target.update(part)
+        with timer.stage("index_usage"):
+            usage = await db_client.get_index_usage()
+        with timer.stage("audit"):
+            result = audit_indexes(catalog, columns, usage)
+        if request.trial_in_sandbox and result["status"] == "success":
+            with timer.stage("index_trial"):
+                result["details"]["trial"] = await trial_without_indexes(
+                    db_client, result["details"]["findings"], request.trial_queries, limit=Config.INDEX_TRIAL_LIMIT
+                )
+        result["database"] = request.database.database
+        result["trace_id"] = current_trace_id()
+        result["pool"] = pool_usage.as_dict()
+        return result
+    finally:
+        await pools.release(db_client)
+        response.headers["Server-Timing"] = timer.server_timing()
+
+# --- JOBS ---
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    job = await jobs.get(job_id, user["email"])
+    if job is None: raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+SSE_KEEPALIVE_SECONDS = 15
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, user=Depends(get_current_user)):
+    """Server-sent events: a ``status`` event on every change, then ``result`` once the job finishes."""
+    if not user: raise HTTPException(status_code=401)
+    job = await jobs.get(job_id, user["email"])
+    if job is None: raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events(job):
+        last, quiet_since = None, time.monotonic()
+        while True:
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            if job["status"] in ("succeeded", "failed"):
+                yield b"event: result\ndata: " + dumps(job) + b"\n\n"
+                return
+            if job["status"] != last:
+                last, quiet_since = job["status"], time.monotonic()
+                yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': last})}\n\n"
+            elif time.monotonic() - quiet_since >= SSE_KEEPALIVE_SECONDS:
+                # Comment line so proxies do not close an idle stream
+                quiet_since = time.monotonic()
+                yield ": keep-alive\n\n"
+            # Jobs running in this process wake the stream at once; others are polled
+            await jobs.wait(job_id, Config.JOB_EVENTS_POLL_SECONDS)
+            job = await jobs.get(job_id, user["email"])
+
+    return StreamingResponse(events(job), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def target_login_works(config: DatabaseConfig) -> bool:
+    """Whether ``config``'s credentials open a connection to the target (a pooled one, answering a ping)."""
+    db_client = await pools.acquire(config)
+    try:
+        if db_client.pool is None:
+            return False
+        async with db_client.connection() as conn:
+            await conn.ping(reconnect=False)
+        return True
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logger.warning(f"Cache invalidation refused, could not log in to {config.database}: {e}")
+        return False
+    finally:
+        await pools.release(db_client)
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidateRequest, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    cache = get_cache()
+    if cache is None:
+        return {"status": "disabled", "invalidated": 0}
+    if request.namespace == "schema" and request.database:
+        # After DDL on a target: every worker refetches this login's schema snapshots on the next request.
+        # Anyone but an admin has to prove they can log in to the target first.
+        if not is_admin(user.get("email")) and not await target_login_works(request.database):
+            raise HTTPException(status_code=403, detail="Could not log in to the target with these credentials")
+        target = MariaDBClient(host=request.database.host, user=request.database.user, password="",
+                               database=request.database.database, port=request.database.port)
+        return {"status": "success", "namespace": target.cache_namespace,
+                "invalidated": await target.invalidate_schema_cache()}
+    if not is_admin(user.get("email")): raise HTTPException(status_code=403, detail="Admin access required")
+    count = await run_in_threadpool(cache.invalidate, request.namespace if request.namespace == "llm" else "schema:",
+                                    prefix=request.namespace == "schema")
+    return {"status": "success", "namespace": request.namespace, "invalidated": count}
+
+# --- OBSERVABILITY ---
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # Every connection to the target stayed busy for the whole acquire timeout
+    return ORJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+# --- HEALTH ---
+async def ping_default_db():
+    db_client = await pools.acquire(default_database(), pin=True)
+    try:
+        if db_client.pool is None:
+            raise RuntimeError("could not connect")
+        async with db_client.connection() as conn:
+            await conn.ping(reconnect=False)
+    finally:
+        await pools.release(db_client)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: answers without touching any dependency, with warm-up timings and pool, tunnel and job counts."""
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "warmup": warmup,
+        "pools": pools.stats(),
+        "jobs": jobs.stats() if jobs else None,
+    }
+
+@app.get("/readyz")
+async def readyz(response: Response):
+    """Readiness: 503 until warm-up has finished and MongoDB answers a ping. Other dependencies are reported only."""
+    checks = {"mongo": lambda: db.command("ping")}
+    cache = get_cache()
+    if cache is not None:
+        checks["shared_cache"] = lambda: run_in_threadpool(cache.lookup, "health", "ping")
+    if Config.WARMUP_DEFAULT_DB and Config.DB_HOST:
+        checks["default_db"] = ping_default_db
+    results = await asyncio.gather(*(timed_check(name, check, Config.READY_CHECK_TIMEOUT_SECONDS) for name, check in checks.items()))
+    dependencies = dict(zip(checks, results))
+    ready = warmup["done"] and dependencies["mongo"]["ok"]
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if ready else "not_ready",
+        "warmup_done": warmup["done"],
+        "dependencies": dependencies,
+        "pools": pools.stats(),
+        "jobs": jobs.stats() if jobs else None,
+    }
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return PlainTextResponse(body, media_type=content_type)
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, summary: bool = False, user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    if not is_admin(user.get("email")): raise HTTPException(status_code=403, detail="Admin access required")
+    if not re.match(PROFILE_ID_RE, profile_id): raise HTTPException(status_code=404)
+    ext, media_type = ("json", "application/json") if summary else ("collapsed", "text/plain")
+    path = os.path.join(Config.PROFILE_DIR, f"{profile_id}.{ext}")
+    if not os.path.exists(path): raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}.{ext}")
+
+@app.get("/admin/cache")
+async def cache_stats(user=Depends(get_current_user)):
+    if not user: raise HTTPException(status_code=401)
+    if not is_admin(user.get("email")): raise HTTPException(status_code=403, detail="Admin access required")
+    cache = get_cache()
+    if cache is None:
+        return {"status": "disabled"}
+    return {"status": "success", "pid": os.getpid(), **await run_in_threadpool(cache.stats)}
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -113,7 +113,7 @@ document.addEventListener("DOMContentLoaded", () => {
         const resp = await fetch(API, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ sql, database, run_in_sandbox })
+          body: JSON.stringify({ sql, database, run_in_sandbox, sample_rows_encoding: "columnar" })
         });
 
         if (resp.status === 401) {
@@ -185,6 +185,51 @@ document.addEventListener("DOMContentLoaded", () => {
       .trim();
   }
 
+  function formatWorkRatio(ratio) {
+    if (typeof ratio !== "number") return "";
+    return ` <small>(estimated work ${Math.round(ratio * 1000) / 10}% of the original)</small>`;
+  }
+
+  function renderPlanDiff(diff) {
+    if (!diff) return "";
+    if (diff.skipped) return `<p><em>Plan comparison skipped: ${escapeHtml(diff.skipped)}</em></p>`;
+    const change = c => c ? `${c.before || "-"} → ${c.after || "-"}` : "";
+    const rows = (diff.tables || []).map(t => ({
+      table: t.table,
+      access: t.change ? t.change : change(t.access_change),
+      key: t.change ? (t.key || "") : change(t.key_change),
+      rows: t.change ? t.rows : `${t.rows_before} → ${t.rows_after}`,
+    }));
+    const flags = p => [p.filesort && "filesort", p.temporary && "temporary"].filter(Boolean).join(", ") || "none";
+    return `<p><strong>📐 Plan Diff:</strong> ${escapeHtml(diff.verdict || "")} — rows product ${diff.before.rows_product} → ${diff.after.rows_product}; filesort/temporary ${flags(diff.before)} → ${flags(diff.after)}</p>` + makeTable(rows);
+  }
+
+  function renderProfile(profile) {
+    if (!profile || !profile.columns) return "";
+    const range = c => c.min === undefined ? "" : `${c.min} … ${c.max}`;
+    const notes = c => [
+      c.negative ? `${c.negative} negative` : "",
+      c.future ? `${c.future} in the future` : "",
+      c.empty ? `${c.empty} empty` : "",
+      c.unexpected_type_values ? `${c.unexpected_type_values} of another type` : "",
+    ].filter(Boolean).join(", ");
+    const rows = Object.entries(profile.columns).map(([name, c]) => ({
+      column: name,
+      type: c.type,
+      nulls: `${Math.round(c.null_ratio * 1000) / 10}%`,
+      distinct: c.distinct === undefined ? "" : c.distinct,
+      range: c.length ? `length ${c.length.min} … ${c.length.max}` : range(c),
+      notes: notes(c),
+    }));
+    return `<p><strong>Column profile</strong> (${profile.rows_sampled} rows${profile.complete ? "" : ", sampled"}):</p>` + makeTable(rows);
+  }
+
+  // Columnar sample rows ({columns, rows: [[...]]}) back to one object per row
+  function sampleRowObjects(sample) {
+    if (!Array.isArray(sample.columns)) return sample.rows;
+    return sample.rows.map(row => Object.fromEntries(sample.columns.map((c, i) => [c, row[i]])));
+  }
+
   function makeTable(rows) {
     if (!Array.isArray(rows) || rows.length === 0) return "<p>No data</p>";
 
@@ -232,7 +277,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const impactLevel = (summary.performance_impact || "unknown").toLowerCase();
     summaryEl.innerHTML = `<h3>📊 Analysis Summary</h3>
 <p><strong>Database:</strong> ${db}</p>
-<p><strong>Performance Impact:</strong> <span class="impact-${impactLevel}">${impactLevel.charAt(0).toUpperCase() + impactLevel.slice(1)}</span></p>
+<p><strong>Performance Impact:</strong> <span class="impact-${impactLevel}">${impactLevel.charAt(0).toUpperCase() + impactLevel.slice(1)}</span>${formatWorkRatio(summary.estimated_work_ratio)}</p>
 <p><strong>Key Findings:</strong> ${summary.optimization_reason || "Query analyzed"}</p>`;
 
     if (opt.status === "success") {
@@ -256,8 +301,9 @@ document.addEventListener("DOMContentLoaded", () => {
       warningsEl.innerHTML = "<p>✓ No issues detected</p>";
     }
 
-    const estimatedImpact = (opt.estimated_impact || "unknown").toLowerCase();
-    impactEl.innerHTML = `<strong>Impact Level:</strong> <span class="impact-${estimatedImpact}">${estimatedImpact.charAt(0).toUpperCase() + estimatedImpact.slice(1)}</span>`;
+    const estimatedImpact = (opt.performance_impact || "unknown").toLowerCase();
+    impactEl.innerHTML = `<strong>Impact Level:</strong> <span class="impact-${estimatedImpact}">${estimatedImpact.charAt(0).toUpperCase() + estimatedImpact.slice(1)}</span>${formatWorkRatio(opt.estimated_work_ratio)}`;
+    impactEl.innerHTML += renderPlanDiff(opt.plan_diff);
     if (opt.engine_advice && opt.engine_advice.length > 0) {
       impactEl.innerHTML += `<br><strong>🔧 Engine Tips:</strong><ul>${opt.engine_advice.map(a => `<li>${a}</li>`).join("")}</ul>`;
     }
@@ -307,6 +353,7 @@ document.addEventListener("DOMContentLoaded", () => {
     } else {
       aiHTML += `<p>⚠ ${validator.error || "Data validation unavailable"}</p>`;
     }
+    aiHTML += renderProfile(validator.profile);
 
     aiNotesEl.innerHTML = aiHTML;
 
@@ -315,9 +362,12 @@ document.addEventListener("DOMContentLoaded", () => {
     } else {
       planEl.innerHTML = "<p>⚠ No explain plan available</p>";
     }
+    if (Array.isArray(opt.optimized_explain_plan) && opt.optimized_explain_plan.length > 0) {
+      planEl.innerHTML += "<p><strong>Optimized query:</strong></p>" + makeTable(opt.optimized_explain_plan);
+    }
 
     if (technical.sample_rows && technical.sample_rows.rows && technical.sample_rows.rows.length > 0) {
-      rowsEl.innerHTML = makeTable(technical.sample_rows.rows);
+      rowsEl.innerHTML = makeTable(sampleRowObjects(technical.sample_rows));
       if (technical.sample_rows.message) {
         rowsEl.innerHTML += `<p><em>${technical.sample_rows.message}</em></p>`;
       }
@@ -397,41 +447,16 @@ document.addEventListener("DOMContentLoaded", () => {
     rawEl.innerHTML = html;
   }
 
-  async function analyzeSchema() {
-    const resultDiv = document.getElementById("schema-results");
-    try {
-      const database = getDatabaseConfig();
-      if (!database.host || !database.user || !database.database) {
-        alert("Please fill in database connection details first.");
-        return;
-      }
-
-      resultDiv.innerHTML = "<p>⏳ Fetching full schema context... please wait.</p>";
-      resultDiv.classList.remove("hidden");
-
-      const response = await fetch("/analyze-schema", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ database })
-      });
-
-      if (!response.ok) {
-        const errTxt = await response.text();
-        throw new Error(errTxt || "Server error");
-      }
-
-      const data = await response.json();
-      let html = `<h3>🗄 Schema Overview</h3>
-<p><strong>Database:</strong> ${data.database || "unknown"}</p>`;
+  const SCHEMA_PAGE_SIZE = 50;
+  let schemaCursor = null;
 
-      if (data.tables && typeof data.tables === 'object') {
-        for (const [tableName, columns] of Object.entries(data.tables)) {
-          if (!Array.isArray(columns)) continue;
-
-          html += `
-<div style="margin-top: 2rem; padding: 1.5rem; background: rgba(0,217,255,0.05); border: 1px solid rgba(0,217,255,0.2); border-radius: 12px;">
-  <h4 style="color: var(--primary-blue); margin-top: 0;">📋 Table: <code>${escapeHtml(tableName)}</code></h4>
-  <table style="width: 100%; border-collapse: collapse;">
+  function renderSchemaTable(table) {
+    const columns = Array.isArray(table.columns) ? table.columns : [];
+    const rowInfo = table.rows !== undefined && table.rows !== null ? ` — ~${Number(table.rows).toLocaleString()} rows` : "";
+    let html = `
+<details style="margin-top: 1rem; padding: 1rem 1.5rem; background: rgba(0,217,255,0.05); border: 1px solid rgba(0,217,255,0.2); border-radius: 12px;">
+  <summary style="cursor: pointer; color: var(--primary-blue); font-weight: 700;">📋 Table: <code>${escapeHtml(table.name)}</code><span style="color: var(--text-secondary); font-weight: 400;">${rowInfo} · ${columns.length} columns</span></summary>
+  <table style="width: 100%; border-collapse: collapse; margin-top: 1rem;">
     <thead>
       <tr style="background: rgba(0,217,255,0.15);">
         <th style="padding: 10px; text-align: left; border-bottom: 2px solid rgba(0,217,255,0.3); color: var(--primary-blue);">Column</th>
@@ -442,35 +467,141 @@ document.addEventListener("DOMContentLoaded", () => {
     </thead>
     <tbody>`;
 
-          columns.forEach(col => {
-            const nullable = col.IS_NULLABLE === 'YES' ? '✓ YES' : '✗ NO';
-            const key = col.COLUMN_KEY || '—';
-            const keyDisplay = key === 'PRI' ? '<strong style="color: var(--accent-cyan);">PRIMARY</strong>' : 
-                              key === 'MUL' ? '<strong style="color: var(--warning-color);">FOREIGN</strong>' : key;
+    columns.forEach(col => {
+      const nullable = col.IS_NULLABLE === 'YES' ? '✓ YES' : '✗ NO';
+      const key = col.COLUMN_KEY || '—';
+      const keyDisplay = key === 'PRI' ? '<strong style="color: var(--accent-cyan);">PRIMARY</strong>' : 
+                        key === 'MUL' ? '<strong style="color: var(--warning-color);">FOREIGN</strong>' : key;
 
-            html += `
+      html += `
       <tr style="border-bottom: 1px solid rgba(0,217,255,0.1);">
         <td style="padding: 10px; font-family: monospace; color: var(--text-primary);"><code>${escapeHtml(col.COLUMN_NAME)}</code></td>
         <td style="padding: 10px; color: var(--text-secondary);"><code>${escapeHtml(col.COLUMN_TYPE)}</code></td>
         <td style="padding: 10px; color: var(--text-secondary);">${nullable}</td>
         <td style="padding: 10px;">${keyDisplay}</td>
       </tr>`;
-          });
+    });
 
-          html += `
+    html += `
     </tbody>
-  </table>
-</div>`;
-        }
+  </table>`;
+
+    if (Array.isArray(table.indexes) && table.indexes.length > 0) {
+      html += `<p style="margin-top: 0.75rem;"><strong>Indexes:</strong></p><ul>${table.indexes.map(idx =>
+        `<li><code>${escapeHtml(idx.name)}</code> (${idx.columns.map(c => escapeHtml(c)).join(", ")})${idx.unique ? " UNIQUE" : ""}</li>`).join("")}</ul>`;
+    }
+
+    html += `
+</details>`;
+    return html;
+  }
+
+  // Streams one page of tables as NDJSON and appends each table as soon as its line arrives
+  async function loadSchemaPage(database, tableFilter, cursor) {
+    const listEl = document.getElementById("schema-table-list");
+    const moreBtn = document.getElementById("schema-load-more");
+    const statusEl = document.getElementById("schema-status");
+    moreBtn.classList.add("hidden");
+    statusEl.textContent = "⏳ Loading tables...";
+
+    const response = await fetch("/analyze-schema", {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Accept": "application/x-ndjson" },
+      body: JSON.stringify({
+        database,
+        cursor,
+        limit: SCHEMA_PAGE_SIZE,
+        table_filter: tableFilter || null,
+        include_indexes: true,
+        include_row_counts: true,
+        stream: true
+      })
+    });
+
+    if (response.status === 401) {
+      window.location.href = "/login";
+      return;
+    }
+    if (!response.ok) {
+      const errTxt = await response.text();
+      throw new Error(errTxt || "Server error");
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let loaded = 0;
+
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const msg = JSON.parse(line);
+      if (msg.type === "table") {
+        listEl.insertAdjacentHTML("beforeend", renderSchemaTable(msg));
+        loaded += 1;
+      } else if (msg.type === "error") {
+        throw new Error(msg.error);
+      } else if (msg.type === "end") {
+        schemaCursor = msg.next_cursor;
+      }
+    };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+
+    const shown = listEl.querySelectorAll("details").length;
+    statusEl.textContent = shown === 0 ? "No tables found." : `Showing ${shown} tables`;
+    moreBtn.classList.toggle("hidden", !schemaCursor || loaded === 0);
+  }
+
+  async function analyzeSchema() {
+    const resultDiv = document.getElementById("schema-results");
+    try {
+      const database = getDatabaseConfig();
+      if (!database.host || !database.user || !database.database) {
+        alert("Please fill in database connection details first.");
+        return;
       }
 
-      resultDiv.innerHTML = html;
+      resultDiv.innerHTML = `<h3>🗄 Schema Overview</h3>
+<p><strong>Database:</strong> ${escapeHtml(database.database)}</p>
+<div style="display: flex; gap: 0.5rem; margin: 1rem 0;">
+  <input id="schema-filter" type="text" placeholder="Filter tables by name..." style="flex: 1;">
+  <button id="schema-filter-btn" class="btn btn-secondary">Filter</button>
+</div>
+<p id="schema-status"></p>
+<div id="schema-table-list"></div>
+<button id="schema-load-more" class="btn btn-secondary hidden" style="width: 100%; margin-top: 1rem;">Load more tables</button>`;
+      resultDiv.classList.remove("hidden");
+
+      const filterEl = document.getElementById("schema-filter");
+      const reload = async () => {
+        schemaCursor = null;
+        document.getElementById("schema-table-list").innerHTML = "";
+        await loadSchemaPage(database, filterEl.value.trim(), null);
+      };
+      document.getElementById("schema-filter-btn").onclick = () => reload().catch(showSchemaError);
+      filterEl.onkeydown = (e) => { if (e.key === "Enter") reload().catch(showSchemaError); };
+      document.getElementById("schema-load-more").onclick = () =>
+        loadSchemaPage(database, filterEl.value.trim(), schemaCursor).catch(showSchemaError);
+
+      await reload();
     } catch (err) {
-      const resultDiv = document.getElementById("schema-results");
-      resultDiv.innerHTML = `<p style="color: var(--danger-color);">❌ Failed to load schema: ${err.message}</p>`;
+      showSchemaError(err);
     }
   }
 
+  function showSchemaError(err) {
+    const resultDiv = document.getElementById("schema-results");
+    resultDiv.innerHTML = `<p style="color: var(--danger-color);">❌ Failed to load schema: ${escapeHtml(err.message)}</p>`;
+  }
+
   if (saveVaultBtn) {
     saveVaultBtn.onclick = () => {
       const masterPass = masterPassEl.value;
@@ -0,0 +1,129 @@
+# test_data_quality_rules.py
+# Deterministic data-quality rules over fixed column profiles, and when the validator consults the model.
+# Run with `pytest test_data_quality_rules.py`.
+import asyncio
+
+import agents.data_validator as data_validator
+from agents.data_quality_rules import evaluate_rules
+
+
+def numeric(**stats):
+    return {"kind": "numeric", "nulls": 0, "null_ratio": 0.0, "negative": 0, "min": 0, "max": 1, **stats}
+
+
+def profile(**columns):
+    return {"rows_sampled": 100, "sample_limit": 1000, "complete": True, "columns": columns}
+
+
+SCHEMA = {"orders": [
+    {"Field": "id", "Type": "int(11)", "Null": "NO", "Key": "PRI"},
+    {"Field": "customer_id", "Type": "int(11)", "Null": "NO", "Key": "MUL"},
+    {"Field": "total", "Type": "decimal(7,2)", "Null": "NO", "Key": ""},
+    {"Field": "note", "Type": "varchar(200)", "Null": "YES", "Key": ""},
+]}
+
+
+def rules(columns, query="SELECT * FROM orders", schema_context=SCHEMA, integrity=None):
+    return evaluate_rules(query, profile(**columns), schema_context, integrity)
+
+
+def test_clean_profile():
+    result = rules({"id": numeric(max=100), "total": numeric(max="12.50", integer_digits={"max": 2, "at_max": 40})})
+    assert result == {"findings": [], "open_questions": []}
+
+
+def test_decimal_at_its_precision_limit():
+    result = rules({"total": numeric(max="99999.99", integer_digits={"max": 5, "at_max": 3})})
+    assert [(f["rule"], f["column"], f["count"], f["severity"]) for f in result["findings"]] == [
+        ("decimal_precision_limit", "total", 3, "error")]
+    assert "DECIMAL(7,2)" in result["findings"][0]["message"]
+
+
+def test_decimal_limit_from_display_width_without_schema():
+    # DECIMAL(5,2) displays in 7 characters: sign, 5 digits and the point
+    stats = numeric(max="999.00", scale=2, display_length=7, integer_digits={"max": 3, "at_max": 1})
+    assert [f["rule"] for f in rules({"price": stats}, schema_context=None)["findings"]] == ["decimal_precision_limit"]
+
+
+def test_negative_amounts_but_not_signed_columns():
+    result = rules({"total": numeric(negative=4, min="-10.00"), "balance": numeric(negative=9, min=-5),
+                    "id": numeric(negative=1, min=-1)})
+    assert [(f["rule"], f["column"], f["count"]) for f in result["findings"]] == [("negative_amount", "total", 4)]
+
+
+def test_future_and_invalid_dates():
+    temporal = {"kind": "temporal", "nulls": 0, "max": "2030-01-01T00:00:00"}
+    result = rules({"created_at": {**temporal, "future": 2, "unexpected_type_values": 1},
+                    "expires_at": {**temporal, "future": 50}})
+    assert [(f["rule"], f["column"], f["count"]) for f in result["findings"]] == [
+        ("future_date", "created_at", 2), ("invalid_date", "created_at", 1)]
+
+
+def test_nulls_in_not_null_columns():
+    result = rules({"customer_id": numeric(nulls=5, null_ratio=0.05), "note": {"kind": "string", "nulls": 50,
+                                                                               "null_ratio": 0.5}})
+    assert [(f["rule"], f["column"], f["count"]) for f in result["findings"]] == [("null_in_not_null", "customer_id", 5)]
+    assert result["open_questions"] == []
+
+
+def test_nulls_under_an_outer_join_are_an_open_question():
+    result = rules({"customer_id": numeric(nulls=5, null_ratio=0.05)},
+                   query="SELECT * FROM customers c LEFT JOIN orders o ON o.customer_id = c.id")
+    assert result["findings"] == []
+    assert len(result["open_questions"]) == 1 and "outer join" in result["open_questions"][0]
+
+
+def test_orphan_foreign_keys():
+    fk = {"table": "orders", "constraint": "fk_customer", "columns": ["customer_id"],
+          "referenced_table": "customers", "referenced_columns": ["id"]}
+    integrity = {"foreign_keys": [{**fk, "orphans": 7}, {**fk, "constraint": "fk_other", "orphans": 0},
+                                  {**fk, "constraint": "fk_slow", "error": "timeout"}], "skipped": 0}
+    result = rules({}, integrity=integrity)
+    assert [(f["rule"], f["column"], f["count"]) for f in result["findings"]] == [
+        ("orphan_foreign_key", "orders.customer_id", 7)]
+    assert result["open_questions"] == ["Orphan check for orders(customer_id) -> customers(id) did not finish: timeout"]
+
+
+def test_same_profile_same_result():
+    columns = {"total": numeric(negative=2, min="-1.00", integer_digits={"max": 5, "at_max": 1}),
+               "customer_id": numeric(nulls=1, null_ratio=0.01)}
+    assert rules(columns) == rules(columns)
+
+
+class FakeModel:
+    def __init__(self):
+        self.prompts = []
+
+    async def __call__(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return {"issues": ["Unmatched customers"], "confidence": "medium", "reasoning": "outer join"}
+
+
+def test_validator_skips_the_model_when_nothing_is_open(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(data_validator, "call_claude_json", model)
+    result = asyncio.run(data_validator.validate_query(
+        "SELECT * FROM orders", profile(total=numeric(negative=3, min="-2.00")), SCHEMA))
+    assert model.prompts == []
+    assert result["status"] == "success"
+    assert result["details"]["llm_consulted"] is False
+    assert [f["rule"] for f in result["details"]["findings"]] == ["negative_amount"]
+
+
+def test_validator_asks_the_model_about_open_questions(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(data_validator, "call_claude_json", model)
+    result = asyncio.run(data_validator.validate_query(
+        "SELECT * FROM customers c LEFT JOIN orders o ON o.customer_id = c.id",
+        profile(customer_id=numeric(nulls=5, null_ratio=0.05)), SCHEMA))
+    assert len(model.prompts) == 1 and "outer join" in model.prompts[0]
+    assert result["details"]["llm_consulted"] is True
+    assert result["details"]["issues"] == ["Unmatched customers"]
+
+
+def test_validator_without_profile(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(data_validator, "call_claude_json", model)
+    result = asyncio.run(data_validator.validate_query("SELECT 1", {"error": "production mode"}))
+    assert result["status"] == "error" and result["details"]["error"] == "production mode"
+    assert model.prompts == []
@@ -0,0 +1,61 @@
+# test_import_time.py
+# Import-time budget for the app module: run `python test_import_time.py` (or pytest test_import_time.py).
+# Fails when `import main` pulls in a client library that should load lazily, or when its
+# best-of-N cumulative import time (python -X importtime) exceeds IMPORT_BUDGET_MS.
+import os
+import re
+import sys
+import subprocess
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 900))
+RUNS = int(os.getenv("IMPORT_RUNS", 5))
+
+# Loaded on first use (startup, SSH targets, Groq calls, column profiles), never by `import main`
+LAZY_MODULES = ("motor", "pymongo", "fastapi_mail", "sshtunnel", "paramiko", "certifi", "httpx", "numpy")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure():
+    """One cold `import main` in a fresh interpreter: (cumulative microseconds, modules it imported)."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("MONGO_", "MAIL_"))}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise AssertionError(f"import main failed:\n{proc.stderr[-2000:]}")
+    modules, total_us, after_site = [], None, False
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        # Everything above site's own line was imported at interpreter startup, not by main
+        if not after_site:
+            after_site = name == "site" and not match.group(3)
+            continue
+        modules.append(name)
+        if name == "main":
+            total_us = int(match.group(2))
+    return total_us, modules
+
+
+def test_import_budget():
+    best, modules = None, []
+    for _ in range(RUNS):
+        total_us, modules = measure()
+        best = total_us if best is None else min(best, total_us)
+    eager = sorted({m.split(".")[0] for m in modules} & set(LAZY_MODULES))
+    assert not eager, f"import main loaded modules that should be lazy: {', '.join(eager)}"
+    best_ms = best / 1000
+    print(f"import main: {best_ms:.0f} ms (best of {RUNS}, budget {BUDGET_MS:.0f} ms)")
+    assert best_ms <= BUDGET_MS, f"import main took {best_ms:.0f} ms, over the {BUDGET_MS:.0f} ms budget"
+
+
+if __name__ == "__main__":
+    try:
+        test_import_budget()
+    except AssertionError as e:
+        print("FAIL:", e)
+        sys.exit(1)
+    print("OK")
@@ -0,0 +1,69 @@
+# test_index_auditor.py
+# The /analyze-indexes trial: IGNORE INDEX hint rewriting and the plan comparison, with no DDL sent.
+# Run with `pytest test_index_auditor.py`.
+import asyncio
+
+from agents.index_auditor import trial_without_indexes
+from utils.sql_tokenizer import ignore_index_hint
+
+
+def test_hint_after_table_and_alias():
+    sql, n = ignore_index_hint("SELECT * FROM orders o JOIN customers AS c ON c.id = o.cid WHERE o.x = 1",
+                               "orders", "idx_x")
+    assert n == 1
+    assert sql == "SELECT * FROM orders o IGNORE INDEX (`idx_x`) JOIN customers AS c ON c.id = o.cid WHERE o.x = 1"
+
+
+def test_hint_every_reference():
+    sql, n = ignore_index_hint("SELECT * FROM a, shop.`Orders` WHERE a.id IN (SELECT oid FROM orders)",
+                               "orders", "idx")
+    assert n == 2
+    assert sql == ("SELECT * FROM a, shop.`Orders` IGNORE INDEX (`idx`) "
+                   "WHERE a.id IN (SELECT oid FROM orders IGNORE INDEX (`idx`))")
+
+
+def test_hint_skips_other_tables_and_columns():
+    sql = "SELECT orders FROM orders_archive WHERE orders = 1"
+    assert ignore_index_hint(sql, "orders", "idx") == (sql, 0)
+
+
+class FakeClient:
+    """EXPLAIN only; the plan depends on whether the query carries the hint."""
+
+    def __init__(self, rows_without=1000, error=None):
+        self.rows_without = rows_without
+        self.error = error
+        self.executed = []
+
+    async def explain(self, query):
+        self.executed.append(query)
+        if "IGNORE INDEX" in query:
+            if self.error:
+                return {"error": self.error}
+            return [{"table": "orders", "key": None, "rows": self.rows_without}]
+        return [{"table": "orders", "key": "idx_x", "rows": 10}]
+
+
+FINDINGS = [{"table": "orders", "index": "idx_x"}, {"table": "orders", "index": "idx_unused"}]
+QUERIES = ["SELECT * FROM orders WHERE x = 1", "UPDATE orders SET x = 2"]
+
+
+def test_trial_regression_and_safe():
+    client = FakeClient()
+    results = asyncio.run(trial_without_indexes(client, FINDINGS, QUERIES))
+    assert [r["verdict"] for r in results] == ["regresses", "safe_to_drop"]
+    assert results[0]["queries_using"] == 1 and results[1]["queries_using"] == 0
+    assert results[0]["regressions"][0]["after"]["rows"] == 1000
+    # Only SELECTs and their hinted forms reach the server
+    assert all(q.startswith("SELECT") for q in client.executed)
+
+
+def test_trial_no_regression():
+    results = asyncio.run(trial_without_indexes(FakeClient(rows_without=11), FINDINGS[:1], QUERIES))
+    assert results[0]["verdict"] == "safe_to_drop"
+
+
+def test_trial_explain_error():
+    results = asyncio.run(trial_without_indexes(FakeClient(error="boom"), FINDINGS[:1], QUERIES))
+    assert results[0]["verdict"] == "error"
+    assert results[0]["errors"][0]["error"] == "boom"
@@ -0,0 +1,127 @@
+# test_plan_diff.py
+# The EXPLAIN comparison behind performance_impact: the work model, plan diffs and when they are skipped.
+# Run with `pytest test_plan_diff.py`.
+import asyncio
+
+import pytest
+
+from agents.plan_diff import add_plan_diff, diff_plans, estimated_work, impact_level
+
+FULL_SCAN = [{"id": 1, "table": "orders", "type": "ALL", "key": None, "rows": 100000, "Extra": "Using where"}]
+INDEXED = [{"id": 1, "table": "orders", "type": "ref", "key": "idx_customer", "rows": 20, "Extra": ""}]
+
+
+def test_estimated_work_joins_multiply_selects_add():
+    plan = [
+        {"id": 1, "table": "o", "type": "ALL", "rows": 100},
+        {"id": 1, "table": "c", "type": "eq_ref", "rows": 1},
+        {"id": 2, "table": "i", "type": "ref", "rows": 10},
+    ]
+    work = estimated_work(plan)
+    assert work["rows_product"] == 110
+    assert work["work"] == 110
+    assert not work["filesort"] and not work["temporary"]
+
+
+def test_estimated_work_sort_and_temporary_penalties():
+    plan = [{"id": 1, "table": "t", "type": "ALL", "rows": 1000, "Extra": "Using temporary; Using filesort"}]
+    work = estimated_work(plan)
+    assert work["filesort"] and work["temporary"]
+    assert work["work"] > work["rows_product"] + 0.5 * 1000
+
+
+def test_improvement():
+    diff = diff_plans(FULL_SCAN, INDEXED)
+    assert diff["verdict"] == "better"
+    assert diff["impact"] == "high"
+    assert diff["estimated_work_ratio"] == 0.0002
+    table = diff["tables"][0]
+    assert table["access_change"] == {"before": "all", "after": "ref", "direction": "better"}
+    assert table["key_change"] == {"before": None, "after": "idx_customer"}
+
+
+def test_regression():
+    diff = diff_plans(INDEXED, FULL_SCAN)
+    assert diff["verdict"] == "worse"
+    assert diff["impact"] == "regression"
+    assert diff["tables"][0]["access_change"]["direction"] == "worse"
+
+
+def test_no_change():
+    diff = diff_plans(INDEXED, [dict(INDEXED[0], rows=21)])
+    assert diff["verdict"] == "same"
+    assert diff["impact"] == "none"
+    assert diff["estimated_work_ratio"] == 1.05
+    assert "access_change" not in diff["tables"][0] and "key_change" not in diff["tables"][0]
+
+
+def test_tables_added_and_removed():
+    before = FULL_SCAN + [{"id": 2, "table": "customers", "type": "ALL", "key": None, "rows": 500}]
+    after = INDEXED + [{"id": 1, "table": "<derived2>", "type": "ALL", "key": None, "rows": 10}]
+    changes = {t["table"]: t.get("change") for t in diff_plans(before, after)["tables"]}
+    assert changes == {"orders": None, "customers": "removed", "<derived2>": "added"}
+
+
+def test_repeated_tables_compared_by_occurrence():
+    before = [{"id": 1, "table": "t", "type": "ALL", "rows": 10}, {"id": 1, "table": "t", "type": "ALL", "rows": 10}]
+    after = [{"id": 1, "table": "t", "type": "ALL", "rows": 10}, {"id": 1, "table": "t", "type": "eq_ref", "rows": 1}]
+    tables = diff_plans(before, after)["tables"]
+    assert [t["table"] for t in tables] == ["t", "t#2"]
+    assert tables[1]["access_change"]["direction"] == "better"
+
+
+@pytest.mark.parametrize("ratio, level", [
+    (None, "unknown"), (0.05, "high"), (0.3, "medium"), (0.8, "low"), (1.0, "none"), (1.2, "regression"),
+])
+def test_impact_levels(ratio, level):
+    assert impact_level(ratio) == level
+
+
+class FakeClient:
+    def __init__(self, plan):
+        self.plan = plan
+        self.explained = []
+
+    async def explain(self, query):
+        self.explained.append(query)
+        return self.plan
+
+
+def _output(optimized):
+    return {"status": "success", "details": {"optimized_query": optimized}}
+
+
+def test_add_plan_diff():
+    client = FakeClient(INDEXED)
+    out = asyncio.run(add_plan_diff(client, "SELECT * FROM orders WHERE customer_id = 7", FULL_SCAN,
+                                    _output("SELECT id FROM orders WHERE customer_id = 7;")))
+    assert client.explained == ["SELECT id FROM orders WHERE customer_id = 7"]
+    assert out["details"]["plan_diff"]["impact"] == "high"
+    assert out["details"]["estimated_work_ratio"] == out["details"]["plan_diff"]["estimated_work_ratio"]
+    assert out["details"]["optimized_explain_plan"] == INDEXED
+
+
+@pytest.mark.parametrize("optimized, before, reason", [
+    (None, FULL_SCAN, "no optimized query"),
+    ("SELECT 1; SELECT 2", FULL_SCAN, "optimized query is not a single statement"),
+    ("UPDATE orders SET a = 1", FULL_SCAN, "only SELECT rewrites are explained"),
+    ("select *  from orders where customer_id = 7", FULL_SCAN, "optimized query is unchanged"),
+    ("SELECT id FROM orders WHERE customer_id = 7", {"error": "denied"}, "original query has no EXPLAIN plan"),
+])
+def test_add_plan_diff_skipped(optimized, before, reason):
+    client = FakeClient(INDEXED)
+    out = asyncio.run(add_plan_diff(client, "SELECT * FROM orders WHERE customer_id = 7", before, _output(optimized)))
+    assert out["details"]["plan_diff"] == {"skipped": reason}
+    assert out["details"]["estimated_work_ratio"] is None
+    assert client.explained == []
+
+
+def test_add_plan_diff_explain_error():
+    out = asyncio.run(add_plan_diff(FakeClient({"error": "Unknown column"}), "SELECT * FROM orders", FULL_SCAN,
+                                    _output("SELECT id FROM orders")))
+    assert out["details"]["plan_diff"] == {"skipped": "EXPLAIN failed: Unknown column"}
+
+
+def test_add_plan_diff_leaves_failed_output():
+    failed = {"status": "error", "details": {"error": "timeout"}}
+    assert asyncio.run(add_plan_diff(FakeClient(INDEXED), "SELECT 1", FULL_SCAN, failed)) == failed
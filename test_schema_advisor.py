@@ -0,0 +1,25 @@
+# test_schema_advisor.py
+# Recommended indexes that an existing index already covers are set aside.
+# Run with `pytest test_schema_advisor.py`.
+from agents.schema_advisor import _drop_existing_indexes
+
+CATALOG = {"orders": {"indexes": [{"name": "idx_customer", "columns": ["customer_id", "created_at"]}]}}
+
+
+def test_covered_by_leading_columns():
+    kept, covered = _drop_existing_indexes(
+        ["CREATE INDEX idx_c ON orders (customer_id)", "CREATE INDEX idx_s ON orders (status)"], CATALOG)
+    assert kept == ["CREATE INDEX idx_s ON orders (status)"]
+    assert covered == ["CREATE INDEX idx_c ON orders (customer_id)"]
+
+
+def test_table_names_match_case_insensitively():
+    stmt = "CREATE INDEX idx_c ON `shop`.`Orders` (`Customer_Id`, created_at)"
+    assert _drop_existing_indexes([stmt], CATALOG) == ([], [stmt])
+    upper = {"ORDERS": CATALOG["orders"]}
+    assert _drop_existing_indexes(["CREATE INDEX idx_c ON orders (customer_id)"], upper)[1] != []
+
+
+def test_column_order_matters():
+    stmt = "CREATE INDEX idx_x ON orders (created_at, customer_id)"
+    assert _drop_existing_indexes([stmt], CATALOG) == ([stmt], [])
@@ -0,0 +1,65 @@
+# test_schema_cache.py
+# The shared cache: schema snapshots only for clients that logged in, and files private to the service user.
+# Run with `pytest test_schema_cache.py`.
+import asyncio
+
+import pytest
+
+import utils.shared_cache as shared_cache
+from db.mariadb_client import MariaDBClient
+from utils.config import Config
+
+SCHEMA = {"orders": [{"TABLE_NAME": "orders", "COLUMN_NAME": "id"}]}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SCHEMA_CACHE_TTL", 300)
+    monkeypatch.setattr(shared_cache, "_cache", shared_cache.SharedCache(str(tmp_path / "cache.sqlite")))
+    return shared_cache._cache
+
+
+def client(password, verified, schema):
+    c = MariaDBClient("db.internal", "alice", password, "shop", min_size=0)
+    c.pool = object()  # stands in for a created pool
+    c.login_verified = verified
+
+    async def load():
+        return schema
+    c._load_full_schema = load
+    return c
+
+
+def test_snapshot_shared_by_verified_logins(cache):
+    assert asyncio.run(client("right", True, SCHEMA).get_full_schema()) == SCHEMA
+    assert asyncio.run(client("right", True, {"error": "not reached"}).get_full_schema()) == SCHEMA
+
+
+def test_unverified_client_bypasses_the_cache(cache):
+    asyncio.run(client("right", True, SCHEMA).get_full_schema())
+    denied = {"error": "Access denied for user 'alice'"}
+    assert asyncio.run(client("WRONG", False, denied).get_full_schema()) == denied
+
+
+def test_unverified_client_does_not_fill_the_cache(cache):
+    planted = {"orders": [{"TABLE_NAME": "orders", "COLUMN_NAME": "planted"}]}
+    asyncio.run(client("WRONG", False, planted).get_full_schema())
+    assert asyncio.run(client("right", True, SCHEMA).get_full_schema()) == SCHEMA
+
+
+def test_empty_pool_with_bad_login_is_not_created():
+    c = MariaDBClient("127.0.0.1", "alice", "WRONG", "shop", port=1, min_size=0)
+    asyncio.run(c.connect())
+    assert c.pool is None
+    assert not c.login_verified
+
+
+def test_new_cache_files_are_private(tmp_path):
+    path = tmp_path / "cache" / "cache.sqlite"
+    cache = shared_cache.SharedCache(str(path))
+    cache.store("llm", "k", {"v": 1}, 60, 0)
+    assert (path.parent.stat().st_mode & 0o777) == 0o700
+    for suffix in ("", "-wal", "-shm"):
+        f = path.with_name(path.name + suffix)
+        if f.exists():
+            assert (f.stat().st_mode & 0o777) == 0o600, f
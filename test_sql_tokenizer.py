@@ -0,0 +1,123 @@
+# test_sql_tokenizer.py
+# The read-only guard in front of every statement sent to a target, and query fingerprints.
+# Run with `pytest test_sql_tokenizer.py`.
+import pytest
+
+from utils.sql_tokenizer import fingerprint, fingerprint_id, read_only_violation, tokenize
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t WHERE id = 1",
+    "  select a from t -- trailing comment",
+    "WITH c AS (SELECT 1 AS a) SELECT a FROM c",
+    "SELECT 'SLEEP(1); DROP TABLE t' AS s FROM t",
+    "SELECT 1 FROM t /* FOR UPDATE */",
+    "SELECT * FROM t;",
+])
+def test_allowed(sql):
+    assert read_only_violation(sql) == ""
+    assert read_only_violation(sql, plan_only=True) == ""
+
+
+def test_double_dash_needs_whitespace_to_start_a_comment():
+    # MariaDB reads 1--1 as 1 - (-1), so SLEEP below is live SQL, not a comment
+    assert [t.value for t in tokenize("SELECT 1--1")] == ["select", "1", "-", "-", "1"]
+    assert read_only_violation("SELECT 1--1, SLEEP(100) FROM t LIMIT 1") == "SLEEP() is not allowed"
+    assert read_only_violation("SELECT 1 --\tSLEEP(100)\nFROM t") == ""
+    assert read_only_violation("SELECT 1 FROM t --") == ""
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT /*! SLEEP(5) */ 1 FROM t",
+    "SELECT 1 /*M!100000 , SLEEP(5) */ FROM t",
+    "SELECT 1 /*!50000 INTO OUTFILE '/tmp/x' */",
+])
+def test_executable_comments(sql):
+    assert read_only_violation(sql) == "executable comments (/*! ... */) are not allowed"
+    assert read_only_violation(sql, plan_only=True) == "executable comments (/*! ... */) are not allowed"
+
+
+@pytest.mark.parametrize("sql, reason", [
+    ("SELECT * FROM t INTO OUTFILE '/tmp/t.csv'", "SELECT ... INTO is not allowed"),
+    ("SELECT a INTO @a FROM t", "SELECT ... INTO is not allowed"),
+    ("SELECT * FROM t WHERE id = 1 FOR UPDATE", "locking reads (FOR UPDATE) are not allowed"),
+    ("SELECT * FROM t FOR SHARE", "locking reads (FOR SHARE) are not allowed"),
+    ("SELECT * FROM t LOCK IN SHARE MODE", "locking reads (LOCK IN SHARE MODE) are not allowed"),
+])
+def test_into_and_locking_reads(sql, reason):
+    assert read_only_violation(sql) == reason
+    # Only EXPLAINed: neither writes the file nor takes the locks
+    assert read_only_violation(sql, plan_only=True) == ""
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP TABLE t",
+    "SELECT 1; SELECT 2",
+    "SELECT ';' AS a; DELETE FROM t",
+])
+def test_multiple_statements(sql):
+    assert read_only_violation(sql) == "only one statement is allowed"
+    assert read_only_violation(sql, plan_only=True) == "only one statement is allowed"
+
+
+@pytest.mark.parametrize("sql, kind", [
+    ("DELETE FROM t", "DELETE"),
+    ("WITH c AS (SELECT 1) UPDATE t SET a = 1", "UPDATE"),
+    ("(INSERT INTO t VALUES (1))", "INSERT"),
+])
+def test_writes(sql, kind):
+    assert read_only_violation(sql) == f"only SELECT queries are allowed, not {kind}"
+
+
+def test_empty():
+    assert read_only_violation(" -- nothing\n ;") == "empty query"
+
+
+@pytest.mark.parametrize("sql, function", [
+    ("SELECT * FROM t WHERE x = (SELECT SLEEP(5))", "SLEEP"),
+    ("SELECT GET_LOCK('k', 10) FROM t", "GET_LOCK"),
+    ("SELECT * FROM t WHERE id = NEXTVAL (s)", "NEXTVAL"),
+    ("SELECT BENCHMARK(1e9, MD5('x'))", "BENCHMARK"),
+])
+def test_side_effect_functions_even_when_plan_only(sql, function):
+    assert read_only_violation(sql) == f"{function}() is not allowed"
+    # EXPLAIN evaluates constant subqueries while optimizing, so plan-only is no exemption
+    assert read_only_violation(sql, plan_only=True) == f"{function}() is not allowed"
+
+
+def test_side_effect_names_as_columns():
+    assert read_only_violation("SELECT sleep, `get_lock` FROM t") == ""
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT * FROM t WHERE a = 1 AND b = 'x'", "select *  from T where a=2 and b=\"it''s\""),
+    ("SELECT * FROM `Orders` WHERE total > 10.5", "SELECT * FROM orders WHERE total > 1e3"),
+    ("SELECT * FROM t WHERE a = ? -- first\n", "SELECT * FROM t /* second */ WHERE a = %s"),
+    ("SELECT * FROM t WHERE h = 0x1F", "SELECT * FROM t WHERE h = :h"),
+])
+def test_fingerprint_normalises_literals(a, b):
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint_id(a) == fingerprint_id(b)
+
+
+def test_fingerprint_text():
+    assert fingerprint("SELECT Name FROM `Users` WHERE id = 42 AND note = 'x; DROP'") == \
+        "select name from users where id = ? and note = ?"
+
+
+def test_fingerprint_collapses_in_lists():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)") == "select * from t where id in (?+)"
+    assert fingerprint("SELECT * FROM t WHERE id IN (1,2,3,4,5,6)") == fingerprint("SELECT * FROM t WHERE id IN (7, 8)")
+
+
+def test_fingerprint_collapses_values_rows():
+    one = "INSERT INTO t (a, b) VALUES (1, 'x')"
+    many = "INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y'), (3, 'z')"
+    assert fingerprint(many) == "insert into t (a, b) values (?+)"
+    assert fingerprint(one) == fingerprint(many)
+
+
+def test_fingerprint_keeps_structure():
+    assert fingerprint("SELECT * FROM t WHERE a = 1") != fingerprint("SELECT * FROM t WHERE b = 1")
+    assert fingerprint("SELECT * FROM t WHERE a = 1") != fingerprint("SELECT * FROM t WHERE a > 1")
+    assert len(fingerprint_id("SELECT 1")) == 16
@@ -33,6 +33,7 @@ async def test_system():
         
         print("\n[4/7] Testing Query Optimizer agent...")
         from agents.query_optimizer import optimize_query
+        from agents.plan_diff import add_plan_diff
         print("     ✓ Query Optimizer imported")
         
         print("\n[5/7] Testing Cost Advisor agent...")
@@ -45,6 +46,8 @@ async def test_system():
         
         print("\n[7/7] Testing Data Validator agent...")
         from agents.data_validator import validate_query
+        from agents.column_profiler import collect_profile
+        from agents.data_quality_rules import check_integrity
         print("     ✓ Data Validator imported")
         
         print("\n" + "=" * 60)
@@ -66,14 +69,16 @@ async def test_system():
             sample_rows = await db_client.fetch_sample_rows(test_query)
             
             print("Running agents...")
-            opt = await optimize_query(test_query, schema, explain, sample_rows)
+            opt = await add_plan_diff(db_client, test_query, explain,
+                                      await optimize_query(test_query, schema, explain, sample_rows))
             cost = await estimate_cost(test_query, explain)
             sch_adv = await advise_schema(test_query, schema)
-            data_val = await validate_query(test_query, sample_rows)
+            data_val = await validate_query(test_query, await collect_profile(db_client, test_query), schema,
+                                            await check_integrity(db_client, test_query))
             
             print(f"\n✓ Query Optimizer: {opt.get('status')}")
             if opt.get('status') == 'success':
-                print(f"  - Impact: {opt['details'].get('estimated_impact', 'N/A')}")
+                print(f"  - Estimated work ratio: {opt['details'].get('estimated_work_ratio', 'N/A')}")
             
             print(f"✓ Cost Advisor: {cost.get('status')}")
             if cost.get('status') == 'success':
@@ -0,0 +1,89 @@
+# test_workload_advisor.py
+# /advise-workload's deterministic index selection: grouping by fingerprint and the greedy pick order.
+# Run with `pytest test_workload_advisor.py`.
+import random
+
+from agents.workload_advisor import advise_workload, build_workload
+
+QUERIES = [
+    {"sql": "SELECT * FROM orders WHERE customer_id = 7", "frequency": 100},
+    {"sql": "SELECT * FROM orders WHERE status = 'open' ORDER BY created_at", "frequency": 10},
+    {"sql": "select * from orders where customer_id = 8", "frequency": 50},
+    {"sql": "SELECT * FROM items WHERE sku = 'a-1'", "frequency": 5},
+]
+
+
+def _catalog(**extra_indexes):
+    def table(rows, *indexes):
+        return {"rows": rows, "indexes": [{"name": "PRIMARY", "columns": ["id"], "unique": True, "cardinality": [rows]},
+                                          *indexes]}
+    return {"orders": table(100000, *extra_indexes.get("orders", [])),
+            "items": table(1000, *extra_indexes.get("items", []))}
+
+
+def _picked(result):
+    return [(r["table"], r["columns"]) for r in result["details"]["recommended_indexes"]]
+
+
+def test_build_workload_groups_by_fingerprint():
+    workload = build_workload(QUERIES)
+    assert [(w["fingerprint"], w["frequency"]) for w in workload] == [
+        ("select * from orders where customer_id = ?", 150.0),
+        ("select * from orders where status = ? order by created_at", 10.0),
+        ("select * from items where sku = ?", 5.0),
+    ]
+    # The first statement seen stands for its fingerprint
+    assert workload[0]["sql"] == "SELECT * FROM orders WHERE customer_id = 7"
+
+
+def test_greedy_order_by_net_benefit():
+    result = advise_workload(build_workload(QUERIES), _catalog())
+    assert result["status"] == "success"
+    assert _picked(result) == [("orders", ["customer_id"]), ("orders", ["status", "created_at"]), ("items", ["sku"])]
+    benefits = [r["benefit_rows"] for r in result["details"]["recommended_indexes"]]
+    assert benefits == sorted(benefits, reverse=True)
+    assert result["details"]["recommended_indexes"][0]["ddl"].startswith("CREATE INDEX ")
+    assert result["details"]["rejected_candidates"] == []
+
+
+def test_same_result_for_any_input_order():
+    expected = advise_workload(build_workload(QUERIES), _catalog())
+    shuffled = QUERIES[:]
+    for seed in range(5):
+        random.Random(seed).shuffle(shuffled)
+        assert advise_workload(build_workload(shuffled), _catalog()) == expected
+
+
+def test_existing_index_is_not_recommended():
+    catalog = _catalog(orders=[{"name": "idx_customer", "columns": ["customer_id"], "cardinality": [20000]}])
+    assert ("orders", ["customer_id"]) not in _picked(advise_workload(build_workload(QUERIES), catalog))
+
+
+def test_max_indexes():
+    result = advise_workload(build_workload(QUERIES), _catalog(), max_indexes=1)
+    assert _picked(result) == [("orders", ["customer_id"])]
+    assert {(r["table"], tuple(r["columns"])): r["reason"] for r in result["details"]["rejected_candidates"]} == {
+        ("items", ("sku",)): "max_indexes",
+        ("orders", ("status",)): "max_indexes",
+        ("orders", ("status", "created_at")): "max_indexes",
+    }
+
+
+def test_storage_budget_picks_by_benefit_per_byte():
+    sizes = {tuple(r["columns"]): r["estimated_size_bytes"]
+             for r in advise_workload(build_workload(QUERIES), _catalog())["details"]["recommended_indexes"]}
+    # Room for customer_id and sku, not for the wider (status, created_at)
+    budget = sizes[("customer_id",)] + sizes[("sku",)]
+    result = advise_workload(build_workload(QUERIES), _catalog(), storage_budget_bytes=budget)
+    assert _picked(result) == [("orders", ["customer_id"]), ("items", ["sku"])]
+    rejected = {tuple(r["columns"]): r["reason"] for r in result["details"]["rejected_candidates"]}
+    assert rejected[("status", "created_at")] == "storage_budget"
+    assert sum(r["estimated_size_bytes"] for r in result["details"]["recommended_indexes"]) <= budget
+
+
+def test_writes_cost_against_the_benefit():
+    # Heavy inserts into items outweigh the rare lookup on sku
+    queries = QUERIES + [{"sql": "INSERT INTO items (sku) VALUES ('b')", "frequency": 100000}]
+    picked = _picked(advise_workload(build_workload(queries), _catalog()))
+    assert ("items", ["sku"]) not in picked
+    assert ("orders", ["customer_id"]) in picked
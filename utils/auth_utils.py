@@ -11,6 +11,8 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
+# Comma-separated emails allowed to use admin features (request profiling, profile downloads)
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -36,3 +38,17 @@ def decode_access_token(token: str):
         return payload if payload.get("sub") else None
     except JWTError:
         return None
+
+def is_admin(email: Optional[str]) -> bool:
+    return bool(email) and email.lower() in ADMIN_EMAILS
+
+def admin_email_from_cookie(cookie_value: Optional[str]) -> Optional[str]:
+    """Return the email in an ``access_token`` cookie if it belongs to an admin (no DB lookup)."""
+    if not cookie_value:
+        return None
+    token = cookie_value[7:] if cookie_value.startswith("Bearer ") else cookie_value
+    payload = decode_access_token(token)
+    if not payload or payload.get("type") == "reset":
+        return None
+    email = payload.get("sub")
+    return email if is_admin(email) else None
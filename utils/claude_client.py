@@ -1,133 +1,220 @@
 import json
-import re
+import time
 import logging
-import asyncio
-import httpx
+from typing import Optional, Type
+from pydantic import BaseModel, ValidationError
 from utils.config import Config
-
-GROQ_API_KEY = Config.GROQ_API_KEY
+from utils.llm_backends import get_backend
+from utils.shared_cache import get_cache, cache_key
+from utils.json_stream import IncrementalJSONParser
+from utils.metrics import LLM_CALL_LATENCY, LLM_FIRST_FIELD_LATENCY, LLM_JSON_REPAIRS, record_llm_usage
+from utils.tracing import start_span, record_span
 
 logger = logging.getLogger(__name__)
 
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+_decoder = json.JSONDecoder()
+# Candidate "{" positions tried before giving up on a completion
+MAX_SCAN_ATTEMPTS = 32
+# Previous output quoted back to the model in a repair request
+MAX_REPAIR_ECHO_CHARS = 4000
+
 
-def _extract_json_from_text(text: str):
-    """Extract JSON from Groq's text response."""
+def parse_json_object(text: str) -> dict:
+    """Return the first JSON object in ``text``.
+
+    JSON-mode completions parse on the first try. Otherwise (code fences, leading or
+    trailing prose) ``raw_decode`` is attempted at each ``{`` in turn: each attempt stops
+    at the end of the object it decodes, so there is no regex backtracking over the text.
+    """
     if not text:
         raise ValueError("Empty text")
+    stripped = text.strip()
+    try:
+        obj = json.loads(stripped)
+        if isinstance(obj, dict):
+            return obj
+    except json.JSONDecodeError:
+        pass
+    pos = stripped.find("{")
+    attempts = 0
+    last_error = None
+    while pos != -1 and attempts < MAX_SCAN_ATTEMPTS:
+        attempts += 1
+        try:
+            obj, _ = _decoder.raw_decode(stripped, pos)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError as e:
+            last_error = e
+        pos = stripped.find("{", pos + 1)
+    raise ValueError(f"Could not parse JSON from text: {last_error or 'no JSON object found'}")
 
-    text = re.sub(r'```json\s*|\s*```', '', text).strip()
 
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
+def _validate(obj: dict, schema: Optional[Type[BaseModel]]) -> dict:
+    return schema.model_validate(obj).model_dump() if schema is not None else obj
 
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Could not parse JSON from text: {e}")
-
-async def call_claude_raw(prompt: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 800, temperature: float = 0.7):
-    """Call Groq API and return raw response with retry logic."""
-    if not GROQ_API_KEY:
-        logger.error("GROQ_API_KEY not configured")
-        return {"error": "GROQ_API_KEY not set in environment."}
-    
-    payload = {
-        "model": model,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "messages": [{"role": "user", "content": prompt}],
-    }
-    
-    logger.debug(f"Groq API Request - Model: {model}, Max Tokens: {max_tokens}")
-    logger.debug(f"Payload keys: {list(payload.keys())}")
-
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    max_retries = 2
-    last_error = None
-    
-    for attempt in range(max_retries):
+
+def _repair_prompt(prompt: str, previous: str, problem: str, schema: Optional[Type[BaseModel]]) -> str:
+    shape = json.dumps(schema.model_json_schema(), separators=(",", ":")) if schema is not None else "a single JSON object"
+    return f"""{prompt}
+
+YOUR PREVIOUS ANSWER COULD NOT BE USED:
+{previous[:MAX_REPAIR_ECHO_CHARS]}
+
+PROBLEM:
+{problem}
+
+Return ONLY a corrected JSON object matching this JSON schema, with no prose or code fences:
+{shape}"""
+
+
+async def call_claude_raw(prompt: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 800, temperature: float = 0.7,
+                          agent: str = "unknown", json_mode: bool = False):
+    """Call the configured LLM backend and return its raw response."""
+    backend = get_backend()
+    json_mode = json_mode and backend.supports_json_mode
+    start = time.perf_counter()
+    with start_span("llm.call", agent=agent, backend=backend.name, model=model, json_mode=json_mode) as span:
+        response = await backend.complete(prompt, model, max_tokens, temperature, json_mode=json_mode)
+        outcome = "error" if "error" in response else "success"
+        span.set_attribute("outcome", outcome)
+        if outcome == "error":
+            span.status = "error"
+    LLM_CALL_LATENCY.labels(agent=agent, backend=backend.name, outcome=outcome).observe(time.perf_counter() - start)
+    record_llm_usage(agent, response.get("raw"))
+    return response
+
+
+def _llm_cache():
+    return get_cache() if Config.LLM_CACHE_TTL > 0 else None
+
+
+def _llm_cache_key(prompt, model, max_tokens, temperature, schema):
+    return cache_key(get_backend().name, model, max_tokens, temperature, schema.__name__ if schema else None, prompt)
+
+
+async def call_claude_json(prompt: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 1200, temperature: float = 0.1,
+                           agent: str = "unknown", schema: Optional[Type[BaseModel]] = None, repair: bool = True):
+    """Call the LLM backend in JSON mode and return the parsed (and ``schema``-validated) object.
+
+    If the output cannot be parsed or fails validation, the model is asked once to repair it;
+    a second failure returns ``{"error": ..., "raw_text": ...}``. Successful answers are kept in
+    the shared cache for ``LLM_CACHE_TTL`` seconds, so every worker reuses them for the same prompt.
+    """
+    cache = _llm_cache()
+    if cache is None:
+        return await _call_claude_json(prompt, model, max_tokens, temperature, agent, schema, repair)
+    return await cache.get_or_load(
+        "llm", _llm_cache_key(prompt, model, max_tokens, temperature, schema),
+        lambda: _call_claude_json(prompt, model, max_tokens, temperature, agent, schema, repair),
+        Config.LLM_CACHE_TTL, cacheable=lambda result: "error" not in result,
+    )
+
+
+async def _call_claude_json(prompt, model, max_tokens, temperature, agent, schema, repair):
+    text, problem = None, None
+    for attempt in range(2 if repair else 1):
+        ask = prompt if attempt == 0 else _repair_prompt(prompt, text or "", problem, schema)
+        raw_response = await call_claude_raw(ask, model, max_tokens, temperature if attempt == 0 else 0.0,
+                                             agent=agent, json_mode=True)
+        if "error" in raw_response and not raw_response.get("failed_generation"):
+            if attempt:
+                LLM_JSON_REPAIRS.labels(agent=agent, outcome="failed").inc()
+            return {"error": raw_response["error"], "raw": raw_response.get("raw")}
+        # JSON mode rejections carry the model's output, which is still worth parsing or repairing
+        text = raw_response.get("text") or raw_response.get("failed_generation") or ""
         try:
-            async with httpx.AsyncClient(timeout=120.0, limits=httpx.Limits(max_connections=5)) as client:
-                logger.debug(f"POST {GROQ_URL} (attempt {attempt + 1}/{max_retries})")
-                r = await client.post(GROQ_URL, headers=headers, json=payload)
-                text = r.text
-                
-                try:
-                    data = r.json()
-                except Exception:
-                    data = None
-                
-                logger.debug(f"Response Status: {r.status_code}")
-                
-                if r.status_code == 400:
-                    logger.error(f"400 Bad Request from Groq: {text}")
-                    if data:
-                        logger.error(f"Error details: {json.dumps(data, indent=2)}")
-                    return {"error": "Bad Request", "status": 400, "body": text}
-                
-                if r.status_code == 401:
-                    logger.error(f"401 Unauthorized - Invalid or expired API key")
-                    return {"error": "Unauthorized - Check your API key", "status": 401, "body": text}
-                
-                if r.status_code == 429:
-                    logger.warning(f"429 Rate Limited - Free tier quota exceeded")
-                    return {"error": "Rate limited - Free tier quota exceeded", "status": 429, "body": text}
-                
-                if r.status_code < 200 or r.status_code >= 300:
-                    logger.error(f"Groq returned {r.status_code}: {text}")
-                    last_error = {"error": "Groq request failed", "status": r.status_code, "body": text}
-                    if attempt < max_retries - 1:
-                        logger.info(f"Retrying... (attempt {attempt + 2}/{max_retries})")
-                        await asyncio.sleep(2 ** attempt)
-                        continue
-                    return last_error
-                
-                if isinstance(data, dict):
-                    choices = data.get("choices", [])
-                    if isinstance(choices, list) and len(choices) > 0:
-                        message = choices[0].get("message", {})
-                        text_out = message.get("content", "")
-                        return {"text": text_out, "raw": data}
-                
-                return {"text": str(data) if data is not None else text, "raw": data}
-                
-        except (httpx.TimeoutException, httpx.ConnectError, httpx.ReadError) as e:
-            last_error = str(e)
-            logger.warning(f"Network error on attempt {attempt + 1}/{max_retries}: {type(e).__name__}: {e}")
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.info(f"Waiting {wait_time}s before retry...")
-                await asyncio.sleep(wait_time)
-                continue
-            else:
-                logger.error(f"All retries failed. Last error: {last_error}")
-                return {"error": "Network timeout - Groq API unavailable", "details": str(last_error)}
-        except Exception as e:
-            logger.exception(f"Exception calling Groq API: {e}")
-            return {"error": "Request failed", "details": str(e)}
-    
-    return {"error": "Failed after retries", "details": str(last_error)}
-
-async def call_claude_json(prompt: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 1200, temperature: float = 0.1):
-    """Call Groq and parse JSON response."""
-    raw_response = await call_claude_raw(prompt, model, max_tokens, temperature)
-    
-    if "error" in raw_response:
-        return {"error": raw_response["error"], "raw": raw_response.get("raw")}
-    
-    text = raw_response.get("text", "")
+            parsed = _validate(parse_json_object(text), schema)
+            if attempt:
+                LLM_JSON_REPAIRS.labels(agent=agent, outcome="repaired").inc()
+            return parsed
+        except ValidationError as e:
+            problem = f"JSON did not match the schema: {e.errors(include_url=False, include_input=False)}"
+        except ValueError as e:
+            problem = str(e)
+        logger.warning(f"Unusable JSON from {agent} (attempt {attempt + 1}): {problem}")
+    if repair:
+        LLM_JSON_REPAIRS.labels(agent=agent, outcome="failed").inc()
+    return {"error": "Failed to parse JSON response", "raw_text": text, "details": problem}
+
+
+async def stream_claude_json(prompt: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 1200, temperature: float = 0.1,
+                             agent: str = "unknown", schema: Optional[Type[BaseModel]] = None, repair: bool = True):
+    """Streaming ``call_claude_json``.
+
+    Yields ``{"type": "field", "key": ..., "value": ...}`` for each top-level member as soon as
+    the model finishes writing it (values are as generated, not yet validated), then one
+    ``{"type": "result", "data": ...}`` holding exactly what ``call_claude_json`` would return.
+    A stream that fails before producing any text falls back to ``call_claude_json``. A cached
+    answer is replayed field by field without calling the backend.
+    """
+    cache = _llm_cache()
+    generation = None
+    if cache is not None:
+        entry_key = _llm_cache_key(prompt, model, max_tokens, temperature, schema)
+        hit, cached, generation = await cache.fetch("llm", entry_key)
+        if hit:
+            for field, value in cached.items():
+                yield {"type": "field", "key": field, "value": value}
+            yield {"type": "result", "data": cached}
+            return
+    backend = get_backend()
+    json_mode = backend.supports_json_mode
+    parser = IncrementalJSONParser()
+    chunks, error, raw = [], None, None
+    start, start_ns = time.perf_counter(), time.time_ns()
+    first_field = None
+    async for event in backend.stream(prompt, model, max_tokens, temperature, json_mode=json_mode):
+        if "error" in event:
+            error = event
+            break
+        if "delta" in event:
+            chunks.append(event["delta"])
+            for key, value in parser.feed(event["delta"]):
+                if first_field is None:
+                    first_field = time.perf_counter() - start
+                    LLM_FIRST_FIELD_LATENCY.labels(agent=agent, backend=backend.name).observe(first_field)
+                yield {"type": "field", "key": key, "value": value}
+        elif "raw" in event:
+            raw = event["raw"]
+    outcome = "error" if error else "success"
+    LLM_CALL_LATENCY.labels(agent=agent, backend=backend.name, outcome=outcome).observe(time.perf_counter() - start)
+    record_llm_usage(agent, raw)
+    record_span("llm.call", start_ns, status="ok" if outcome == "success" else "error", agent=agent,
+                backend=backend.name, model=model, json_mode=json_mode, stream=True, outcome=outcome,
+                fields=len(parser.fields),
+                first_field_ms=round(first_field * 1000, 1) if first_field is not None else None)
+
+    if error and not chunks:
+        if error.get("status") in (401, 429):
+            yield {"type": "result", "data": {"error": error["error"], "raw": error.get("raw")}}
+        else:
+            logger.warning(f"Streaming call for {agent} failed ({error['error']}); retrying without streaming")
+            yield {"type": "result", "data": await call_claude_json(prompt, model, max_tokens, temperature,
+                                                                   agent=agent, schema=schema, repair=repair)}
+        return
+
+    text = "".join(chunks)
     try:
-        parsed = _extract_json_from_text(text)
-        return parsed
-    except Exception as e:
-        logger.warning("Failed to parse JSON from Groq output: %s", e)
-        return {"error": "Failed to parse JSON response", "raw_text": text}
+        parsed = _validate(parse_json_object(text), schema)
+    except ValidationError as e:
+        problem = f"JSON did not match the schema: {e.errors(include_url=False, include_input=False)}"
+    except ValueError as e:
+        problem = str(e)
+    else:
+        if cache is not None:
+            await cache.save("llm", entry_key, parsed, Config.LLM_CACHE_TTL, generation)
+        yield {"type": "result", "data": parsed}
+        return
+    if error:
+        problem = f"{problem} (stream ended early: {error['error']})"
+    logger.warning(f"Unusable streamed JSON from {agent}: {problem}")
+    if not repair:
+        yield {"type": "result", "data": {"error": "Failed to parse JSON response", "raw_text": text, "details": problem}}
+        return
+    repaired = await call_claude_json(_repair_prompt(prompt, text, problem, schema), model, max_tokens, 0.0,
+                                      agent=agent, schema=schema, repair=False)
+    LLM_JSON_REPAIRS.labels(agent=agent, outcome="failed" if "error" in repaired else "repaired").inc()
+    if cache is not None and "error" not in repaired:
+        await cache.save("llm", entry_key, repaired, Config.LLM_CACHE_TTL, generation)
+    yield {"type": "result", "data": repaired}
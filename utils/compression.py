@@ -0,0 +1,107 @@
+import gzip
+
+import anyio
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Streaming bodies (NDJSON, SSE) are never buffered; only complete bodies of these types are compressed
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Bodies at least this large are compressed in a worker thread instead of on the event loop
+THREAD_THRESHOLD_BYTES = 256 * 1024
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """``{coding: q}`` from an Accept-Encoding header."""
+    codings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[name.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header: str):
+    """Best supported coding the client accepts: ``"br"``, ``"gzip"`` or ``None``."""
+    codings = parse_accept_encoding(header)
+    star = codings.get("*", 0.0)
+    options = []
+    if brotli is not None:
+        options.append(("br", codings.get("br", star)))
+    options.append(("gzip", codings.get("gzip", star)))
+    best = max(options, key=lambda o: o[1])  # max keeps the first on ties, so br wins over gzip
+    return best[0] if best[1] > 0 else None
+
+
+class CompressionMiddleware:
+    """ASGI middleware that negotiates brotli (when installed) or gzip for complete response bodies."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for key, value in scope.get("headers", []):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body chunk shows whether the body is complete
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            body = message.get("body", b"")
+            headers = [(k.lower(), v) for k, v in pending.get("headers", [])]
+            content_type = next((v.decode("latin-1") for k, v in headers if k == b"content-type"), "")
+            already_encoded = any(k == b"content-encoding" for k, _ in headers)
+            if (message.get("more_body") or already_encoded or len(body) < self.minimum_size
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(pending)
+                await send(message)
+                return
+            if len(body) >= THREAD_THRESHOLD_BYTES:
+                compressed = await anyio.to_thread.run_sync(self._compress, encoding, body)
+            else:
+                compressed = self._compress(encoding, body)
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"vary")]
+            vary = [v.decode("latin-1") for k, v in pending.get("headers", []) if k.lower() == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", ", ".join(vary + ["Accept-Encoding"]).encode()),
+            ]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -19,3 +19,91 @@ class Config:
     # Groq API
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+    # LLM backend: "groq" (default) or "local" (offline deterministic stand-in)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+    LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", 0))
+    LOCAL_LLM_JITTER_MS = float(os.getenv("LOCAL_LLM_JITTER_MS", 0))
+    LOCAL_LLM_ERROR_RATE = float(os.getenv("LOCAL_LLM_ERROR_RATE", 0))
+    LOCAL_LLM_RATE_LIMIT_RATE = float(os.getenv("LOCAL_LLM_RATE_LIMIT_RATE", 0))
+    LOCAL_LLM_SEED = int(os.getenv("LOCAL_LLM_SEED", 0))
+
+    # Tracing: TRACE_EXPORTER is "none", "json" (append spans to TRACE_FILE) or "otlp" (OTLP/HTTP JSON)
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+    TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+    OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
+
+    # On-demand profiling (admin requests carrying an X-Profile header)
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+
+    # /analyze-schema: tables whose columns/indexes are fetched per information_schema round-trip
+    SCHEMA_BATCH_SIZE = int(os.getenv("SCHEMA_BATCH_SIZE", 200))
+
+    # /advise-workload: distinct statements EXPLAINed (most frequent first) and how many run at once
+    WORKLOAD_EXPLAIN_LIMIT = int(os.getenv("WORKLOAD_EXPLAIN_LIMIT", 200))
+    WORKLOAD_EXPLAIN_CONCURRENCY = int(os.getenv("WORKLOAD_EXPLAIN_CONCURRENCY", 4))
+
+    # /analyze-indexes: most findings trialled with IGNORE INDEX hints per request
+    INDEX_TRIAL_LIMIT = int(os.getenv("INDEX_TRIAL_LIMIT", 20))
+
+    # Response compression (brotli when the optional package is installed, else gzip)
+    COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+    # /analyze: each technical_details part is trimmed to about this many bytes of JSON (0 disables)
+    ANALYZE_SECTION_MAX_BYTES = int(os.getenv("ANALYZE_SECTION_MAX_BYTES", 256 * 1024))
+
+    # Cache shared by all workers on a host (SQLite, WAL mode). An empty path disables it; a TTL of 0 disables that kind.
+    # The default sits in the user's own cache directory (created 0700), not in the world-writable temp directory
+    SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "queryvault", "cache.sqlite"))
+    SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", 10000))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+    SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", 300))
+
+    # Async analysis jobs (POST /analyze with async_job): concurrent jobs and queue depth per worker process,
+    # lease renewed while a job is unfinished (an expired lease marks it failed), and how long finished jobs are kept
+    JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", 4))
+    JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", 100))
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 30))
+    JOB_TTL_HOURS = float(os.getenv("JOB_TTL_HOURS", 24))
+    JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", 1.0))
+
+    # Target database pools are kept per target and reused; unleased pools close after DB_POOL_IDLE_SECONDS
+    DB_POOL_IDLE_SECONDS = float(os.getenv("DB_POOL_IDLE_SECONDS", 300))
+    DB_POOL_MAX_TARGETS = int(os.getenv("DB_POOL_MAX_TARGETS", 32))
+    # Per-pool defaults, overridable per target with "pool" in the database config. Connections older than
+    # DB_POOL_RECYCLE_SECONDS are replaced (keep it under the server's wait_timeout; -1 disables)
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", 10))
+
+    # Statements run on targets (sample rows, EXPLAIN) go through a READ ONLY transaction with these per-statement
+    # limits. The time limit applies to every statement; the memory limit and low priority where the server has them
+    SANDBOX_STATEMENT_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_STATEMENT_TIMEOUT_SECONDS", 5))
+    SANDBOX_MAX_MEMORY_MB = int(os.getenv("SANDBOX_MAX_MEMORY_MB", 256))
+    SANDBOX_LOW_PRIORITY = os.getenv("SANDBOX_LOW_PRIORITY", "true").lower() == "true"
+
+    # Data validation profiles up to PROFILE_SAMPLE_ROWS result rows, streamed PROFILE_FETCH_BATCH rows at a time
+    PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", 10000))
+    PROFILE_FETCH_BATCH = int(os.getenv("PROFILE_FETCH_BATCH", 1000))
+    # Foreign keys checked for orphan rows per analysis; each child table is scanned once under the sandbox limits
+    DATA_QUALITY_MAX_FOREIGN_KEYS = int(os.getenv("DATA_QUALITY_MAX_FOREIGN_KEYS", 10))
+
+    # /analyze "targets" fan-out: at most FANOUT_MAX_TARGETS extra targets, each read FANOUT_TARGET_CONCURRENCY
+    # fetches at a time from its own pool and given up after FANOUT_TARGET_TIMEOUT_SECONDS
+    FANOUT_MAX_TARGETS = int(os.getenv("FANOUT_MAX_TARGETS", 8))
+    FANOUT_TARGET_CONCURRENCY = int(os.getenv("FANOUT_TARGET_CONCURRENCY", 2))
+    FANOUT_TARGET_TIMEOUT_SECONDS = float(os.getenv("FANOUT_TARGET_TIMEOUT_SECONDS", 15))
+
+    # Groq HTTP client shared across calls
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+    LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", 30))
+
+    # Startup warm-up (MongoDB, LLM connection, templates, the DB_* default database when WARMUP_DEFAULT_DB is set);
+    # /readyz answers 503 until it finishes. Each step gives up after WARMUP_TIMEOUT_SECONDS
+    WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 10))
+    WARMUP_DEFAULT_DB = os.getenv("WARMUP_DEFAULT_DB", "true").lower() == "true"
+    READY_CHECK_TIMEOUT_SECONDS = float(os.getenv("READY_CHECK_TIMEOUT_SECONDS", 2))
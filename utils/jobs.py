@@ -0,0 +1,195 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+import orjson
+
+from utils.serialization import dumps
+from utils.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ("queued", "running")
+FINISHED = ("succeeded", "failed")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobManager:
+    """Bounded in-process pool for long analyses, with job status persisted in MongoDB.
+
+    ``submit`` records a queued job and returns at once; ``concurrency`` worker tasks take jobs
+    from an in-memory queue. The work itself, database credentials included, only ever lives in
+    memory, so a job cannot be resumed by another process. Each process instead renews a lease on
+    its unfinished jobs, and a periodic sweep in every process marks jobs whose lease ran out
+    (restart, crash, shutdown mid-job) as failed, telling the client to resubmit.
+    """
+
+    def __init__(self, collection, concurrency: int = 4, max_queued: int = 100,
+                 lease_seconds: float = 30, ttl_hours: float = 24):
+        self.collection = collection
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.ttl_hours = ttl_hours
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = None
+        self._work = {}
+        self._changed = {}
+        self._tasks = []
+        self._running = 0
+
+    # --- lifecycle ---
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        # Index creation and recovery talk to MongoDB; they must not hold up startup when it is slow
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        logger.info(f"Job pool started: {self.concurrency} workers ({self.worker_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            await self._fail_unfinished({"worker": self.worker_id}, "Server shut down before the job finished; resubmit it")
+        except Exception as e:
+            logger.warning(f"Could not mark unfinished jobs failed on shutdown: {e}")
+
+    async def _maintain(self):
+        try:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            await self.collection.create_index([("status", 1), ("lease_until", 1)])
+        except Exception as e:
+            logger.warning(f"Job index creation failed: {e}")
+        while True:
+            try:
+                now = datetime.utcnow()
+                await self.collection.update_many(
+                    {"worker": self.worker_id, "status": {"$in": list(UNFINISHED)}},
+                    {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                )
+                failed = await self._fail_unfinished(
+                    {"lease_until": {"$lt": now}}, "Server restarted before the job finished; resubmit it")
+                if failed:
+                    logger.warning(f"Marked {failed} abandoned job(s) failed")
+            except Exception as e:
+                logger.warning(f"Job lease maintenance failed: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _fail_unfinished(self, query: dict, reason: str) -> int:
+        result = await self.collection.update_many(
+            {**query, "status": {"$in": list(UNFINISHED)}},
+            {"$set": {"status": "failed", "error": reason, "finished_at": datetime.utcnow()}},
+        )
+        return result.modified_count
+
+    # --- API ---
+
+    async def submit(self, owner: str, kind: str, summary: dict, work, traceparent: str = None) -> dict:
+        """Queue ``work`` (a zero-argument coroutine function returning a JSON-able result).
+
+        ``summary`` is stored with the job for display and must not contain credentials.
+        Raises ``JobQueueFull`` when ``max_queued`` jobs are already waiting here.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job pool is not running")
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFull(f"{self.max_queued} jobs already queued")
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "owner": owner,
+            "kind": kind,
+            "status": "queued",
+            "request": summary,
+            "worker": self.worker_id,
+            "created_at": now,
+            "lease_until": now + timedelta(seconds=self.lease_seconds),
+            "expires_at": now + timedelta(hours=self.ttl_hours),
+        }
+        await self.collection.insert_one(job)
+        self._work[job["_id"]] = (work, traceparent)
+        self._changed[job["_id"]] = asyncio.Event()
+        self._queue.put_nowait(job["_id"])
+        return self.public(job)
+
+    async def get(self, job_id: str, owner: str):
+        job = await self.collection.find_one({"_id": job_id, "owner": owner})
+        return self.public(job) if job else None
+
+    async def wait(self, job_id: str, timeout: float):
+        """Return when a job running in this process changes, or after ``timeout`` seconds."""
+        event = self._changed.get(job_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self) -> dict:
+        return {"workers": self.concurrency, "running": self._running,
+                "queued": self._queue.qsize() if self._queue else 0, "max_queued": self.max_queued}
+
+    @staticmethod
+    def public(job: dict) -> dict:
+        """API view of a stored job: ``job_id``, timestamps as ISO strings, ``result`` decoded."""
+        view = {"job_id": job["_id"]}
+        for key in ("kind", "status", "request", "error", "trace_id"):
+            if job.get(key) is not None:
+                view[key] = job[key]
+        for key in ("created_at", "started_at", "finished_at"):
+            if job.get(key):
+                view[key] = job[key].isoformat() + "Z"
+        if job.get("result_json"):
+            view["result"] = orjson.loads(job["result_json"])
+        return view
+
+    # --- workers ---
+
+    async def _update(self, job_id: str, fields: dict):
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+            self._changed[job_id] = asyncio.Event()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            work, traceparent = self._work.pop(job_id)
+            self._running += 1
+            try:
+                await self._run(job_id, work, traceparent)
+            except Exception as e:
+                logger.exception(f"Job {job_id} bookkeeping failed: {e}")
+            finally:
+                self._running -= 1
+                event = self._changed.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id: str, work, traceparent):
+        with start_trace("job.run", traceparent=traceparent, job_id=job_id) as span:
+            await self._update(job_id, {"status": "running", "started_at": datetime.utcnow(), "trace_id": span.trace_id})
+            try:
+                result = await work()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job_id} failed: {e}")
+                span.record_exception(e)
+                await self._update(job_id, {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()})
+                return
+            # Stored as a JSON string: result keys (sample row columns) may hold "." or "$"
+            await self._update(job_id, {"status": "succeeded", "result_json": dumps(result).decode(),
+                                        "finished_at": datetime.utcnow()})
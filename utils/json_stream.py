@@ -0,0 +1,82 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalJSONParser:
+    """Parse a JSON object as it streams in, returning each top-level member once its value is complete.
+
+    Text before the opening ``{`` (prose, a code fence) is skipped. Every character is scanned
+    once across all ``feed`` calls; only a finished member's key and value text are decoded.
+    Members whose value does not decode are skipped here and left to the full-text parse.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self.done = False
+        self.fields = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add ``chunk`` and return the ``(key, value)`` members it completed, in order."""
+        self._text += chunk
+        text, i, completed = self._text, self._pos, []
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = self._decode(text[self._key_start:i + 1])
+                        self._key_start = None
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(text, i, completed)
+                    self.done = True
+            elif self._depth == 1:
+                if c == ":" and self._value_start is None:
+                    self._value_start = i + 1
+                elif c == ",":
+                    self._complete(text, i, completed)
+            i += 1
+        self._pos = i
+        return completed
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _complete(self, text: str, end: int, completed: list):
+        key, start = self._key, self._value_start
+        self._key = self._value_start = None
+        if not isinstance(key, str) or start is None:
+            return
+        raw = text[start:end].strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.fields[key] = value
+        completed.append((key, value))
@@ -0,0 +1,464 @@
+import json
+import re
+import time
+import logging
+import asyncio
+import random
+from utils.config import Config
+from utils.tracing import start_span, record_span
+
+logger = logging.getLogger(__name__)
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+class LLMBackend:
+    """Interface every LLM driver implements.
+
+    ``complete`` returns ``{"text": ..., "raw": ...}`` on success or a dict with an
+    ``"error"`` key (plus optional ``status``/``body``/``details``) on failure.
+    Backends with ``supports_json_mode`` constrain output to a single JSON object
+    when called with ``json_mode=True``.
+
+    ``stream`` yields ``{"delta": text}`` chunks as the completion is generated, then
+    ``{"raw": ...}`` carrying the usage, or a final error dict. The default streams the
+    whole ``complete`` answer as one chunk.
+
+    ``warm_up`` opens whatever connections the backend keeps between calls (run at
+    startup) and ``aclose`` releases them.
+    """
+
+    name = "base"
+    supports_json_mode = False
+
+    async def warm_up(self) -> dict:
+        return {}
+
+    async def aclose(self):
+        pass
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        response = await self.complete(prompt, model, max_tokens, temperature, json_mode=json_mode)
+        if "error" in response:
+            yield response
+            return
+        yield {"delta": response.get("text") or ""}
+        yield {"raw": response.get("raw")}
+
+
+class GroqBackend(LLMBackend):
+    """OpenAI-compatible chat completions against the Groq API."""
+
+    name = "groq"
+    supports_json_mode = True
+
+    def __init__(self, api_key: str = None, url: str = GROQ_URL, max_retries: int = 2):
+        self.api_key = api_key
+        self.url = url
+        self.max_retries = max_retries
+        self._client = None
+        self._client_loop = None
+
+    def _http(self):
+        """HTTP client shared by every call on this event loop, so TLS connections to the API are reused."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=120.0, limits=httpx.Limits(
+                max_connections=Config.LLM_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=Config.LLM_HTTP_KEEPALIVE_SECONDS,
+            ))
+            self._client_loop = loop
+        return self._client
+
+    async def warm_up(self) -> dict:
+        if not self.api_key:
+            return {"skipped": "GROQ_API_KEY not set"}
+        # Any authenticated GET completes DNS and the TLS handshake; the connection stays in the pool
+        models_url = self.url.rsplit("/chat/completions", 1)[0] + "/models"
+        r = await self._http().get(models_url, headers={"Authorization": f"Bearer {self.api_key}"})
+        return {"status_code": r.status_code}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _client_error(status: int, text: str, data):
+        """Error dict for the 4xx responses that are never retried, else ``None``."""
+        if status == 400:
+            error = data.get("error") if isinstance(data, dict) else None
+            if isinstance(error, dict) and error.get("code") == "json_validate_failed":
+                # JSON mode rejected the completion; hand it back so the caller can repair it
+                logger.warning("Groq JSON mode rejected the completion")
+                return {"error": "JSON validation failed", "status": 400, "body": text,
+                        "failed_generation": error.get("failed_generation", "")}
+            logger.error(f"400 Bad Request from Groq: {text}")
+            if data:
+                logger.error(f"Error details: {json.dumps(data, indent=2)}")
+            return {"error": "Bad Request", "status": 400, "body": text}
+
+        if status == 401:
+            logger.error(f"401 Unauthorized - Invalid or expired API key")
+            return {"error": "Unauthorized - Check your API key", "status": 401, "body": text}
+
+        if status == 429:
+            logger.warning(f"429 Rate Limited - Free tier quota exceeded")
+            return {"error": "Rate limited - Free tier quota exceeded", "status": 429, "body": text}
+        return None
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        # httpx is imported on first use so the local backend (and app import) never pays for it
+        import httpx
+
+        if not self.api_key:
+            logger.error("GROQ_API_KEY not configured")
+            return {"error": "GROQ_API_KEY not set in environment."}
+
+        payload = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+
+        logger.debug(f"Groq API Request - Model: {model}, Max Tokens: {max_tokens}")
+        logger.debug(f"Payload keys: {list(payload.keys())}")
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        max_retries = self.max_retries
+        last_error = None
+
+        for attempt in range(max_retries):
+            retry = False
+            with start_span("llm.attempt", backend=self.name, model=model, attempt=attempt + 1) as span:
+                try:
+                    client = self._http()
+                    logger.debug(f"POST {self.url} (attempt {attempt + 1}/{max_retries})")
+                    r = await client.post(self.url, headers=headers, json=payload)
+                    text = r.text
+                    span.set_attribute("http.status_code", r.status_code)
+
+                    try:
+                        data = r.json()
+                    except Exception:
+                        data = None
+
+                    logger.debug(f"Response Status: {r.status_code}")
+
+                    client_error = self._client_error(r.status_code, text, data)
+                    if client_error:
+                        return client_error
+
+                    if r.status_code < 200 or r.status_code >= 300:
+                        logger.error(f"Groq returned {r.status_code}: {text}")
+                        span.status = "error"
+                        last_error = {"error": "Groq request failed", "status": r.status_code, "body": text}
+                        if attempt < max_retries - 1:
+                            logger.info(f"Retrying... (attempt {attempt + 2}/{max_retries})")
+                            retry = True
+                        else:
+                            return last_error
+                    else:
+                        if isinstance(data, dict):
+                            choices = data.get("choices", [])
+                            if isinstance(choices, list) and len(choices) > 0:
+                                message = choices[0].get("message", {})
+                                text_out = message.get("content", "")
+                                return {"text": text_out, "raw": data}
+
+                        return {"text": str(data) if data is not None else text, "raw": data}
+
+                except (httpx.TimeoutException, httpx.ConnectError, httpx.ReadError) as e:
+                    last_error = str(e)
+                    span.record_exception(e)
+                    logger.warning(f"Network error on attempt {attempt + 1}/{max_retries}: {type(e).__name__}: {e}")
+                    if attempt < max_retries - 1:
+                        retry = True
+                    else:
+                        logger.error(f"All retries failed. Last error: {last_error}")
+                        return {"error": "Network timeout - Groq API unavailable", "details": str(last_error)}
+                except Exception as e:
+                    logger.exception(f"Exception calling Groq API: {e}")
+                    span.record_exception(e)
+                    return {"error": "Request failed", "details": str(e)}
+
+            if retry:
+                wait_time = 2 ** attempt
+                logger.info(f"Waiting {wait_time}s before retry...")
+                with start_span("llm.backoff", seconds=wait_time, attempt=attempt + 1):
+                    await asyncio.sleep(wait_time)
+
+        return {"error": "Failed after retries", "details": str(last_error)}
+
+    async def stream(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        """Server-sent-events completion. Not retried: callers fall back to ``complete`` when nothing arrived.
+
+        Groq does not combine ``response_format`` with streaming, so ``json_mode`` is ignored
+        here and the caller validates the assembled text.
+        """
+        import httpx
+
+        if not self.api_key:
+            logger.error("GROQ_API_KEY not configured")
+            yield {"error": "GROQ_API_KEY not set in environment."}
+            return
+
+        payload = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        start_ns, status_code, outcome, usage = time.time_ns(), None, "error", None
+        try:
+            client = self._http()
+            async with client.stream("POST", self.url, headers=headers, json=payload) as r:
+                status_code = r.status_code
+                if r.status_code < 200 or r.status_code >= 300:
+                    text = (await r.aread()).decode("utf-8", errors="replace")
+                    try:
+                        data = json.loads(text)
+                    except ValueError:
+                        data = None
+                    error = self._client_error(r.status_code, text, data)
+                    if error is None:
+                        logger.error(f"Groq stream returned {r.status_code}: {text}")
+                        error = {"error": "Groq request failed", "status": r.status_code, "body": text}
+                    yield error
+                    return
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    # Usage arrives on the last chunk, under x_groq on older API versions
+                    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield {"delta": delta}
+            outcome = "ok"
+            yield {"raw": {"model": model, "usage": usage}}
+        except (httpx.TimeoutException, httpx.ConnectError, httpx.ReadError) as e:
+            logger.warning(f"Network error while streaming from Groq: {type(e).__name__}: {e}")
+            yield {"error": "Network timeout - Groq API unavailable", "details": str(e)}
+        except ValueError as e:
+            logger.error(f"Malformed Groq stream chunk: {e}")
+            yield {"error": "Request failed", "details": str(e)}
+        finally:
+            record_span("llm.attempt", start_ns, status="ok" if outcome == "ok" else "error",
+                        backend=self.name, model=model, attempt=1, stream=True,
+                        **{"http.status_code": status_code})
+
+
+# --- Offline stand-in ---
+
+def _prompt_section(prompt: str, header: str) -> str:
+    """Return the block that follows ``HEADER:`` in an agent prompt."""
+    match = re.search(rf"^{re.escape(header)}:\s*\n(.*?)(?:\n\n|\Z)", prompt, re.MULTILINE | re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _local_optimizer(prompt: str):
+    sql = _prompt_section(prompt, "ORIGINAL QUERY").rstrip(";")
+    optimized = sql if re.search(r"\blimit\b", sql, re.IGNORECASE) else f"{sql} LIMIT 1000"
+    return {
+        "optimized_query": optimized,
+        "why_faster": "Bounded result set reduces rows sent to the client",
+        "recommendations": [
+            "Replace SELECT * with explicit columns",
+            "Index columns used in JOIN and WHERE clauses",
+            "Add a LIMIT to bound the result set",
+        ],
+        "warnings": [],
+        "engine_advice": ["Use InnoDB for better concurrent access"],
+        "materialization_advice": [],
+    }
+
+
+def _local_cost(prompt: str):
+    return {
+        "estimated_cost": "medium",
+        "cost_saving_tips": ["Use covering indexes to avoid table lookups"],
+        "warnings": [],
+    }
+
+
+def _local_schema(prompt: str):
+    return {
+        "recommended_indexes": [],
+        "schema_changes": [],
+        "warnings": [],
+    }
+
+
+def _local_validator(prompt: str):
+    return {
+        "issues": [],
+        "confidence": "high",
+        "reasoning": "Local backend: no data quality checks performed",
+    }
+
+
+def _local_unsafe(prompt: str):
+    return {
+        "safe_preview": "SELECT 1",
+        "explanation": "Query contains data-modifying statements",
+    }
+
+
+# Prompt marker -> canned response builder, matched in order.
+LOCAL_RESPONDERS = [
+    ("SQL performance tuning agent", _local_optimizer),
+    ("Cost Advisor", _local_cost),
+    ("Schema Advisor", _local_schema),
+    ("Data Quality Validator", _local_validator),
+    ("Query is unsafe", _local_unsafe),
+]
+
+
+class LocalBackend(LLMBackend):
+    """Deterministic offline stand-in for load tests and CI.
+
+    Returns schema-valid JSON for each agent prompt after a configurable delay and
+    injects 5xx errors and 429s at the given rates. The random sequence is seeded,
+    so a run with the same settings and request order is reproducible.
+    """
+
+    name = "local"
+    supports_json_mode = True  # canned answers are always a single JSON object
+    # Characters per streamed chunk, roughly a few tokens
+    STREAM_CHUNK_CHARS = 16
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rng = random.Random(seed)
+
+    def _draw(self):
+        """Delay (ms) and failure roll for one call, from the seeded sequence."""
+        delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        return delay, self._rng.random()
+
+    def _injected_error(self, roll: float):
+        if roll < self.rate_limit_rate:
+            return {"error": "Rate limited - Free tier quota exceeded", "status": 429, "body": "local backend"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return {"error": "Local backend injected failure", "status": 500, "body": "local backend"}
+        return None
+
+    @staticmethod
+    def _answer(prompt: str, model: str):
+        payload = {}
+        for marker, responder in LOCAL_RESPONDERS:
+            if marker in prompt:
+                payload = responder(prompt)
+                break
+
+        text = json.dumps(payload)
+        raw = {
+            "id": "local-completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(text) // 4,
+                "total_tokens": (len(prompt) + len(text)) // 4,
+            },
+        }
+        return {"text": text, "raw": raw}
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        delay, roll = self._draw()
+        with start_span("llm.attempt", backend=self.name, model=model, attempt=1) as span:
+            if delay:
+                await asyncio.sleep(delay / 1000.0)
+
+            error = self._injected_error(roll)
+            if error:
+                span.set_attribute("http.status_code", error["status"])
+                return error
+
+        return self._answer(prompt, model)
+
+    async def stream(self, prompt: str, model: str, max_tokens: int, temperature: float, json_mode: bool = False):
+        """The ``complete`` answer in ``STREAM_CHUNK_CHARS`` pieces, with the delay spread evenly across them."""
+        delay, roll = self._draw()
+        start_ns = time.time_ns()
+        error = self._injected_error(roll)
+        if error:
+            if delay:
+                await asyncio.sleep(delay / 1000.0)
+            record_span("llm.attempt", start_ns, status="error", backend=self.name, model=model, attempt=1,
+                        stream=True, **{"http.status_code": error["status"]})
+            yield error
+            return
+        response = self._answer(prompt, model)
+        text = response["text"]
+        pieces = [text[i:i + self.STREAM_CHUNK_CHARS] for i in range(0, len(text), self.STREAM_CHUNK_CHARS)] or [""]
+        for piece in pieces:
+            if delay:
+                await asyncio.sleep(delay / 1000.0 / len(pieces))
+            yield {"delta": piece}
+        record_span("llm.attempt", start_ns, backend=self.name, model=model, attempt=1, stream=True)
+        yield {"raw": response["raw"]}
+
+
+BACKENDS = {
+    "groq": lambda: GroqBackend(api_key=Config.GROQ_API_KEY),
+    "local": lambda: LocalBackend(
+        latency_ms=Config.LOCAL_LLM_LATENCY_MS,
+        jitter_ms=Config.LOCAL_LLM_JITTER_MS,
+        error_rate=Config.LOCAL_LLM_ERROR_RATE,
+        rate_limit_rate=Config.LOCAL_LLM_RATE_LIMIT_RATE,
+        seed=Config.LOCAL_LLM_SEED,
+    ),
+}
+
+_backend = None
+
+
+def get_backend() -> LLMBackend:
+    """Return the process-wide backend selected by ``LLM_BACKEND``."""
+    global _backend
+    if _backend is None:
+        name = Config.LLM_BACKEND
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected one of {sorted(BACKENDS)})")
+        _backend = BACKENDS[name]()
+        logger.info(f"Using LLM backend: {_backend.name}")
+    return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Override the active backend (benchmarks, scripts)."""
+    global _backend
+    _backend = backend
+
+
+async def close_backend():
+    """Release the active backend's connections (application shutdown)."""
+    if _backend is not None:
+        await _backend.aclose()
@@ -0,0 +1,61 @@
+import json
+from typing import List, Annotated
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict
+
+
+def _as_str_list(value):
+    """Accept a list of strings from models that answer with a bare string, null or objects."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, list):
+        return [v if isinstance(v, str) else json.dumps(v, default=str) for v in value if v is not None]
+    return value
+
+
+def _as_level(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+StrList = Annotated[List[str], BeforeValidator(_as_str_list)]
+Level = Annotated[str, BeforeValidator(_as_level)]
+
+
+class AgentOutput(BaseModel):
+    """Base for agent response schemas: unknown keys are dropped, listed keys are type-checked."""
+
+    model_config = ConfigDict(extra="ignore")
+
+
+class OptimizerOutput(AgentOutput):
+    optimized_query: str
+    why_faster: str = ""
+    recommendations: StrList = []
+    warnings: StrList = []
+    engine_advice: StrList = []
+    materialization_advice: StrList = []
+
+
+class CostOutput(AgentOutput):
+    estimated_cost: Level
+    cost_saving_tips: StrList = []
+    warnings: StrList = []
+
+
+class SchemaOutput(AgentOutput):
+    recommended_indexes: StrList
+    schema_changes: StrList = []
+    warnings: StrList = []
+
+
+class ValidatorOutput(AgentOutput):
+    issues: StrList
+    confidence: Level = "low"
+    reasoning: str = ""
+
+
+class UnsafeOutput(AgentOutput):
+    safe_preview: str
+    explanation: str = ""
@@ -0,0 +1,112 @@
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Latency buckets (seconds) spanning fast DB statements to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_LATENCY = Histogram(
+    "queryvault_stage_duration_seconds",
+    "Time spent in each stage of a request (pool_connect, schema_fetch, explain, ...)",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_CALL_LATENCY = Histogram(
+    "queryvault_llm_call_duration_seconds",
+    "LLM call latency per agent, including backend retries",
+    ["agent", "backend", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_FIRST_FIELD_LATENCY = Histogram(
+    "queryvault_llm_first_field_seconds",
+    "Time from a streamed LLM call starting to its first complete top-level JSON field",
+    ["agent", "backend"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_TOKENS = Counter(
+    "queryvault_llm_tokens_total",
+    "LLM tokens reported in the completion usage field",
+    ["agent", "kind"],
+)
+
+LLM_JSON_REPAIRS = Counter(
+    "queryvault_llm_json_repairs_total",
+    "Re-asks after an unparseable or schema-invalid LLM answer, by result (repaired/failed)",
+    ["agent", "outcome"],
+)
+
+CACHE_REQUESTS = Counter(
+    "queryvault_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ["cache", "result"],
+)
+
+DB_POOL_ACQUIRE_WAIT = Histogram(
+    "queryvault_db_pool_acquire_wait_seconds",
+    "Time spent waiting for a free connection in a target database pool",
+    ["database"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_ACQUIRE_TIMEOUTS = Counter(
+    "queryvault_db_pool_acquire_timeouts_total",
+    "Pool acquires that gave up after the acquire timeout",
+    ["database"],
+)
+
+DB_POOL_IN_USE = Gauge(
+    "queryvault_db_pool_connections_in_use",
+    "Target database connections currently checked out of a pool",
+    ["database"],
+    multiprocess_mode="livesum",
+)
+
+IN_FLIGHT = Gauge(
+    "queryvault_requests_in_flight",
+    "Requests currently being processed",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_stage(endpoint: str, stage: str, seconds: float):
+    STAGE_LATENCY.labels(endpoint=endpoint, stage=stage).observe(seconds)
+
+
+def record_llm_usage(agent: str, raw):
+    """Count prompt/completion tokens from the ``usage`` field of a raw completion."""
+    usage = raw.get("usage") if isinstance(raw, dict) else None
+    if not isinstance(usage, dict):
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind)
+        if isinstance(value, (int, float)) and value > 0:
+            LLM_TOKENS.labels(agent=agent, kind=kind.replace("_tokens", "")).inc(value)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_metrics():
+    """Return ``(body, content_type)`` for the /metrics endpoint.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set (gunicorn with several workers) the
+    per-process files are aggregated, otherwise the default registry is used.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import secrets
+import threading
+from collections import Counter
+
+PROFILE_ID_RE = r"^[0-9a-f]{16}$"
+
+
+class SamplingProfiler:
+    """Samples the Python stack of one thread from a background thread.
+
+    Stacks are aggregated into the collapsed format (``frame;frame;frame count``)
+    read by flamegraph.pl, speedscope and inferno. Nothing runs unless ``start``
+    is called, so requests that are not profiled pay no overhead.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = 5.0):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.duration_ms = 0.0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_label(frame))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="queryvault-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration_ms = (time.perf_counter() - self._started) * 1000 if self._started else 0.0
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top_functions(self, limit: int = 15):
+        """Functions ranked by self samples (the leaf frame of each stack)."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"function": fn, "samples": n, "share": round(n / self.samples, 4) if self.samples else 0}
+                for fn, n in leaves.most_common(limit)]
+
+    def save(self, directory: str, metadata: dict) -> str:
+        """Write ``<id>.collapsed`` and ``<id>.json`` (summary) to ``directory``; return the id."""
+        os.makedirs(directory, exist_ok=True)
+        profile_id = secrets.token_hex(8)
+        with open(os.path.join(directory, f"{profile_id}.collapsed"), "w") as f:
+            f.write(self.collapsed())
+        summary = {
+            "profile_id": profile_id,
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_ms": round(self.duration_ms, 3),
+            "top_functions": self.top_functions(),
+            **metadata,
+        }
+        with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        return profile_id
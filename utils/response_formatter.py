@@ -1,5 +1,6 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Optional
+from utils.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
@@ -7,6 +8,118 @@ logger = logging.getLogger(__name__)
 class ResponseFormatter:
     """Formats AI agent outputs into structured, user-friendly responses."""
 
+    SECTIONS = ("summary", "optimization", "cost_analysis", "schema_improvements", "data_quality", "technical_details")
+    TECHNICAL_DETAILS = ("explain_plan", "sample_rows", "schema_context", "index_catalog")
+
+    # What each section needs computed. Agents pull in their own inputs via AGENT_INPUTS.
+    SECTION_INPUTS = {
+        "summary": {"optimizer"},
+        "optimization": {"optimizer"},
+        "cost_analysis": {"cost_advisor"},
+        "schema_improvements": {"schema_advisor"},
+        "data_quality": {"data_validator"},
+        "technical_details.explain_plan": {"explain"},
+        "technical_details.sample_rows": {"sample_rows"},
+        "technical_details.schema_context": {"schema_context"},
+        "technical_details.index_catalog": {"index_catalog"},
+    }
+    AGENT_INPUTS = {
+        "optimizer": {"schema_context", "index_catalog", "explain"},
+        "cost_advisor": {"explain", "index_catalog"},
+        "schema_advisor": {"schema_context", "index_catalog"},
+        "data_validator": {"column_profile", "schema_context", "integrity"},
+    }
+
+    # Sections built from each agent's output, and the builder for each
+    AGENT_SECTIONS = {
+        "optimizer": ("summary", "optimization"),
+        "cost_advisor": ("cost_analysis",),
+        "schema_advisor": ("schema_improvements",),
+        "data_validator": ("data_quality",),
+    }
+    SECTION_BUILDERS = {
+        "summary": lambda output: ResponseFormatter._extract_summary(output),
+        "optimization": lambda output: ResponseFormatter._format_optimizer(output),
+        "cost_analysis": lambda output: ResponseFormatter._format_cost_advisor(output),
+        "schema_improvements": lambda output: ResponseFormatter._format_schema_advisor(output),
+        "data_quality": lambda output: ResponseFormatter._format_data_validator(output),
+    }
+
+    @staticmethod
+    def resolve_fields(fields: Optional[Iterable[str]]) -> set:
+        """Expand requested fields into section leaves (``technical_details.<part>`` for details).
+
+        ``None`` selects everything. Raises ``ValueError`` listing unknown names.
+        """
+        leaves = set(ResponseFormatter.SECTION_INPUTS)
+        if fields is None:
+            return leaves
+        selected, unknown = set(), []
+        for field in fields:
+            field = field.strip()
+            if field == "technical_details":
+                selected.update(f"technical_details.{p}" for p in ResponseFormatter.TECHNICAL_DETAILS)
+            elif field in leaves:
+                selected.add(field)
+            elif field:
+                unknown.append(field)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid: {', '.join(sorted(leaves | {'technical_details'}))}")
+        return selected
+
+    @staticmethod
+    def required_inputs(selected: set) -> set:
+        """Agents and data fetches needed to build ``selected`` sections."""
+        needed = set()
+        for leaf in selected:
+            needed |= ResponseFormatter.SECTION_INPUTS[leaf]
+        for agent in list(needed & set(ResponseFormatter.AGENT_INPUTS)):
+            needed |= ResponseFormatter.AGENT_INPUTS[agent]
+        return needed
+
+    @staticmethod
+    def cap_size(value: Any, max_bytes: int):
+        """Trim ``value`` to roughly ``max_bytes`` of JSON; return ``(value, marker_or_None)``.
+
+        Lists keep their leading items, dicts their leading keys and ``{"rows": [...]}`` its
+        leading rows, so the shape callers parse is unchanged; the marker records what was cut.
+        """
+        if not max_bytes:
+            return value, None
+        size = len(dumps(value))
+        if size <= max_bytes:
+            return value, None
+        container, items = value, None
+        if isinstance(value, dict) and isinstance(value.get("rows"), list):
+            items = value["rows"]
+        elif isinstance(value, (list, dict)):
+            items = value
+        if items is None:
+            return (value[:max_bytes] if isinstance(value, str) else None), {"original_bytes": size}
+
+        budget = max_bytes - (size - len(dumps(items)))
+        kept, used = [], 2
+        for item in (items.items() if isinstance(items, dict) else items):
+            used += len(dumps(item if not isinstance(items, dict) else {item[0]: item[1]})) + 1
+            if used > budget:
+                break
+            kept.append(item)
+        trimmed = dict(kept) if isinstance(items, dict) else kept
+        if container is not items:
+            trimmed = {**container, "rows": trimmed}
+        return trimmed, {"original_bytes": size, "kept_items": len(kept), "total_items": len(items)}
+
+    @staticmethod
+    def encode_sample_rows(sample_rows: Any, encoding: str = "objects"):
+        """Response shape for ``fetch_sample_rows`` output: ``objects`` (a dict per row) or ``columnar``
+        (``columns`` once, then ``rows`` as value arrays). Errors and other shapes pass through."""
+        if not isinstance(sample_rows, dict) or "columns" not in sample_rows or encoding == "columnar":
+            return sample_rows
+        columns = sample_rows["columns"]
+        encoded = {k: v for k, v in sample_rows.items() if k != "columns"}
+        encoded["rows"] = [dict(zip(columns, row)) for row in sample_rows["rows"]]
+        return encoded
+
     @staticmethod
     def format_analysis(
         original_query: str,
@@ -17,25 +130,69 @@ class ResponseFormatter:
         cost_output: Dict[str, Any],
         schema_output: Dict[str, Any],
         data_validator_output: Dict[str, Any],
-        database: str
+        database: str,
+        index_catalog: Dict[str, Any] = None,
+        fields: Optional[set] = None,
+        max_section_bytes: Optional[int] = None,
+        sample_rows_encoding: str = "objects"
     ) -> Dict[str, Any]:
-        """Format all agent outputs into a comprehensive response."""
+        """Format agent outputs into a response holding only the ``fields`` selected.
 
-        return {
+        ``fields`` is the output of ``resolve_fields`` (``None`` for everything). Technical
+        details larger than ``max_section_bytes`` are trimmed and listed under
+        ``technical_details.truncated``. Sample rows are encoded per ``encode_sample_rows``.
+        """
+        selected = fields if fields is not None else ResponseFormatter.resolve_fields(None)
+        outputs = {
+            "optimizer": optimizer_output,
+            "cost_advisor": cost_output,
+            "schema_advisor": schema_output,
+            "data_validator": data_validator_output,
+        }
+        result = {
             "status": "success",
             "database": database,
             "original_query": original_query,
-            "summary": ResponseFormatter._extract_summary(optimizer_output),
-            "optimization": ResponseFormatter._format_optimizer(optimizer_output),
-            "cost_analysis": ResponseFormatter._format_cost_advisor(cost_output),
-            "schema_improvements": ResponseFormatter._format_schema_advisor(schema_output),
-            "data_quality": ResponseFormatter._format_data_validator(data_validator_output),
-            "technical_details": {
-                "explain_plan": explain_plan,
-                "sample_rows": sample_rows,
-                "schema_context": schema_context
-            }
         }
+        for agent, output in outputs.items():
+            for section in ResponseFormatter.AGENT_SECTIONS[agent]:
+                if section in selected:
+                    result[section] = ResponseFormatter.SECTION_BUILDERS[section](output)
+
+        details = {
+            "explain_plan": explain_plan,
+            "sample_rows": ResponseFormatter.encode_sample_rows(sample_rows, sample_rows_encoding),
+            "schema_context": schema_context,
+            "index_catalog": index_catalog or {},
+        }
+        technical, truncated = {}, {}
+        for part, value in details.items():
+            if f"technical_details.{part}" not in selected:
+                continue
+            technical[part], marker = ResponseFormatter.cap_size(value, max_section_bytes)
+            if marker:
+                truncated[part] = marker
+        if technical:
+            if truncated:
+                technical["truncated"] = truncated
+            result["technical_details"] = technical
+        return result
+
+    @staticmethod
+    def format_agent(agent: str, output: Dict[str, Any], fields: Optional[set] = None) -> Dict[str, Any]:
+        """Sections built from one agent's output, limited to the selected ``fields``.
+
+        ``output`` may be partial (``{"status": "partial", "details": {...fields so far}}``) while a
+        streamed answer is still arriving; those sections report ``"status": "partial"``.
+        """
+        selected = fields if fields is not None else ResponseFormatter.resolve_fields(None)
+        sections = {}
+        for section in ResponseFormatter.AGENT_SECTIONS[agent]:
+            if section in selected:
+                sections[section] = ResponseFormatter.SECTION_BUILDERS[section](output)
+                if output.get("status") == "partial":
+                    sections[section]["status"] = "partial"
+        return sections
 
     @staticmethod
     def _extract_summary(optimizer_output: Dict[str, Any]) -> Dict[str, Any]:
@@ -49,7 +206,8 @@ class ResponseFormatter:
         details = optimizer_output.get("details", {})
         return {
             "status": "success",
-            "performance_impact": details.get("estimated_impact", "unknown"),
+            "performance_impact": (details.get("plan_diff") or {}).get("impact", "unknown"),
+            "estimated_work_ratio": details.get("estimated_work_ratio"),
             "optimization_reason": details.get("why_faster", "Analysis in progress"),
             "key_recommendations": details.get("recommendations", [])[:3]
         }
@@ -67,7 +225,11 @@ class ResponseFormatter:
         return {
             "status": "success",
             "optimized_query": details.get("optimized_query", "No optimization available"),
-            "performance_impact": details.get("estimated_impact", "unknown"),
+            # Measured from the rewrite's EXPLAIN (agents.plan_diff), not estimated by the model
+            "performance_impact": (details.get("plan_diff") or {}).get("impact", "unknown"),
+            "estimated_work_ratio": details.get("estimated_work_ratio"),
+            "plan_diff": details.get("plan_diff"),
+            "optimized_explain_plan": details.get("optimized_explain_plan"),
             "why_faster": details.get("why_faster", ""),
             "recommendations": details.get("recommendations", []),
             "warnings": details.get("warnings", []),
@@ -130,8 +292,13 @@ class ResponseFormatter:
         return {
             "status": "success",
             "issues": details.get("issues", []),
+            "findings": details.get("findings", []),
+            "open_questions": details.get("open_questions", []),
+            "llm_consulted": details.get("llm_consulted"),
             "confidence": details.get("confidence", "unknown"),
-            "reasoning": details.get("reasoning", "")
+            "reasoning": details.get("reasoning", ""),
+            "profile": details.get("profile"),
+            "integrity": details.get("integrity"),
         }
 
     @staticmethod
@@ -0,0 +1,47 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def json_default(obj):
+    """Encode values orjson does not handle natively, matching FastAPI's jsonable_encoder.
+
+    aiomysql returns DECIMAL columns as Decimal, TIME as timedelta and BLOB/BIT as bytes;
+    datetime/date/time and UUID are handled by orjson itself.
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode("utf-8", errors="replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    return str(obj)
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=json_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, with Decimal/timedelta/bytes support for database values."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(content, response=None, status_code: int = 200) -> ORJSONResponse:
+    """Render ``content`` straight to an ``ORJSONResponse``, skipping FastAPI's jsonable_encoder pass.
+
+    Headers already set on the endpoint's injected ``response`` (e.g. Server-Timing) are carried over.
+    """
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"} if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
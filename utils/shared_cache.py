@@ -0,0 +1,197 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import anyio
+import orjson
+
+from utils.config import Config
+from utils.metrics import record_cache
+from utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Stores between sweeps of expired entries (per process)
+PRUNE_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def cache_key(*parts) -> str:
+    """Stable key for the given parts (prompts, table lists, ...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(dumps(part))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SharedCache:
+    """JSON value cache shared by every worker process on a host, stored in one SQLite file in WAL mode.
+
+    Entries belong to a namespace (``llm``, ``schema:<user>@<host>:<port>/<db>``). ``invalidate`` bumps the
+    namespace's generation; lookups only match entries written under the current generation, so all
+    workers stop serving the old entries on their next lookup without any messaging between them.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._stores = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Schema snapshots and LLM answers are private to the service's user: a new database, and the WAL and
+        # shared-memory files SQLite creates next to it, are readable and writable by that user only
+        created = not os.path.exists(path)
+        if created:
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        if created:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.chmod(path + suffix, 0o600)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread: sqlite3 connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, namespace: str, key: str):
+        """``(hit, value, generation)``; pass ``generation`` to ``store`` for the value loaded on a miss."""
+        conn = self._conn()
+        row = conn.execute("SELECT generation FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+        generation = row[0] if row else 0
+        row = conn.execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND generation = ? AND expires_at > ?",
+            (namespace, key, generation, time.time()),
+        ).fetchone()
+        if row is None:
+            return False, None, generation
+        return True, orjson.loads(row[0]), generation
+
+    def store(self, namespace: str, key: str, value, ttl: float, generation: int):
+        """Save ``value`` under the generation seen at lookup time.
+
+        If the namespace was invalidated while the value was being computed, the entry is
+        already stale when written and is never served.
+        """
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, generation, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, generation, time.time() + ttl, dumps(value)),
+        )
+        self._stores += 1
+        if self._stores % PRUNE_EVERY == 0:
+            self.prune()
+
+    def invalidate(self, namespace: str, prefix: bool = False) -> int:
+        """Bump the generation of ``namespace`` (or of every namespace starting with it); return how many."""
+        conn = self._conn()
+        if prefix:
+            pattern = namespace.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            names = {r[0] for r in conn.execute(
+                "SELECT namespace FROM generations WHERE namespace LIKE ? ESCAPE '\\' "
+                "UNION SELECT DISTINCT namespace FROM entries WHERE namespace LIKE ? ESCAPE '\\'",
+                (pattern, pattern),
+            )}
+        else:
+            names = {namespace}
+        for name in names:
+            conn.execute(
+                "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1",
+                (name,),
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND generation < "
+                "(SELECT generation FROM generations WHERE namespace = ?)",
+                (name, name),
+            )
+        return len(names)
+
+    def prune(self):
+        """Drop expired entries, then the soonest-expiring ones beyond ``max_entries``."""
+        conn = self._conn()
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM entries WHERE (namespace, key) IN "
+            "(SELECT namespace, key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        return {
+            "path": self.path,
+            "namespaces": {ns: {"entries": n} for ns, n in conn.execute(
+                "SELECT namespace, COUNT(*) FROM entries GROUP BY namespace")},
+            "generations": dict(conn.execute("SELECT namespace, generation FROM generations")),
+        }
+
+    async def fetch(self, namespace: str, key: str):
+        """Async ``lookup`` that counts hits and misses; a failing cache reads as a miss.
+
+        SQLite calls run in a worker thread so a writer holding the lock never blocks the event loop.
+        """
+        try:
+            hit, value, generation = await anyio.to_thread.run_sync(self.lookup, namespace, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache lookup failed: {e}")
+            return False, None, None
+        record_cache(namespace.split(":", 1)[0], hit)
+        return hit, value, generation
+
+    async def save(self, namespace: str, key: str, value, ttl: float, generation):
+        """Async ``store``; skipped when the lookup failed (``generation`` is ``None``)."""
+        if generation is None:
+            return
+        try:
+            await anyio.to_thread.run_sync(self.store, namespace, key, value, ttl, generation)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache store failed: {e}")
+
+    async def get_or_load(self, namespace: str, key: str, loader, ttl: float, cacheable=None):
+        """Return the cached value, or await ``loader()`` and store its result when ``cacheable(result)``."""
+        hit, value, generation = await self.fetch(namespace, key)
+        if hit:
+            return value
+        value = await loader()
+        if cacheable is None or cacheable(value):
+            await self.save(namespace, key, value, ttl, generation)
+        return value
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide cache at ``SHARED_CACHE_PATH``, or ``None`` when it is set to an empty string."""
+    global _cache
+    if _cache is None and Config.SHARED_CACHE_PATH:
+        _cache = SharedCache(Config.SHARED_CACHE_PATH, max_entries=Config.SHARED_CACHE_MAX_ENTRIES)
+        logger.info(f"Shared cache at {Config.SHARED_CACHE_PATH}")
+    return _cache
@@ -0,0 +1,290 @@
+import re
+import hashlib
+from collections import namedtuple
+
+Token = namedtuple("Token", ["kind", "value"])
+
+# One pass over the text; alternatives are tried in order, so comments and quoted
+# values are consumed before anything inside them can be mistaken for SQL.
+_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--(?=\s|$)[^\n]*|\#[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<ident>`(?:[^`]|``)*`)
+  | (?P<number>0x[0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<param>\?|%s|%\(\w+\)s|:\w+)
+  | (?P<var>@@?[\w.$]+)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<op><=>|<=|>=|<>|!=|:=|\|\||&&|<<|>>|[=<>+\-*/%!&|^~])
+  | (?P<punct>[(),.;])
+""", re.VERBOSE | re.DOTALL)
+
+WRITE_TYPES = {"insert", "update", "delete", "replace"}
+READ_TYPES = {"select"}
+
+# Functions a SELECT can call that wait, take locks, read server files or advance sequences
+SIDE_EFFECT_FUNCTIONS = {
+    "sleep", "benchmark", "get_lock", "release_lock", "release_all_locks", "load_file", "nextval", "setval",
+    "lastval", "master_pos_wait", "master_gtid_wait", "source_pos_wait",
+}
+
+
+def tokenize(sql: str):
+    """Split SQL into tokens, dropping whitespace and comments.
+
+    Kinds: word (keyword or bare identifier, lower-cased), ident (backtick-quoted,
+    unquoted), string, number, param, var, op, punct. Unrecognised characters become
+    single-character ``op`` tokens so tokenizing never fails.
+    """
+    tokens = []
+    pos = 0
+    length = len(sql)
+    while pos < length:
+        match = _TOKEN_RE.match(sql, pos)
+        if not match:
+            tokens.append(Token("op", sql[pos]))
+            pos += 1
+            continue
+        kind = match.lastgroup
+        value = match.group(kind)
+        pos = match.end()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "word":
+            value = value.lower()
+        elif kind == "ident":
+            value = value[1:-1].replace("``", "`")
+        tokens.append(Token(kind, value))
+    return tokens
+
+
+def split_statements(tokens):
+    """Group tokens into statements on top-level ``;``."""
+    statements, current = [], []
+    for tok in tokens:
+        if tok == Token("punct", ";"):
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(tok)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def statement_type(sql_or_tokens) -> str:
+    """Main verb of the first statement (``select``, ``insert``, ``update``, ...).
+
+    Leading parentheses are skipped and ``WITH`` CTEs resolve to the statement
+    that follows them. Returns ``""`` for empty input.
+    """
+    tokens = tokenize(sql_or_tokens) if isinstance(sql_or_tokens, str) else sql_or_tokens
+    depth = 0
+    in_with = False
+    for tok in tokens:
+        if tok.kind == "punct" and tok.value == "(":
+            depth += 1
+            continue
+        if tok.kind == "punct" and tok.value == ")":
+            depth -= 1
+            continue
+        if tok.kind != "word":
+            if not in_with and depth == 0:
+                return tok.value.lower()
+            continue
+        if tok.value == "with" and not in_with:
+            in_with = True
+            continue
+        if in_with:
+            if depth == 0 and tok.value in READ_TYPES | WRITE_TYPES:
+                return tok.value
+            continue
+        return tok.value
+    return ""
+
+
+def _executable_comment(sql: str) -> bool:
+    """Whether ``sql`` holds a ``/*! ... */`` or ``/*M! ... */`` comment, which the server runs as SQL."""
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if not match:
+            pos += 1
+            continue
+        if match.lastgroup == "comment" and match.group().startswith(("/*!", "/*M!")):
+            return True
+        pos = match.end()
+    return False
+
+
+def read_only_violation(sql: str, plan_only: bool = False) -> str:
+    """Why ``sql`` may not be sent to a target as a read-only query, or ``""`` when it may.
+
+    Allowed: exactly one SELECT (CTEs included) with no executable comments and no ``SIDE_EFFECT_FUNCTIONS``
+    (EXPLAIN may evaluate constant subqueries while optimizing). Unless ``plan_only`` (the statement is only
+    EXPLAINed), ``INTO`` and locking reads are refused too.
+    """
+    tokens = tokenize(sql)
+    statements = split_statements(tokens)
+    if not statements:
+        return "empty query"
+    if len(statements) > 1:
+        return "only one statement is allowed"
+    kind = statement_type(tokens)
+    if kind != "select":
+        return f"only SELECT queries are allowed, not {kind.upper() or 'this statement'}"
+    if _executable_comment(sql):
+        return "executable comments (/*! ... */) are not allowed"
+    for i, tok in enumerate(tokens):
+        if tok.kind != "word":
+            continue
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if tok.value in SIDE_EFFECT_FUNCTIONS and following == Token("punct", "("):
+            return f"{tok.value.upper()}() is not allowed"
+        if plan_only:
+            continue
+        if tok.value == "into":
+            return "SELECT ... INTO is not allowed"
+        if tok.value == "for" and following in (Token("word", "update"), Token("word", "share")):
+            return f"locking reads (FOR {following.value.upper()}) are not allowed"
+        if tok.value == "lock" and following == Token("word", "in"):
+            return "locking reads (LOCK IN SHARE MODE) are not allowed"
+    return ""
+
+
+# Words that end a FROM clause, or follow a table reference without being its alias
+_FROM_END = {"where", "group", "having", "order", "limit", "union", "except", "intersect", "window", "for", "lock",
+             "into", "procedure", "returning"}
+_NOT_ALIAS = _FROM_END | {"join", "inner", "cross", "left", "right", "full", "natural", "straight_join", "on",
+                          "using", "use", "ignore", "force", "partition", "as"}
+
+
+def _spans(sql: str):
+    """``(kind, value, start, end)`` per token, as ``tokenize`` would return them."""
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if not match:
+            yield "op", sql[pos], pos, pos + 1
+            pos += 1
+            continue
+        kind, value, pos = match.lastgroup, match.group(), match.end()
+        if kind in ("space", "comment"):
+            continue
+        if kind == "word":
+            value = value.lower()
+        elif kind == "ident":
+            value = value[1:-1].replace("``", "`")
+        yield kind, value, match.start(), pos
+
+
+def ignore_index_hint(sql: str, table: str, index: str):
+    """``sql`` with ``IGNORE INDEX (index)`` after every FROM/JOIN reference to ``table``, and how many were hinted.
+
+    The plan EXPLAIN then shows is the one the optimizer picks without that index, which is what dropping
+    it would leave, without changing anything on the server.
+    """
+    spans = list(_spans(sql))
+    hint = " IGNORE INDEX (`" + index.replace("`", "``") + "`)"
+    table = table.lower()
+    inserts = []
+    from_depths = set()  # parenthesis depths currently inside a FROM clause
+    depth = 0
+    i = 0
+    while i < len(spans):
+        kind, value, _, _ = spans[i]
+        expect_table = False
+        if kind == "punct" and value == "(":
+            depth += 1
+        elif kind == "punct" and value == ")":
+            from_depths.discard(depth)
+            depth -= 1
+        elif kind == "word" and value in ("from", "join", "straight_join"):
+            from_depths.add(depth)
+            expect_table = True
+        elif kind == "word" and value in _FROM_END:
+            from_depths.discard(depth)
+        elif kind == "punct" and value == "," and depth in from_depths:
+            expect_table = True
+        i += 1
+        if not expect_table or i >= len(spans) or spans[i][0] not in ("word", "ident"):
+            continue
+        # [schema.]name
+        name = i
+        if name + 2 < len(spans) and spans[name + 1][1] == "." and spans[name + 2][0] in ("word", "ident"):
+            name += 2
+        end = name + 1
+        if end < len(spans) and spans[end][1] == "(":
+            continue  # a table function such as JSON_TABLE(...)
+        # [AS] alias
+        if end + 1 < len(spans) and spans[end][:2] == ("word", "as"):
+            end += 2
+        elif end < len(spans) and (spans[end][0] == "ident"
+                                   or (spans[end][0] == "word" and spans[end][1] not in _NOT_ALIAS)):
+            end += 1
+        if spans[name][1].lower() == table:
+            inserts.append(spans[end - 1][3])
+        i = end
+    for pos in reversed(inserts):
+        sql = sql[:pos] + hint + sql[pos:]
+    return sql, len(inserts)
+
+
+def fingerprint(sql: str) -> str:
+    """Normalised query text: literals become ``?``, IN/VALUES lists collapse, keywords lower-case."""
+    out = []
+    for tok in tokenize(sql):
+        if tok.kind in ("string", "number", "param"):
+            value = "?"
+        elif tok.kind == "ident":
+            value = tok.value.lower()
+        else:
+            value = tok.value
+        # "in (?, ?, ?)" -> "in (?+)"
+        if value == "?" and len(out) >= 2 and out[-1] == "," and out[-2] in ("?", "?+"):
+            out.pop()
+            out[-1] = "?+"
+            continue
+        # "values (...), (...)" -> "values (...)"
+        if value == "(" and len(out) >= 2 and out[-1] == "," and out[-2] == ")" and "values" in out:
+            close = len(out) - 2
+            opened = _matching_open(out, close)
+            if opened > 0 and out[opened - 1] in ("values", "value"):
+                out.pop()
+                out.append("\0skip")
+                continue
+        if out and out[-1] == "\0skip":
+            if value == ")":
+                out.pop()
+            continue
+        out.append(value)
+    return _join(out)
+
+
+def fingerprint_id(sql: str) -> str:
+    return hashlib.sha1(fingerprint(sql).encode()).hexdigest()[:16]
+
+
+def _matching_open(parts, close_index):
+    depth = 0
+    for i in range(close_index, -1, -1):
+        if parts[i] == ")":
+            depth += 1
+        elif parts[i] == "(":
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def _join(parts):
+    text = ""
+    for part in parts:
+        if not text:
+            text = part
+        elif part in (",", ")", ".") or text.endswith(("(", ".")):
+            text += part
+        else:
+            text += " " + part
+    return text
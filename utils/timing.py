@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from utils.metrics import observe_stage
+from utils.tracing import start_span
+
+
+class StageTimer:
+    """Collects wall-clock durations for the named stages of one request."""
+
+    def __init__(self, endpoint: str = "unknown"):
+        self.endpoint = endpoint
+        self.stages = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with start_span(f"stage.{name}", endpoint=self.endpoint):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed * 1000
+            observe_stage(self.endpoint, name, elapsed)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def as_dict(self):
+        return {name: round(ms, 3) for name, ms in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Render the stages as a ``Server-Timing`` header value."""
+        parts = [f"{name};dur={ms:.3f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.3f}")
+        return ", ".join(parts)
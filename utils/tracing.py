@@ -0,0 +1,265 @@
+import re
+import json
+import time
+import asyncio
+import logging
+import secrets
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation in a trace (W3C trace-context ids)."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "status", "events")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: dict = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self.events = []
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = "error"
+        self.events.append({
+            "name": "exception",
+            "time_ns": time.time_ns(),
+            "attributes": {"exception.type": type(exc).__name__, "exception.message": str(exc)},
+        })
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+# --- Exporters ---
+
+class NoopExporter:
+    def export(self, spans):
+        pass
+
+
+class JsonFileExporter:
+    """Append finished spans to a JSON-lines file, one span per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans):
+        try:
+            with open(self.path, "a") as f:
+                for span in spans:
+                    f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Trace export to {self.path} failed: {e}")
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict):
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+class OtlpHttpExporter:
+    """Send spans to an OTLP/HTTP collector using the JSON encoding (``/v1/traces``)."""
+
+    def __init__(self, endpoint: str, service_name: str = "queryvault"):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    def _payload(self, spans):
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "queryvault"},
+                    "spans": [{
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns),
+                        "attributes": _otlp_attributes(s.attributes),
+                        "events": [{
+                            "name": e["name"],
+                            "timeUnixNano": str(e["time_ns"]),
+                            "attributes": _otlp_attributes(e["attributes"]),
+                        } for e in s.events],
+                        "status": {"code": 2 if s.status == "error" else 1},
+                    } for s in spans],
+                }],
+            }]
+        }
+
+    async def _send(self, payload):
+        import httpx
+
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                await client.post(self.url, json=payload)
+        except httpx.HTTPError as e:
+            logger.warning(f"OTLP export to {self.url} failed: {e}")
+
+    def export(self, spans):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._send(self._payload(spans)))
+
+
+def _build_exporter():
+    kind = Config.TRACE_EXPORTER
+    if kind == "json":
+        return JsonFileExporter(Config.TRACE_FILE)
+    if kind == "otlp":
+        return OtlpHttpExporter(Config.OTLP_ENDPOINT)
+    return NoopExporter()
+
+
+_exporter = _build_exporter()
+# Finished spans are buffered per trace and exported together when the root span ends
+_pending = {}
+MAX_PENDING_TRACES = 1000
+
+
+def set_exporter(exporter):
+    global _exporter
+    _exporter = exporter
+
+
+def _finish(span: Span):
+    span.end()
+    if span.parent_id is None or span.attributes.get("remote_parent"):
+        spans = _pending.pop(span.trace_id, [])
+        spans.append(span)
+        _exporter.export(spans)
+    else:
+        _pending.setdefault(span.trace_id, []).append(span)
+        if len(_pending) > MAX_PENDING_TRACES:
+            # Root never finished in this process (e.g. orphaned background task): drop the oldest
+            _pending.pop(next(iter(_pending)))
+
+
+# --- Public API ---
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Open a child of the current span (or a new trace when there is none)."""
+    parent = _current_span.get()
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+    else:
+        span = Span(name, secrets.token_hex(16), None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(span)
+
+
+def record_span(name: str, start_ns: int, status: str = "ok", **attributes) -> Span:
+    """Record a finished child of the current span that started at ``start_ns``.
+
+    For work that spans ``yield`` points (streaming generators), where a ``start_span``
+    block would set and reset the context variable in different contexts.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+    else:
+        span = Span(name, secrets.token_hex(16), None, attributes)
+    span.start_ns = start_ns
+    span.status = status
+    if parent is not None and parent.end_ns is not None:
+        # The request span already finished (body still streaming): nothing will flush this trace again
+        span.end()
+        _exporter.export([span])
+    else:
+        _finish(span)
+    return span
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """Open the root span of a request, continuing an incoming W3C ``traceparent`` if valid."""
+    match = TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    if match:
+        span = Span(name, match.group(1), match.group(2), {**attributes, "remote_parent": True})
+    else:
+        span = Span(name, secrets.token_hex(16), None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(span)
+
+
+class TraceIdLogFilter(logging.Filter):
+    """Adds ``trace_id`` to every log record so log lines can be joined with spans."""
+
+    def filter(self, record):
+        record.trace_id = current_trace_id() or "-"
+        return True